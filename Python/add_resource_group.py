@@ -1,5 +1,5 @@
 from utils.json_parser import json_parser
-from api.api_modules.session import SessionAPI
+from api.api_modules.session_manager import SessionManager
 from api.api_modules.protection_group import ProtectionGroupAPI
 from conftest import add_resource_group_config
 from log_config import get_add_resource_group_logger
@@ -29,6 +29,7 @@ if __name__ == "__main__":
     config_data = json_parser(add_resource_group_config.ifile)
     executions = config_data.get("executions", [])
 
+    session_manager = SessionManager(logger).start()
     try:
         for idx, add_resource_group_config_data in enumerate(executions, 1):
             logger.info(f"Starting resource group workflow {idx}")
@@ -44,16 +45,14 @@ if __name__ == "__main__":
                 logger.error(f"Missing site IDs for resource group index {idx}. Skipping this resource group.")
                 continue
 
-            shift_api = SessionAPI(logger, add_resource_group_config_data.get("shift_server_ip"))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
+            session_id = session_manager.get_session(add_resource_group_config_data.get("shift_server_ip"), shift_username, shift_password)
             if not session_id:
                 logger.error(f"Failed to create session for resource group index {idx}. Skipping this resource group.")
                 continue
 
             add_resource_group(session_id, add_resource_group_config_data, source_site_name, dest_site_name)
-
-            shift_api.end_drom_session(session_id)
     except Exception as ex:
         logger.error(f"An error occurred during resource group workflows: {ex}")
     finally:
+        session_manager.close()
         logger.info("Please find the logs of the execution in the latest file of the logs folder")
\ No newline at end of file
@@ -1,62 +1,70 @@
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from conftest import add_site_config
 from utils.json_parser import json_parser
 from api.api_modules.site import SiteAPI
-from api.api_modules.session import SessionAPI
-from log_config import get_add_site_logger
+from api.api_modules.session_manager import SessionManager
+from log_config import get_add_site_logger, bind_execution_context
+from utils.log_format import log_body
+from utils.polling import PollProfile
 
 logger = get_add_site_logger()
 logger.info("Get Site workflow started")
 logger.setLevel(logging.INFO)
-ch = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-ch.setFormatter(formatter)
-logger.addHandler(ch)
 
-def create_sites(session_id, add_site_config_data):
-    source_site_id, destination_site_id = None, None
-    site_api = SiteAPI(logger, add_site_config_data.get('shift_server_ip'))
-    source_site_id = site_api.add_site(session_id, add_site_config_data, logger, site_type="source")
-    if not source_site_id:
-        logger.error("Source site creation failed using POST /api/setup/site")
-    else:
-        logger.info(f"Source site created with id: {source_site_id}")
-        source_site_details = site_api.get_vmware_site_details_by_id(session_id, source_site_id, logger)
-        if not source_site_details:
-            logger.error("Source site details not present using GET /api/setup/site API")
-        else:
-            logger.info(f"Source site details: {source_site_details}")
+SITE_ONBOARDING_STEPS = {
+    "source": ("Source", "get_vmware_site_details_by_id"),
+    "destination": ("Destination", "get_hyperv_site_details_by_id"),
+}
+
 
-        source_discovery_status = site_api.wait_for_site_discovery(session_id, source_site_id, logger, site_type="source")
-        if not source_discovery_status:
-            logger.error("Source site discovery completion failed using GET /api/setup/site/discoverystatus API")
-        else:
-            logger.info("Source site discovery completed successfully")
+def onboard_site(site_api, session_id, add_site_config_data, site_type, deadline):
+    label, get_site_details = SITE_ONBOARDING_STEPS[site_type]
+    site_id = site_api.add_site(session_id, add_site_config_data, logger, site_type=site_type)
+    if not site_id:
+        logger.error(f"{label} site creation failed using POST /api/setup/site API")
+        return site_id
 
-    destination_site_id = site_api.add_site(session_id, add_site_config_data, logger, site_type="destination")
-    if not destination_site_id:
-        logger.error("Destination site creation failed using POST /api/setup/site API")
+    logger.info(f"{label} site created with id: {site_id}")
+    site_details = getattr(site_api, get_site_details)(session_id, site_id, logger)
+    if not site_details:
+        logger.error(f"{label} site details not present using GET /api/setup/site API")
     else:
-        logger.info(f"Destination site created with id: {destination_site_id}")
+        log_body(logger, f"{label} site details: %s", body=site_details)
 
-        destination_site_details = site_api.get_hyperv_site_details_by_id(session_id, destination_site_id, logger)
-        if not destination_site_details:
-            logger.error("Destination site details not present using GET /api/setup/site API")
-        else:
-            logger.info(f"Destination site details: {destination_site_details}")
+    remaining = max(deadline - time.monotonic(), 0)
+    discovery_status = site_api.wait_for_site_discovery(session_id, site_id, logger, timeout=remaining,
+                                                        site_type=site_type)
+    if not discovery_status:
+        logger.error(f"{label} site discovery completion failed using GET /api/setup/site/discoverystatus API")
+    else:
+        logger.info(f"{label} site discovery completed successfully")
+    return site_id
 
-        destination_discovery_status = site_api.wait_for_site_discovery(session_id, destination_site_id, logger, site_type="destination")
-        if not destination_discovery_status:
-            logger.error("Destination site discovery completion failed using GET /api/setup/site/discoverystatus API")
-        else:
-            logger.info("Destination site discovery completed successfully")
 
-    return source_site_id, destination_site_id
+def create_sites(session_id, add_site_config_data, timeout=None, site_types=None):
+    """
+    Add the source and destination sites (or only the given site_types) and wait for the discoveries concurrently,
+    within one deadline of timeout seconds (the site_discovery polling profile timeout by default).
+    """
+    site_types = list(site_types or SITE_ONBOARDING_STEPS)
+    site_api = SiteAPI(logger, add_site_config_data.get('shift_server_ip'))
+    timeout = PollProfile.from_config("site_discovery", timeout=timeout).timeout
+    deadline = time.monotonic() + timeout
+    onboard = bind_execution_context(onboard_site)
+    with ThreadPoolExecutor(max_workers=len(site_types), thread_name_prefix="site-onboarding") as executor:
+        futures = {site_type: executor.submit(onboard, site_api, session_id, add_site_config_data, site_type, deadline)
+                   for site_type in site_types}
+        site_ids = {site_type: future.result() for site_type, future in futures.items()}
+    return site_ids.get("source"), site_ids.get("destination")
 
 
 if __name__ == "__main__":
     config_data = json_parser(add_site_config.ifile)
     executions = config_data.get("executions", [])
+    session_manager = SessionManager(logger).start()
     try:
         for idx, add_site_config_data in enumerate(executions, 1):
             logger.info(f"Starting add site workflow {idx}")
@@ -67,13 +75,11 @@ if __name__ == "__main__":
                 logger.error(f"Missing credentials for add site index {idx}. Skipping this add site.")
                 continue
 
-            shift_api = SessionAPI(logger, add_site_config_data.get('shift_server_ip'))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
+            session_id = session_manager.get_session(add_site_config_data.get('shift_server_ip'), shift_username, shift_password)
 
             source_id, destination_id = create_sites(session_id, add_site_config_data)
-
-            shift_api.end_drom_session(session_id)
     except Exception as ex:
         logger.error(f"An error occurred during add site workflows: {ex}")
     finally:
+        session_manager.close()
         logger.info("Please find the logs of the execution in the latest file of the logs folder")
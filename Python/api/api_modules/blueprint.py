@@ -1,26 +1,245 @@
-import json
-import time
-
 from api_wrapper import APIWrapper
+from api.api_modules.endpoints import ServerEndpoints
 from utils.parse_json import convert_to_defaultdict
 from api.api_modules.protection_group import ProtectionGroupAPI
 from api.api_modules.site import SiteAPI
+from utils.inventory import Inventory
+from utils.pagination import iter_list_pages
+from utils.polling import PollProfile, poll_until
+from utils.log_format import log_body
+
+COMPLIANCE_TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class ResourceIndex:
+    """
+    Index of the source and target site resources by name, built once per blueprint so network and
+    mapping resolution does not scan the resource lists per VM or per mapping.
+    """
+
+    def __init__(self, source_resource_list, target_resource_list):
+        source_resource_list = [resource for resource in source_resource_list if resource.get("providerParams", {}).get("type") != "STANDARD_PORTGROUP"]
+        self.resources_by_name = {}
+        for position, resource in enumerate(source_resource_list + target_resource_list):
+            self.resources_by_name.setdefault(resource["name"], []).append((position, resource))
+
+    def find_id(self, name, unresolved):
+        matches = self.resources_by_name.get(name)
+        if not matches:
+            unresolved.setdefault("Resource", []).append(name)
+            return None
+        return matches[0][1]["_id"]
+
+    def find_port_groups(self, names, port_group_type, unresolved):
+        matches = {}
+        for name in names:
+            found = False
+            for position, resource in self.resources_by_name.get(name, []):
+                if resource.get("providerParams", {}).get("type") == port_group_type:
+                    matches[position] = resource
+                    found = True
+            if not found:
+                unresolved.append(name)
+        # Keep the resource list order of the original payload
+        return [matches[position] for position in sorted(matches)]
+
+
+def build_blueprint_payload(migration_config, source_site_id, source_virt_env_id, target_site_id, target_virt_env_id,
+                            resource_group_list, source_resource_list, target_resource_list, logger,
+                            workflow_type="clone_based_migration"):
+    rg_list = [{"_id": rg["_id"]} for rg in resource_group_list]
+
+    rg_to_boot_order = {}
+    for vm_detail in migration_config.get("vm_details", []):
+        rg_name = vm_detail.get("resource_group_name")
+        if rg_name and rg_name not in rg_to_boot_order:
+            rg_to_boot_order[rg_name] = vm_detail.get("boot_order", 0)
+
+    boot_list = []
+    for rg in resource_group_list:
+        order = rg_to_boot_order.get(rg.get("name"), migration_config["vm_details"][0].get("boot_order", 0))
+        boot_list.append({"protectionGroup": {"_id": rg["_id"]}, "order": order})
+
+    vm_boot_order_map = {}
+    for vm_detail in migration_config.get("vm_details", []):
+        vm_boot_order_map[vm_detail["name"]] = vm_detail.get("boot_order", 0)
+
+    vms_payload_list = []
+    for rg in resource_group_list:
+        for vm in rg.get("vms", []):
+            vm_name = vm.get("name", "")
+            order = vm_boot_order_map.get(vm_name, 0)
+            vms_payload_list.append({"vm": {"_id": vm["_id"]}, "order": order})
+
+    vm_name_to_id = {}
+    for rg in resource_group_list:
+        for vm in rg.get("vms", []):
+            if "name" in vm and "_id" in vm:
+                vm_name_to_id[vm["name"]] = vm["_id"]
+
+    unresolved = {}
+    for vm_detail in migration_config.get("vm_details", []):
+        if "_id" not in vm_detail:
+            vm_name = vm_detail.get("name")
+            if vm_name in vm_name_to_id:
+                vm_detail["_id"] = vm_name_to_id[vm_name]
+            else:
+                unresolved.setdefault("VM", []).append(vm_name)
+
+    resource_index = ResourceIndex(source_resource_list, target_resource_list)
+
+    def parse_test_data(key):
+        return [{"key": k, "value": v} for k, v in migration_config.get(key, {}).items()]
+
+    if workflow_type == "clone_based_migration":
+        vm_settings_list = []
+        unresolved_networks = []
+        for vm_detail in migration_config.get("vm_details", []):
+            vm_network_data = vm_detail.get("networkDetails", [])
+
+            vm_cpu_data = vm_detail.get("numCPUs")
+            vm_mem_data = vm_detail.get("memoryMB")
+            vm_ip_data = vm_detail.get("ip")
+            vm_gen_data = vm_detail.get("vmGeneration")
+            vm_secure_boot_data = vm_detail.get("isSecureBootEnable")
+            vm_retain_mac_data = vm_detail.get("retainMacAddress")
+            vm_ip_alloc_data = vm_detail.get("ipAllocType")
+            vm_sv_acc_flag_data = vm_detail.get("serviceAccountOverrideFlag")
+            vm_sv_acc_creds_data = vm_detail.get("serviceAccount", {})
+            power_on_alloc_data = vm_detail.get("powerOnFlag")
+
+            network_list = [
+                {
+                    "uuid": resource["uuid"],
+                    "name": resource["name"],
+                    "portGroupType": resource["providerParams"]["type"]
+                }
+                for resource in resource_index.find_port_groups(vm_network_data, "DISTRIBUTED_PORTGROUP",
+                                                                unresolved_networks)
+            ]
+
+            vm_setting = {
+                "vm": {"_id": vm_detail.get("_id")},
+                "name": vm_detail["name"],
+                "numCPUs": vm_cpu_data,
+                "memoryMB": vm_mem_data,
+                "ip": vm_ip_data,
+                "vmGeneration": vm_gen_data,
+                "nicIp": [],
+                "isSecureBootEnable": vm_secure_boot_data,
+                "retainMacAddress": vm_retain_mac_data,
+                "networkDetails": network_list,
+                "networkName": vm_network_data,
+                "order": vm_detail.get("boot_order", 0),
+                "ipAllocType": vm_ip_alloc_data,
+                "powerOnFlag": power_on_alloc_data
+            }
+
+            if vm_sv_acc_flag_data:
+                vm_setting["serviceAccountOverrideFlag"] = vm_sv_acc_flag_data
+                vm_setting["serviceAccount"] = {
+                    "loginId": vm_sv_acc_creds_data.get("loginId", ""),
+                    "password": vm_sv_acc_creds_data.get("password", "")
+                }
+
+            vm_settings_list.append(vm_setting)
+
+        if unresolved_networks:
+            logger.warning(f"No distributed port group found for networks {sorted(set(unresolved_networks))}, they are not added to the VM settings")
+
+        mappings_raw = migration_config.get("mappings", {})
+        mappings = [
+            {
+                "sourceResource": {"_id": resource_index.find_id(source, unresolved)},
+                "targetResource": {"_id": resource_index.find_id(target, unresolved)}
+            }
+            for source, target in mappings_raw.items()
+        ]
+    else:
+        vm_settings_list = []
+        mappings = []
+
+    if unresolved:
+        for kind, names in unresolved.items():
+            logger.error(f"{kind} id not found for {kind} name(s) {names}. Please check that the resource group was created correctly and the names exist in the sites.")
+        return None
+
+    blueprint_payload = {
+        "name": migration_config["blueprint_name"],
+        "sourceSite": {"_id": source_site_id},
+        "sourceVirtEnv": {"_id": source_virt_env_id},
+        "targetSite": {"_id": target_site_id},
+        "targetVirtEnv": {"_id": target_virt_env_id},
+        "rpoSeconds": 0,
+        "rtoSeconds": 0,
+        "protectionGroups": rg_list,
+        "bootOrder": {
+            "protectionGroups": boot_list,
+            "vms": vms_payload_list if workflow_type == "clone_based_migration" else []
+        },
+        "vmSettings": vm_settings_list,
+        "mappings": mappings if workflow_type == "clone_based_migration" else [],
+        "ipConfig": {"type": migration_config["ip_type"], "targetNetworks": []},
+        "serviceAccounts": [
+            {"os": "windows", "loginId": migration_config["windows_loginId"], "password": migration_config["windows_password"]},
+            {"os": "linux", "loginId": migration_config["linux_loginId"], "password": migration_config["linux_password"]}
+        ]
+    }
+    return blueprint_payload
+
+
+def validate_compliance_for_workflows(compliance_data, logger, workflow_type="clone_based_migration"):
+    logger.info(f"Validating compliance data {compliance_data }for workflow type {workflow_type}")
+    source_flag = False
+    target_flag = False
+    if len(compliance_data) > 0 and compliance_data[0]["sourceCheckResult"] and compliance_data[0]["targetCheckResult"]:
+        source_check_list = compliance_data[0]["sourceCheckResult"]
+        target_check_list = compliance_data[0]["targetCheckResult"]
+        if len(source_check_list) == 10:
+            source_flag = False
+        if workflow_type == "clone_based_migration":
+            if len(target_check_list) == 4:
+                target_flag = True
+        elif workflow_type == "clone_based_conversion":
+            if len(target_check_list) == 1:
+                target_flag = True
+        logger.info(f"Compliance check for source is {source_flag} and target is {target_flag}")
+    else:
+        logger.error(f"Compliance data is empty --> {compliance_data}")
+    return source_flag, target_flag
+
+
+def is_blueprint_recovery_finished(status_entry):
+    status = status_entry['drPlan']['recoveryStatus']
+    return "complete" in status or "error" in status
+
+
+def is_prepare_vm_finished(status_entry):
+    return (status_entry.get('lastExecution') or {}).get('status') in (4, 5)
+
+
+def find_blueprint_status_entry(status_list, blueprint_id):
+    for status_entry in status_list or []:
+        if status_entry["drPlan"]["_id"] == blueprint_id:
+            return status_entry
+    return None
 
 
 class BluePrintAPI:
-    def __init__(self, logger, shift_server_ip):
+    def __init__(self, logger, shift_server_ip, api=None, site_api=None, resource_group_api=None):
         self.uri = shift_server_ip
-        self.api = APIWrapper(logger)
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or APIWrapper(logger)
+        self.site_api = site_api or SiteAPI(logger, shift_server_ip, api=self.api)
+        self.resource_group_api = resource_group_api or ProtectionGroupAPI(
+            logger, shift_server_ip, api=self.api, site_api=self.site_api)
 
     def create_blueprint(self, session_id, migration_config, logger, workflow_type="clone_based_migration"):
-        site_api = SiteAPI(logger, self.uri)
-        resource_group_api = ProtectionGroupAPI(logger, self.uri)
+        site_api = self.site_api
+        resource_group_api = self.resource_group_api
         logger.info("Creating DRplan using POST /api/setup/drplan API for data")
-        url = f"{self.uri}:3700/api/setup/drplan"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
+        url = f"{self.endpoints.setup_url}/drplan"
+        headers = self.endpoints.headers(session_id)
 
         source_site_id = site_api.get_site_details_by_name(session_id, migration_config["source_site_name"], logger)["_id"]
         source_virt_env_id = site_api.get_vmware_virtual_details_using_site_id(session_id, source_site_id, logger)
@@ -33,143 +252,26 @@ class BluePrintAPI:
             if vm_detail.get("resource_group_name")
         }
 
+        # Fetch and index the protection groups once instead of once per resource group name
+        all_resource_groups = resource_group_api.get_all_resource_group(session_id, logger)
+        resource_group_inventory = all_resource_groups[1] if all_resource_groups else Inventory()
         resource_group_list = []
         for rg_name in unique_rg_names:
-            rg_details = resource_group_api.get_resource_group_details_by_name(session_id, rg_name, logger)
+            rg_details = resource_group_inventory.find_all("name", rg_name)
             if rg_details:
                 resource_group_list.extend(rg_details)
+            else:
+                logger.error(f"Resource group details for {rg_name} not found")
 
-        rg_list = [{"_id": rg["_id"]} for rg in resource_group_list]
-
-        rg_to_boot_order = {}
-        for vm_detail in migration_config.get("vm_details", []):
-            rg_name = vm_detail.get("resource_group_name")
-            if rg_name and rg_name not in rg_to_boot_order:
-                rg_to_boot_order[rg_name] = vm_detail.get("boot_order", 0)
-
-        boot_list = []
-        for rg in resource_group_list:
-            order = rg_to_boot_order.get(rg.get("name"), migration_config["vm_details"][0].get("boot_order", 0))
-            boot_list.append({"protectionGroup": {"_id": rg["_id"]}, "order": order})
-
-        vm_boot_order_map = {}
-        for vm_detail in migration_config.get("vm_details", []):
-            vm_boot_order_map[vm_detail["name"]] = vm_detail.get("boot_order", 0)
-
-        vms_payload_list = []
-        for rg in resource_group_list:
-            for vm in rg.get("vms", []):
-                vm_name = vm.get("name", "")
-                order = vm_boot_order_map.get(vm_name, 0)
-                vms_payload_list.append({"vm": {"_id": vm["_id"]}, "order": order})
-
-        vm_name_to_id = {}
-        for rg in resource_group_list:
-            for vm in rg.get("vms", []):
-                if "name" in vm and "_id" in vm:
-                    vm_name_to_id[vm["name"]] = vm["_id"]
-
-        for vm_detail in migration_config.get("vm_details", []):
-            if "_id" not in vm_detail:
-                vm_name = vm_detail.get("name")
-                if vm_name in vm_name_to_id:
-                    vm_detail["_id"] = vm_name_to_id[vm_name]
-                else:
-                    logger.error(f"VM id not found for VM name {vm_name}. Please check that the resource group was created correctly.")
-                    exit(1)
-
-        source_resource_list = [resource for resource in site_api.get_resources_by_site_virtenv_id(session_id, source_site_id, source_virt_env_id, logger)[1] if "type" not in resource.get("providerParams", {}) or resource["providerParams"]["type"] != "STANDARD_PORTGROUP"]
+        source_resource_list = site_api.get_resources_by_site_virtenv_id(session_id, source_site_id, source_virt_env_id, logger)[1]
         target_resource_list = site_api.get_resources_by_site_virtenv_id(session_id, target_site_id, target_virt_env_id, logger)[1]
-        combined_resource_list = source_resource_list + target_resource_list
-
-        def parse_test_data(key):
-            return [{"key": k, "value": v} for k, v in migration_config.get(key, {}).items()]
-
-        if workflow_type == "clone_based_migration":
-            vm_settings_list = []
-            for vm_detail in migration_config.get("vm_details", []):
-                vm_network_data = vm_detail.get("networkDetails", [])
-
-                vm_cpu_data = vm_detail.get("numCPUs")
-                vm_mem_data = vm_detail.get("memoryMB")
-                vm_ip_data = vm_detail.get("ip")
-                vm_gen_data = vm_detail.get("vmGeneration")
-                vm_secure_boot_data = vm_detail.get("isSecureBootEnable")
-                vm_retain_mac_data = vm_detail.get("retainMacAddress")
-                vm_ip_alloc_data = vm_detail.get("ipAllocType")
-                vm_sv_acc_flag_data = vm_detail.get("serviceAccountOverrideFlag")
-                vm_sv_acc_creds_data = vm_detail.get("serviceAccount", {})
-                power_on_alloc_data = vm_detail.get("powerOnFlag")
-
-                network_list = [
-                    {
-                        "uuid": resource["uuid"],
-                        "name": resource["name"],
-                        "portGroupType": resource["providerParams"]["type"]
-                    }
-                    for resource in combined_resource_list
-                    if resource["name"] in vm_network_data and resource["providerParams"]["type"] == "DISTRIBUTED_PORTGROUP"
-                ]
-
-                vm_setting = {
-                    "vm": {"_id": vm_detail["_id"]},
-                    "name": vm_detail["name"],
-                    "numCPUs": vm_cpu_data,
-                    "memoryMB": vm_mem_data,
-                    "ip": vm_ip_data,
-                    "vmGeneration": vm_gen_data,
-                    "nicIp": [],
-                    "isSecureBootEnable": vm_secure_boot_data,
-                    "retainMacAddress": vm_retain_mac_data,
-                    "networkDetails": network_list,
-                    "networkName": vm_network_data,
-                    "order": vm_detail.get("boot_order", 0),
-                    "ipAllocType": vm_ip_alloc_data,
-                    "powerOnFlag": power_on_alloc_data
-                }
-
-                if vm_sv_acc_flag_data:
-                    vm_setting["serviceAccountOverrideFlag"] = vm_sv_acc_flag_data
-                    vm_setting["serviceAccount"] = {
-                        "loginId": vm_sv_acc_creds_data.get("loginId", ""),
-                        "password": vm_sv_acc_creds_data.get("password", "")
-                    }
-
-                vm_settings_list.append(vm_setting)
 
-            mappings_raw = migration_config.get("mappings", {})
-            mappings = [
-                {
-                    "sourceResource": {"_id": next(item["_id"] for item in combined_resource_list if item["name"] == source)},
-                    "targetResource": {"_id": next(item["_id"] for item in combined_resource_list if item["name"] == target)}
-                }
-                for source, target in mappings_raw.items()
-            ]
-        else:
-            vm_settings_list = []
-            mappings = []
-
-        blueprint_payload = {
-            "name": migration_config["blueprint_name"],
-            "sourceSite": {"_id": source_site_id},
-            "sourceVirtEnv": {"_id": source_virt_env_id},
-            "targetSite": {"_id": target_site_id},
-            "targetVirtEnv": {"_id": target_virt_env_id},
-            "rpoSeconds": 0,
-            "rtoSeconds": 0,
-            "protectionGroups": rg_list,
-            "bootOrder": {
-                "protectionGroups": boot_list,
-                "vms": vms_payload_list if workflow_type == "clone_based_migration" else []
-            },
-            "vmSettings": vm_settings_list,
-            "mappings": mappings if workflow_type == "clone_based_migration" else [],
-            "ipConfig": {"type": migration_config["ip_type"], "targetNetworks": []},
-            "serviceAccounts": [
-                {"os": "windows", "loginId": migration_config["windows_loginId"], "password": migration_config["windows_password"]},
-                {"os": "linux", "loginId": migration_config["linux_loginId"], "password": migration_config["linux_password"]}
-            ]
-        }
+        blueprint_payload = build_blueprint_payload(migration_config, source_site_id, source_virt_env_id, target_site_id,
+                                                    target_virt_env_id, resource_group_list, source_resource_list,
+                                                    target_resource_list, logger, workflow_type=workflow_type)
+        if blueprint_payload is None:
+            logger.error("Failed to create blueprint, unresolved names in the blueprint configuration")
+            return False
 
         response_status_code, response_txt, json_dic = self.api.api_request(
             method='POST', url=url, json=blueprint_payload, headers=headers, json_key=['_id']
@@ -183,81 +285,67 @@ class BluePrintAPI:
 
     def run_compliance_check_on_blueprint(self, session_id, blueprint_id, logger):
         logger.info(f"Executing compliance check for blueprint id {blueprint_id}")
-        url = self.uri + f":3700/api/setup/compliance/drplan/{blueprint_id}/checkrequest?async=true"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id,
-        }
-        response_status_code, response_txt, json_dic = self.api.api_request(method='POST', url=url, headers=headers, timeout=300)
-        if response_status_code == 200:
-            json_val = json.loads(response_txt)
+        url = f"{self.endpoints.setup_url}/compliance/drplan/{blueprint_id}/checkrequest?async=true"
+        headers = self.endpoints.headers(session_id)
+        response = self.api.api_request(method='POST', url=url, headers=headers, timeout=300)
+        if response.status_code == 200:
+            json_val = response.json()
             complaince_status = json_val['status']
             compliance_task_id = json_val['taskId']
             logger.info(f"Compliance check was successfully executed for blueprint {blueprint_id} with task id {json_val['taskId']}")
             return complaince_status, compliance_task_id
         else:
-            logger.error(f"Failed to execute compliance check for blueprint {blueprint_id}, Response code is {response_status_code}, response message is {response_txt}")
+            logger.error(f"Failed to execute compliance check for blueprint {blueprint_id}, Response code is {response.status_code}, response message is {response.text}")
             return False
 
     def get_compliance_check_status_on_blueprint(self, session_id, compliance_task_id, logger):
         logger.info(f"Executing get compliance /api/setup/compliance/drplan/{compliance_task_id}/checkrequest?taskId={compliance_task_id} API")
-        url = self.uri + f":3700/api/setup/compliance/drplan/{compliance_task_id}/checkrequest?taskId={compliance_task_id}"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
-        response_status_code, response_txt, json_dic = self.api.api_request(method='POST', url=url, headers=headers, timeout=300)
-        if response_status_code == 200:
-            json_val = json.loads(response_txt)
+        url = f"{self.endpoints.setup_url}/compliance/drplan/{compliance_task_id}/checkrequest?taskId={compliance_task_id}"
+        headers = self.endpoints.headers(session_id)
+        # Only reads the status of the compliance task, safe to retry
+        response = self.api.api_request(method='POST', url=url, headers=headers, timeout=300,
+                                        idempotent=True)
+        if response.status_code == 200:
+            json_val = response.json()
             complaince_status = json_val['status']
             compliance_result = json_val['result']
-            logger.info(f"Compliance check was successfully executed for complaince id {compliance_task_id} with result {compliance_result}, Response code is {response_status_code}")
+            log_body(logger, "Compliance check was successfully executed for complaince id %s, Response code is %s, result is %s", compliance_task_id, response.status_code, body=compliance_result)
             return complaince_status, compliance_result
         else:
-            logger.error(f"Failed to get /api/setup/compliance/drplan/{compliance_task_id}/checkrequest?taskId={compliance_task_id} API check for complaince id {compliance_task_id}, Response code is {response_status_code}, response message is {response_txt}")
+            logger.error(f"Failed to get /api/setup/compliance/drplan/{compliance_task_id}/checkrequest?taskId={compliance_task_id} API check for complaince id {compliance_task_id}, Response code is {response.status_code}, response message is {response.text}")
             return False
 
-    def verify_compliance_check_status(self, session_id, compliance_task_id, logger, timeout=12):
-        compliance_result = None
-        for _ in range(timeout):
-            complaince_status, compliance_result = self.get_compliance_check_status_on_blueprint(session_id, compliance_task_id, logger)
-            if complaince_status == "succeeded":
-                logger.info(f"Compliance check status is {complaince_status}")
-                return complaince_status, compliance_result
-            else:
-                logger.info(f"Compliance check status is {complaince_status}, Retrying after 5 sec")
-                time.sleep(5)
-        logger.error(f"Timeout occurred while verifying compliance check status after {timeout} secs")
+    def verify_compliance_check_status(self, session_id, compliance_task_id, logger, timeout=None):
+        profile = PollProfile.from_config("compliance_check", timeout=timeout)
+
+        def fetch_compliance_status():
+            compliance_status = self.get_compliance_check_status_on_blueprint(session_id, compliance_task_id, logger)
+            if not compliance_status:
+                return None, None
+            if compliance_status[0] not in COMPLIANCE_TERMINAL_STATUSES:
+                logger.info(f"Compliance check status is {compliance_status[0]}, Retrying")
+            return compliance_status
+
+        finished, (complaince_status, compliance_result), poll_count = poll_until(
+            fetch_compliance_status, lambda compliance_status: compliance_status[0] in COMPLIANCE_TERMINAL_STATUSES,
+            profile, logger)
+        if complaince_status == "succeeded":
+            logger.info(f"Compliance check status is {complaince_status}")
+            return complaince_status, compliance_result
+        if finished:
+            logger.error(f"Compliance check status is {complaince_status} for compliance id {compliance_task_id}")
+        else:
+            logger.error(f"Timeout occurred while verifying compliance check status after {profile.timeout} secs")
         return False, compliance_result
 
     def validate_compliance_for_workflows(self, compliance_data, logger, workflow_type="clone_based_migration"):
-        logger.info(f"Validating compliance data {compliance_data }for workflow type {workflow_type}")
-        source_flag = False
-        target_flag = False
-        if len(compliance_data) > 0 and compliance_data[0]["sourceCheckResult"] and compliance_data[0]["targetCheckResult"]:
-            source_check_list = compliance_data[0]["sourceCheckResult"]
-            target_check_list = compliance_data[0]["targetCheckResult"]
-            if len(source_check_list) == 10:
-                source_flag = False
-            if workflow_type == "clone_based_migration":
-                if len(target_check_list) == 4:
-                    target_flag = True
-            elif workflow_type == "clone_based_conversion":
-                if len(target_check_list) == 1:
-                    target_flag = True
-            logger.info(f"Compliance check for source is {source_flag} and target is {target_flag}")
-        else:
-            logger.error(f"Compliance data is empty --> {compliance_data}")
-        return source_flag, target_flag
+        return validate_compliance_for_workflows(compliance_data, logger, workflow_type=workflow_type)
 
     def execute_blueprint(self, session_id, logger, blueprint_id, execution_type="clone_based_migration"):
         logger.info(f"Executing blueprint id {blueprint_id} with mode {execution_type} using GET /api/recovery/drPlan/{blueprint_id}/{execution_type}/execution")
         type = "migrate" if execution_type == "clone_based_migration" else "convert"
-        url = self.uri + f":3704/api/recovery/drPlan/{blueprint_id}/{type}/execution"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
+        url = f"{self.endpoints.recovery_url}/drPlan/{blueprint_id}/{type}/execution"
+        headers = self.endpoints.headers(session_id)
         payload = {
             "serviceAccounts": {
                 "common": {
@@ -277,11 +365,8 @@ class BluePrintAPI:
     
     def initiate_prepare_vm(self, session_id, logger, blueprint_id):
         logger.info(f"Executing blueprint id {blueprint_id}")
-        url = self.uri + f":3704/api/recovery/drPlan/{blueprint_id}/preparevm/execution"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
+        url = f"{self.endpoints.recovery_url}/drPlan/{blueprint_id}/preparevm/execution"
+        headers = self.endpoints.headers(session_id)
         payload = {
             "serviceAccounts": {
                 "common": {
@@ -301,18 +386,13 @@ class BluePrintAPI:
 
     def get_blueprint_status(self, session_id, logger):
         logger.info(f"Retrieving blueprint status using GET /api/recovery/drplan/status")
-        url = self.uri + ":3704/api/recovery/drplan/status"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
-        response_status_code = None
-        response_txt = None
+        url = self.endpoints.recovery_url + "/drplan/status"
+        headers = self.endpoints.headers(session_id)
         try:
-            response_status_code, response_txt, json_dic = self.api.api_request(method='GET', url=url, headers=headers)
-            if response_status_code == 200:
-                json_val = json.loads(response_txt)
-                logger.info(f"Response code for Blueprint status is {response_status_code}")
+            response = self.api.api_request(method='GET', url=url, headers=headers)
+            if response.status_code == 200:
+                json_val = response.json()
+                logger.info(f"Response code for Blueprint status is {response.status_code}")
                 return json_val
             else:
                 return None
@@ -320,75 +400,86 @@ class BluePrintAPI:
             logger.warning(f"Error occurred while retrieving blueprint status using GET /api/recovery/drplan/status: {e}")
             return None
 
-    def verify_blueprint_status(self, session_id, blueprint_id, logger, timeout=40):
-        logger.info(f"Check blueprint status for id {blueprint_id} with timeout {timeout} seconds")
-        for _ in range(timeout):
-            blueprint_status = self.get_blueprint_status(session_id, logger)
-            if not blueprint_status:
-                continue
-            for blueprint in blueprint_status:
-                if blueprint["drPlan"]["_id"] == blueprint_id:
-                    status = blueprint['drPlan']['recoveryStatus']
-                    if "complete" in status or "error" in status:
-                        logger.info(f"Blueprint status for blueprint id {blueprint_id} is {status}")
-                        return status
-            logger.info(f"Verifying blueprint status for blueprint id {blueprint_id}: Current status is {status}")
-            time.sleep(30)
+    def verify_blueprint_status(self, session_id, blueprint_id, logger, timeout=None, watcher=None):
+        profile = PollProfile.from_config("blueprint_status", timeout=timeout)
+        logger.info(f"Check blueprint status for id {blueprint_id} with timeout {profile.timeout} seconds")
+        if watcher is not None:
+            status_entry = watcher.wait_for(blueprint_id, is_blueprint_recovery_finished, timeout=profile.timeout)
+        else:
+            def fetch_status_entry():
+                status_entry = find_blueprint_status_entry(self.get_blueprint_status(session_id, logger), blueprint_id)
+                if status_entry:
+                    logger.info(f"Verifying blueprint status for blueprint id {blueprint_id}: Current status is {status_entry['drPlan']['recoveryStatus']}")
+                return status_entry
+
+            finished, status_entry, poll_count = poll_until(
+                fetch_status_entry, lambda entry: bool(entry) and is_blueprint_recovery_finished(entry), profile, logger)
+        if status_entry and is_blueprint_recovery_finished(status_entry):
+            status = status_entry['drPlan']['recoveryStatus']
+            logger.info(f"Blueprint status for blueprint id {blueprint_id} is {status}")
+            return status
         logger.error(f"Timeout occurred while verifying blueprint status for blueprint id {blueprint_id}")
         return False
 
     def get_blueprint(self, session_id, logger):
         logger.info(f"Retrieving blueprint using GET /api/setup/drplan")
-        url = self.uri + ":3700/api/setup/drplan"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
-        response_status_code, response_txt, json_dic = self.api.api_request(method='GET', url=url, headers=headers)
-        if response_status_code == 200:
-            json_val = json.loads(response_txt)
+        url = self.endpoints.setup_url + "/drplan"
+        headers = self.endpoints.headers(session_id)
+        response = self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
             blueprint_count = json_val['fetchedCount']
-            blueprint_list = json_val['list']
-            logger.info(f"Retrieved blueprint count is {blueprint_count} and list is {blueprint_list}, Response code is {response_status_code}")
+            blueprint_list = Inventory(json_val['list'])
+            log_body(logger, "Retrieved blueprint count is %s, Response code is %s, list is %s", blueprint_count, response.status_code, body=blueprint_list)
             return blueprint_count, blueprint_list
         else:
-            logger.error(f"Failed to retrieve blueprint, Response code is {response_status_code}, response message is {response_txt}")
+            logger.error(f"Failed to retrieve blueprint, Response code is {response.status_code}, response message is {response.text}")
             return None
 
+    def iter_blueprints(self, session_id, logger, page_size=None):
+        logger.info("Iterating blueprints using GET /api/setup/drplan")
+        url = self.endpoints.setup_url + "/drplan"
+        headers = self.endpoints.headers(session_id)
+        yield from iter_list_pages(self.api, url, headers, logger, page_size)
+
     def get_blueprint_by_id(self, session_id, blueprint_id, logger):
         logger.info(f"Retrieving blueprint using GET /api/setup/drplan by id {blueprint_id}")
         blueprint_count, blueprint_list = self.get_blueprint(session_id, logger)
-        for blueprint in blueprint_list:
-            if blueprint["_id"] == blueprint_id:
-                logger.info(f"Retrieved blueprint by id {blueprint_id} is {blueprint}")
-                return blueprint
+        blueprint = blueprint_list.find("_id", blueprint_id)
+        if blueprint:
+            log_body(logger, "Retrieved blueprint by id %s is %s", blueprint_id, body=blueprint)
+            return blueprint
         logger.error(f"Retrieved blueprint by id {blueprint_id} is not found")
         return False
     
     def get_blueprint_id_by_name(self, session_id, blueprint_name, logger):
         logger.info(f"Retrieving blueprint using GET /api/setup/drplan by name {blueprint_name}")
         blueprint_count, blueprint_list = self.get_blueprint(session_id, logger)
-        for blueprint in blueprint_list:
-            if blueprint["name"] == blueprint_name:
-                logger.info(f"Retrieved blueprint by name {blueprint_name} is {blueprint}")
-                return blueprint["_id"]
+        blueprint = blueprint_list.find("name", blueprint_name)
+        if blueprint:
+            log_body(logger, "Retrieved blueprint by name %s is %s", blueprint_name, body=blueprint)
+            return blueprint["_id"]
         logger.error(f"Retrieval of blueprint id by name {blueprint_name} is not found")
         return False
 
-    def wait_for_prepare_vm_execution(self, session_id, blueprint_id, logger, timeout=1000):
+    def wait_for_prepare_vm_execution(self, session_id, blueprint_id, logger, timeout=None, watcher=None):
         logger.info(f"Waiting for prepare vm to complete for blueprint id {blueprint_id}")
         expected_status = 4
         failed_status = 5
-        for _ in range(timeout + 1):
-            blueprint_list = self.get_blueprint_status(session_id, logger)
-            for prepare_vm_status in blueprint_list:
-                if prepare_vm_status["drPlan"]['_id'] == blueprint_id:
-                    if prepare_vm_status['lastExecution']['status'] == expected_status:
-                        logger.info(f"Status is {expected_status}. Exiting wait after prepare vm completion.")
-                        return True
-                    if prepare_vm_status['lastExecution']['status'] == failed_status:
-                        logger.info(f"Status is {failed_status}. Exiting wait after prepare vm failure.")
-                        return False
-            time.sleep(1)
-        logger.error(f"****Status is {expected_status} even after {timeout} secs. Prepare vm is not completed.****")
+        profile = PollProfile.from_config("prepare_vm", timeout=timeout)
+        if watcher is not None:
+            status_entry = watcher.wait_for(blueprint_id, is_prepare_vm_finished, timeout=profile.timeout)
+        else:
+            def fetch_status_entry():
+                return find_blueprint_status_entry(self.get_blueprint_status(session_id, logger), blueprint_id)
+
+            finished, status_entry, poll_count = poll_until(
+                fetch_status_entry, lambda entry: bool(entry) and is_prepare_vm_finished(entry), profile, logger)
+        if status_entry and status_entry['lastExecution']['status'] == expected_status:
+            logger.info(f"Status is {expected_status}. Exiting wait after prepare vm completion.")
+            return True
+        if status_entry and status_entry['lastExecution']['status'] == failed_status:
+            logger.info(f"Status is {failed_status}. Exiting wait after prepare vm failure.")
+            return False
+        logger.error(f"****Status is not {expected_status} even after {profile.timeout} secs. Prepare vm is not completed.****")
         return False
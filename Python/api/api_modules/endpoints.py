@@ -0,0 +1,46 @@
+import threading
+
+"""
+Base URLs and request headers of a Shift server, computed once per server and shared by every API module instead of
+being rebuilt on each call.
+"""
+
+TENANT_PORT = 3698
+SETUP_PORT = 3700
+RECOVERY_PORT = 3704
+
+
+class ServerEndpoints:
+
+    _servers = {}
+    _servers_lock = threading.Lock()
+
+    def __init__(self, shift_server_ip):
+        self.uri = shift_server_ip
+        self.tenant_url = f"{shift_server_ip}:{TENANT_PORT}/api/tenant"
+        self.setup_url = f"{shift_server_ip}:{SETUP_PORT}/api/setup"
+        self.recovery_url = f"{shift_server_ip}:{RECOVERY_PORT}/api/recovery"
+        self._headers = {}
+
+    @classmethod
+    def for_server(cls, shift_server_ip):
+        endpoints = cls._servers.get(shift_server_ip)
+        if endpoints is None:
+            with cls._servers_lock:
+                endpoints = cls._servers.setdefault(shift_server_ip, cls(shift_server_ip))
+        return endpoints
+
+    def headers(self, session_id):
+        """
+        Returns the request headers of the session. The same dict is returned on every call, it must not be modified.
+        """
+        headers = self._headers.get(session_id)
+        if headers is None:
+            headers = self._headers.setdefault(session_id, {
+                'Content-Type': 'application/json',
+                'netapp-sie-sessionid': session_id
+            })
+        return headers
+
+    def forget_session(self, session_id):
+        self._headers.pop(session_id, None)
@@ -1,33 +1,31 @@
-import json
-
 from api_wrapper import APIWrapper
+from api.api_modules.endpoints import ServerEndpoints
+from utils.log_format import log_body
 
 
 class JobMonitoring:
 
-    def __init__(self, logger, shift_server_ip):
+    def __init__(self, logger, shift_server_ip, api=None):
         self.uri = shift_server_ip
-        self.api = APIWrapper(logger)
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or APIWrapper(logger)
 
     def get_job_steps(self, session_id, execution_id, logger):
         try:
             logger.info("Retrieve job steps for execution id {}".format(execution_id))
-            url = self.uri + f":3704/api/recovery/execution/{execution_id}/steps"
-            headers = {
-                'Content-Type': 'application/json',
-                'netapp-sie-sessionid': session_id
-            }
-            response_status_code, response_txt, json_dic = self.api.api_request(method='GET', url=url, headers=headers)
-            if response_status_code == 200:
-                json_val = json.loads(response_txt)
+            url = f"{self.endpoints.recovery_url}/execution/{execution_id}/steps"
+            headers = self.endpoints.headers(session_id)
+            response = self.api.api_request(method='GET', url=url, headers=headers)
+            if response.status_code == 200:
+                json_val = response.json()
                 job_type = json_val['type']
                 job_steps = json_val['steps']
-                logger.info(f"Job steps successfully retrieved for execution id {execution_id}, Response code is {response_status_code}")
-                logger.info(f"Job steps for execution id {execution_id} are {job_steps}")
+                logger.info(f"Job steps successfully retrieved for execution id {execution_id}, Response code is {response.status_code}")
+                log_body(logger, "Job steps for execution id %s are %s", execution_id, body=job_steps)
                 logger.info(f"Job type for execution id {execution_id} is {job_type}")
                 return job_type, job_steps
             else:
-                logger.error(f"Failed to retrieve job steps for execution id {execution_id}, Response code is {response_status_code}, response message is {response_txt}")
+                logger.error(f"Failed to retrieve job steps for execution id {execution_id}, Response code is {response.status_code}, response message is {response.text}")
                 return None
         except Exception as e:
             logger.error(f"Failed to get job steps for execution_id: {execution_id} with error {e}")
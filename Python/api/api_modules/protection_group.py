@@ -1,20 +1,124 @@
-import json
+from concurrent.futures import ThreadPoolExecutor
 
 from api_wrapper import APIWrapper
+from api.api_modules.endpoints import ServerEndpoints
+from conftest import protection_group_config
+from log_config import bind_execution_context
 from api.api_modules.site import SiteAPI
 from utils.parse_json import convert_to_defaultdict
 from utils.parse_json import find_sibling_and_child_value
+from utils.inventory import Inventory
+from utils.pagination import iter_list_pages
+from utils.log_format import log_body
+
+
+def group_vm_details_by_resource_group(migration_config, logger):
+    vm_details_json = migration_config.get("vm_details")
+    if vm_details_json is None:
+        logger.error("Missing vm_details entry.")
+        raise ValueError("Missing vm_details entry.")
+
+    # Group the VM entries by their resource_group_name.
+    groups = {}
+    for vm_entry in vm_details_json:
+        resource_group_name = vm_entry.get("resource_group_name")
+        if not resource_group_name:
+            logger.error("Missing resource_group_name in vm_details entry.")
+            raise ValueError(f"Missing resource_group_name in vm_details entry {vm_entry.get('name')}.")
+        groups.setdefault(resource_group_name, []).append(vm_entry)
+    return groups
+
+
+def build_resource_group_payload(resource_group_name, vm_details_group, vm_list, source_site_id, source_virt_env,
+                                 dest_site_id, dest_virt_env, migration_config):
+    vms = []
+    boot_order_list = []
+    boot_delay_list = []
+    datastore_mapping_list = []
+
+    for vm_entry in vm_details_group:
+        vm_name = vm_entry.get("name")
+        order_val = vm_entry.get("boot_order")
+        delay_val = vm_entry.get("delay")
+        datastore_name = vm_entry.get("datastore_name")
+        qtree_name = vm_entry.get("qtree_name")
+
+        # Find matching VM id from the vm_list, using its name index when it is an Inventory.
+        if isinstance(vm_list, Inventory):
+            vm = vm_list.find("name", vm_name)
+            vm_id = str(vm["_id"] if vm else None)
+        else:
+            vm_id = str(find_sibling_and_child_value(vm_list, "name", vm_name, "_id"))
+
+        vms.append({"_id": vm_id})
+        boot_order_list.append({"vm": {"_id": vm_id}, "order": int(order_val)})
+        boot_delay_list.append({"vm": {"_id": vm_id}, "delaySecs": int(delay_val)})
+
+        datastore_mapping_list.append({
+            "vm": {"_id": vm_id},
+            "datastoreName": datastore_name,
+            "qtreeName": qtree_name,
+            "volumeName": datastore_name
+        })
+
+    payload = {
+        "name": resource_group_name,
+        "sourceSite": {
+            "_id": source_site_id
+        },
+        "sourceVirtEnv": {
+            "_id": source_virt_env
+        },
+        "vms": vms,
+        "bootOrder": {
+            "vms": boot_order_list
+        },
+        "bootDelay": boot_delay_list,
+        "scripts": [],
+        "replicationPlan": {
+            "targetSite": {
+                "_id": dest_site_id
+            },
+            "targetVirtEnv": {
+                "_id": dest_virt_env
+            },
+            "datastoreQtreeMapping": datastore_mapping_list,
+            "snapshotType": migration_config['migration_mode'],
+            "frequencyMins": "30",
+            "retryCount": 3,
+            "numSnapshotsToRetain": 2
+        },
+        "migrationMode": migration_config['migration_mode']
+    }
+    return payload
+
+
+def collect_resource_group_results(results, logger):
+    """
+    Returns the ids of the created resource groups, in the order of the groups, from the (name, id) results of the
+    create requests. The id of a failed create is None.
+    """
+    failed = [resource_group_name for resource_group_name, resource_group_id in results if resource_group_id is None]
+    if failed:
+        logger.error(f"{len(failed)} of {len(results)} resource group(s) were not created: {failed}")
+    else:
+        logger.info(f"All {len(results)} resource group(s) were created")
+    return [resource_group_id for resource_group_name, resource_group_id in results if resource_group_id is not None]
+
 
 class ProtectionGroupAPI:
 
-    def __init__(self, logger, shift_server_ip):
+    def __init__(self, logger, shift_server_ip, api=None, site_api=None):
         self.uri = shift_server_ip
-        self.api = APIWrapper(logger)
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or APIWrapper(logger)
+        self.site_api = site_api or SiteAPI(logger, shift_server_ip, api=self.api)
 
-    def create_resource_group(self, session_id, migration_config, source_site_name, dest_site_name, logger):
+    def create_resource_group(self, session_id, migration_config, source_site_name, dest_site_name, logger,
+                              max_concurrency=None):
         logger.info(f"Creating resource group(s) using GET /api/setup/protectiongroup API for source site {source_site_name} and destination site {dest_site_name}")
 
-        site_api = SiteAPI(logger, self.uri)
+        site_api = self.site_api
 
         source_site_details = site_api.get_site_details_by_name(session_id, source_site_name, logger)
         dest_site_details = site_api.get_site_details_by_name(session_id, dest_site_name, logger)
@@ -30,111 +134,49 @@ class ProtectionGroupAPI:
         sourcer_vir_env = site_api.get_vmware_virtual_details_using_site_id(session_id, source_site_id, logger)
         dest_vir_env = site_api.get_vmware_virtual_details_using_site_id(session_id, dest_site_id,
                                                                          logger)
-        site_count, vm_list = site_api.get_unprotected_vm_using_site_id(session_id, source_site_id, sourcer_vir_env, logger)
-
-        vm_details_json = migration_config.get("vm_details")
-        if vm_details_json is None:
-            exit(1)
-
-        # Group the VM entries by their resource_group_name.
-        groups = {}
-        for vm_entry in vm_details_json:
-            resource_group_name = vm_entry.get("resource_group_name")
-            if not resource_group_name:
-                logger.error("Missing resource_group_name in vm_details entry.")
-                exit(1)
-            groups.setdefault(resource_group_name, []).append(vm_entry)
-
-        resource_group_ids = []
-
-        # Iterate over each group as grouped by resource_group_name.
-        for resource_group_name, vm_details_group in groups.items():
-            vms = []
-            boot_order_list = []
-            boot_delay_list = []
-            datastore_mapping_list = []
-
-            for vm_entry in vm_details_group:
-                vm_name = vm_entry.get("name")
-                order_val = vm_entry.get("boot_order")
-                delay_val = vm_entry.get("delay")
-                datastore_name = vm_entry.get("datastore_name")
-                qtree_name = vm_entry.get("qtree_name")
-
-                # Find matching VM id from the vm_list.
-                vm_id = str(find_sibling_and_child_value(vm_list, "name", vm_name, "_id"))
-
-                vms.append({"_id": vm_id})
-                boot_order_list.append({"vm": {"_id": vm_id}, "order": int(order_val)})
-                boot_delay_list.append({"vm": {"_id": vm_id}, "delaySecs": int(delay_val)})
-
-                datastore_mapping_list.append({
-                    "vm": {"_id": vm_id},
-                    "datastoreName": datastore_name,
-                    "qtreeName": qtree_name,
-                    "volumeName": datastore_name
-                })
-
-            url = f"{self.uri}:3700/api/setup/protectionGroup"
-            headers = {
-                'Content-Type': 'application/json',
-                'netapp-sie-sessionid': session_id
-            }
-
-            payload = {
-                "name": resource_group_name,
-                "sourceSite": {
-                    "_id": source_site_id
-                },
-                "sourceVirtEnv": {
-                    "_id": sourcer_vir_env
-                },
-                "vms": vms,
-                "bootOrder": {
-                    "vms": boot_order_list
-                },
-                "bootDelay": boot_delay_list,
-                "scripts": [],
-                "replicationPlan": {
-                    "targetSite": {
-                        "_id": dest_site_id
-                    },
-                    "targetVirtEnv": {
-                        "_id": dest_vir_env
-                    },
-                    "datastoreQtreeMapping": datastore_mapping_list,
-                    "snapshotType": migration_config['migration_mode'],
-                    "frequencyMins": "30",
-                    "retryCount": 3,
-                    "numSnapshotsToRetain": 2
-                },
-                "migrationMode": migration_config['migration_mode']
-            }
-
-            response_status_code, response_txt, json_dic = self.api.api_request(
-                method='POST',
-                url=url,
-                json=payload,
-                headers=headers,
-                json_key=['session']
-            )
-
-            if response_status_code == 200:
-                resource_group_id = json.loads(response_txt)['_id']
-                logger.info(f"Resource group : {resource_group_name} with id: {resource_group_id} is created using POST /api/setup/protectionGroup API, Response code is {response_status_code}")
-                resource_group_ids.append(resource_group_id)
-            else:
-                logger.error(f"Resource group : {resource_group_name} is not created using POST /api/setup/protectionGroup API, Response code is {response_status_code} and Response message is {response_txt}")
-
-        return resource_group_ids
+        groups = group_vm_details_by_resource_group(migration_config, logger)
+
+        # Page through the unprotected VMs and keep only the ones of the resource groups
+        vm_names = {vm_entry.get("name") for vm_details_group in groups.values() for vm_entry in vm_details_group}
+        vm_list = Inventory(vm for vm in site_api.iter_unprotected_vms(session_id, source_site_id, sourcer_vir_env, logger)
+                            if vm.get("name") in vm_names)
+
+        payloads = [(resource_group_name,
+                     build_resource_group_payload(resource_group_name, vm_details_group, vm_list, source_site_id,
+                                                  sourcer_vir_env, dest_site_id, dest_vir_env, migration_config))
+                    for resource_group_name, vm_details_group in groups.items()]
+
+        # The groups are independent, they are created concurrently and the results keep the order of the groups
+        max_concurrency = max(1, min(max_concurrency or protection_group_config.max_concurrent_creates, len(payloads) or 1))
+        logger.info(f"Creating {len(payloads)} resource group(s) with up to {max_concurrency} concurrent requests")
+        post_resource_group = bind_execution_context(self._post_resource_group)
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="resource-group") as executor:
+            results = list(executor.map(lambda item: post_resource_group(session_id, item[0], item[1], logger), payloads))
+
+        return collect_resource_group_results(results, logger)
+
+    def _post_resource_group(self, session_id, resource_group_name, payload, logger):
+        url = f"{self.endpoints.setup_url}/protectionGroup"
+        headers = self.endpoints.headers(session_id)
+        response_status_code, response_txt, json_dic = self.api.api_request(
+            method='POST',
+            url=url,
+            json=payload,
+            headers=headers,
+            json_key=['_id']
+        )
+
+        if response_status_code == 200:
+            resource_group_id = json_dic['_id']
+            logger.info(f"Resource group : {resource_group_name} with id: {resource_group_id} is created using POST /api/setup/protectionGroup API, Response code is {response_status_code}")
+            return resource_group_name, resource_group_id
+        logger.error(f"Resource group : {resource_group_name} is not created using POST /api/setup/protectionGroup API, Response code is {response_status_code} and Response message is {response_txt}")
+        return resource_group_name, None
 
     def delete_resource_group(self, session_id, resource_group_id, logger):
         logger.info(f"Deleting resource group using GET /api/setup/protectiongroup API for {resource_group_id}")
-        url = f"{self.uri}:3700/api/setup/protectiongroup/{resource_group_id}"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
+        url = f"{self.endpoints.setup_url}/protectiongroup/{resource_group_id}"
+        headers = self.endpoints.headers(session_id)
         response_status_code, response_txt = self.api.api_request(method='DELETE', url=url, headers=headers)
         if response_status_code == 200:
             logger.info(f"Resource group {resource_group_id} is deleted using DELETE "
@@ -147,11 +189,8 @@ class ProtectionGroupAPI:
 
     def get_resource_group_details_by_id(self, session_id, resource_group_id, logger):
         logger.info(f"Getting resource group details using GET /api/setup/protectiongroup/ API for {resource_group_id}")
-        url = f"{self.uri}:3700/api/setup/protectiongroup/{resource_group_id}"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
+        url = f"{self.endpoints.setup_url}/protectiongroup/{resource_group_id}"
+        headers = self.endpoints.headers(session_id)
         response_status_code, response_txt, json_dic = self.api.api_request(method='GET', url=url, headers=headers)
 
         if not response_txt:
@@ -163,46 +202,46 @@ class ProtectionGroupAPI:
 
     def get_all_resource_group(self, session_id, logger):
         logger.info(f"Getting all resource group using GET /api/setup/protectiongroup API")
-        url = self.uri + ":3700/api/setup/protectiongroup"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
-        response_status_code, response_txt, json_dic = self.api.api_request(method='GET', url=url, headers=headers)
-        if response_status_code == 200:
-            json_val = json.loads(response_txt)
+        url = self.endpoints.setup_url + "/protectiongroup"
+        headers = self.endpoints.headers(session_id)
+        response = self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
             resource_group_count = json_val['fetchedCount']
-            resource_group_list = json_val['list']
-            logger.info(f"Resource group details are {json_val}, Response code is {response_status_code}")
+            resource_group_list = Inventory(json_val['list'])
+            log_body(logger, "Resource group details retrieved with response code %s are %s", response.status_code, body=json_val)
             return resource_group_count, resource_group_list
         else:
-            logger.error(f"Resource group details not found: Response code is {response_status_code}, response message is {response_txt}")
+            logger.error(f"Resource group details not found: Response code is {response.status_code}, response message is {response.text}")
             return None
 
+    def iter_resource_groups(self, session_id, logger, page_size=None):
+        logger.info("Iterating resource groups using GET /api/setup/protectiongroup")
+        url = self.endpoints.setup_url + "/protectiongroup"
+        headers = self.endpoints.headers(session_id)
+        yield from iter_list_pages(self.api, url, headers, logger, page_size)
+
     def get_resource_group_details_from_list(self, session_id, resource_group_id, logger):
         logger.info(f"Getting vmware site details using GET /api/setup/protectiongroup API for {resource_group_id}")
         resource_group_count, resource_group_list = self.get_all_resource_group(session_id, logger)
         if not resource_group_list:
             return False
-        for resource_group in resource_group_list:
-            if resource_group['_id'] == resource_group_id:
-                logger.info(f"Resource group details created are {resource_group}")
-                return resource_group
+        resource_group = resource_group_list.find('_id', resource_group_id)
+        if resource_group:
+            log_body(logger, "Resource group details created are %s", body=resource_group)
+            return resource_group
         logger.error(f"Resource group details for {resource_group_id} not found")
         return False
 
     def get_unprotected_vm_list(self, session_id, logger):
-        url = self.uri + ":3700/api/setup/vm/unprotected?siteId=9437fe7b-c3c1-4735-b73b-55d6046ec8c1&virtEnvId=c7920a32-d9ed-4c75-8c1e-81604ff9efbf"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
-        response_status_code, response_txt, json_dic = self.api.api_request(method='GET', url=url, headers=headers)
-        if response_status_code == 200:
-            json_val = json.loads(response_txt)
+        url = self.endpoints.setup_url + "/vm/unprotected?siteId=9437fe7b-c3c1-4735-b73b-55d6046ec8c1&virtEnvId=c7920a32-d9ed-4c75-8c1e-81604ff9efbf"
+        headers = self.endpoints.headers(session_id)
+        response = self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
             vm_count = json_val['fetchedCount']
             vm_list = json_val['list']
-            logger.info(f"Unprotected VM details are {json_val}")
+            log_body(logger, "Unprotected VM details are %s", body=json_val)
             return vm_count, vm_list
         else:
             logger.error("Unprotected VM details not found")
@@ -210,20 +249,17 @@ class ProtectionGroupAPI:
 
     def get_resource_group_by_site_virtenv_id(self, session_id, site_id, virtenv_id, logger):
         logger.info(f"Getting resource group by site id and virtenv id using GET /api/setup/protectionGroup?siteId={site_id}&virtEnvId={virtenv_id} API for {site_id}")
-        url = self.uri + f":3700/api/setup/protectionGroup?siteId={site_id}&virtEnvId={virtenv_id}"
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
-        response_status_code, response_txt, json_dic = self.api.api_request(method='GET', url=url, headers=headers)
-        if response_status_code == 200:
-            json_val = json.loads(response_txt)
+        url = f"{self.endpoints.setup_url}/protectionGroup?siteId={site_id}&virtEnvId={virtenv_id}"
+        headers = self.endpoints.headers(session_id)
+        response = self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
             vm_count = json_val['fetchedCount']
             vm_list = json_val['list']
-            logger.info(f"Resource group details are {json_val} for resource group by site and virtual env id, Response code is {response_status_code}")
+            log_body(logger, "Resource group details for resource group by site and virtual env id retrieved with response code %s are %s", response.status_code, body=json_val)
             return vm_count, vm_list
         else:
-            logger.error(f"Resource group details not found for resource group by site and virtual env id, Response code is {response_status_code}, response message is {response_txt}")
+            logger.error(f"Resource group details not found for resource group by site and virtual env id, Response code is {response.status_code}, response message is {response.text}")
             return None
 
     def get_resource_group_details_by_name(self, session_id, resource_group_name, logger):
@@ -233,10 +269,7 @@ class ProtectionGroupAPI:
             logger.error("No resource groups available.")
             return []
 
-        matching_groups = []
-        for pg in site_list:
-            if pg.get("name") == resource_group_name:
-                matching_groups.append(pg)
+        matching_groups = site_list.find_all("name", resource_group_name)
 
         if matching_groups:
             logger.info(f"Found resource group details for {resource_group_name}: {matching_groups}")
@@ -252,10 +285,7 @@ class ProtectionGroupAPI:
             logger.error("No resource groups available.")
             return []
 
-        matching_groups = []
-        for pg in site_list:
-            if pg.get("name") == resource_group_name:
-                matching_groups.append(pg.get("_id"))
+        matching_groups = [pg.get("_id") for pg in site_list.find_all("name", resource_group_name)]
 
         if matching_groups:
             logger.info(f"Found resource group details for {resource_group_name}: {matching_groups}")
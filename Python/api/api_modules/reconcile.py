@@ -0,0 +1,89 @@
+from utils.inventory import Inventory
+
+"""
+Reconcile mode: the sites, protection groups and drPlans of a server are fetched once and compared with the desired
+state of the executions, so only the objects which do not exist yet are created.
+"""
+
+
+class ReconcilePlan:
+    """
+    Objects of one execution which already exist on the server, and the resource groups which still have to be
+    created.
+    """
+
+    def __init__(self, source_site_id=None, destination_site_id=None, resource_group_ids=None,
+                 missing_resource_groups=None, blueprint_id=None):
+        self.source_site_id = source_site_id
+        self.destination_site_id = destination_site_id
+        self.resource_group_ids = resource_group_ids or {}
+        self.missing_resource_groups = missing_resource_groups or []
+        self.blueprint_id = blueprint_id
+
+    @property
+    def missing_site_types(self):
+        site_types = []
+        if not self.source_site_id:
+            site_types.append("source")
+        if not self.destination_site_id:
+            site_types.append("destination")
+        return site_types
+
+    def summary(self):
+        return (f"existing source site: {self.source_site_id}, existing destination site: {self.destination_site_id}, "
+                f"existing resource groups: {sorted(self.resource_group_ids)}, "
+                f"resource groups to create: {self.missing_resource_groups}, existing blueprint: {self.blueprint_id}")
+
+
+class ServerState:
+    """
+    Snapshot of the sites, protection groups and drPlans of one server, indexed by name.
+    """
+
+    def __init__(self, sites=(), resource_groups=(), blueprints=()):
+        self.sites = Inventory(sites)
+        self.resource_groups = Inventory(resource_groups)
+        self.blueprints = Inventory(blueprints)
+
+    @classmethod
+    def fetch(cls, client):
+        """
+        Fetch the current state with one GET per object type. Returns None when one of the lists cannot be
+        retrieved, reconciling against a partial state would create duplicates.
+        """
+        logger, session_id = client.logger, client.session_id
+        sites = client.site.get_site(session_id, logger, use_cache=False)
+        resource_groups = client.protection_group.get_all_resource_group(session_id, logger)
+        blueprints = client.blueprint.get_blueprint(session_id, logger)
+        if not sites or not resource_groups or not blueprints:
+            logger.error(f"Failed to retrieve the current sites, resource groups or blueprints of {client.uri}")
+            return None
+        state = cls(sites[1], resource_groups[1], blueprints[1])
+        logger.info(f"Current state of {client.uri}: {len(state.sites)} sites, "
+                    f"{len(state.resource_groups)} resource groups, {len(state.blueprints)} blueprints")
+        return state
+
+    def _find_id(self, inventory, name):
+        item = inventory.find("name", name) if name else None
+        return item.get("_id") if item else None
+
+    def plan(self, migration_config):
+        resource_group_ids = {}
+        missing_resource_groups = []
+        for vm_entry in migration_config.get("vm_details") or []:
+            resource_group_name = vm_entry.get("resource_group_name")
+            if not resource_group_name or resource_group_name in resource_group_ids \
+                    or resource_group_name in missing_resource_groups:
+                continue
+            resource_group_id = self._find_id(self.resource_groups, resource_group_name)
+            if resource_group_id:
+                resource_group_ids[resource_group_name] = resource_group_id
+            else:
+                missing_resource_groups.append(resource_group_name)
+        return ReconcilePlan(
+            source_site_id=self._find_id(self.sites, migration_config.get("source_site_name")),
+            destination_site_id=self._find_id(self.sites, migration_config.get("destination_site_name")),
+            resource_group_ids=resource_group_ids,
+            missing_resource_groups=missing_resource_groups,
+            blueprint_id=self._find_id(self.blueprints, migration_config.get("blueprint_name")),
+        )
@@ -1,36 +1,36 @@
 from api_wrapper import APIWrapper
+from api.api_modules.endpoints import ServerEndpoints
 
 
 class SessionAPI:
 
-    def __init__(self, logger, shift_server_ip):
+    def __init__(self, logger, shift_server_ip, api=None):
         self.uri = shift_server_ip
-        self.api = APIWrapper(logger)
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or APIWrapper(logger)
 
     def create_drom_session(self, login_id, password):
-        url = self.uri + ":3698/api/tenant/session"
+        url = self.endpoints.tenant_url + "/session"
         payload = {
             "loginId": login_id,
             "password": password
         }
         response_status_code, response_txt, json_dic = self.api.api_request(method='POST', url=url, json=payload,
-                                                                            json_key=['session'])
-        if response_status_code == 200 and json_dic['session']['_id'] is not None:
-            return json_dic['session']['_id']
+                                                                            json_key=['session._id'])
+        if response_status_code == 200 and json_dic['session._id'] is not None:
+            return json_dic['session._id']
         else:
             raise Exception("Invalid credentials provided.")
 
     def end_drom_session(self, session_id):
-        url = self.uri + ":3698/api/tenant/session/end"
+        url = self.endpoints.tenant_url + "/session/end"
         payload = {
                   "sessionId": "{}".format(session_id)
                 }
-        headers = {
-            'Content-Type': 'application/json',
-            'netapp-sie-sessionid': session_id
-        }
+        headers = self.endpoints.headers(session_id)
         response_status_code, response_txt, json_dic = self.api.api_request(method='POST', url=url, json=payload,
                                                                             headers=headers)
+        self.endpoints.forget_session(session_id)
         if response_status_code == 200:
             return True
         else:
@@ -0,0 +1,121 @@
+import hashlib
+import threading
+
+from api_wrapper import APIWrapper
+from api.api_modules.endpoints import ServerEndpoints
+from api.api_modules.session import SessionAPI
+
+"""
+Session manager shared by the executions of a run: one session is created per (server, user, password) and reused by
+every execution, an expired session is replaced by a new login and all the sessions are ended once at shutdown.
+"""
+
+
+def _session_key(shift_server_ip, login_id, password):
+    # The password is part of the key, an execution with another password for the same user never reuses a session
+    # it could not have opened, only its digest is kept in the key
+    return shift_server_ip, login_id, hashlib.sha256((password or "").encode()).hexdigest()
+
+
+class SessionManager:
+
+    def __init__(self, logger):
+        self.logger = logger
+        # Guards the dicts below, the logins are done under the lock of their session key only, so executions
+        # against other servers or users do not wait for a slow login
+        self._lock = threading.Lock()
+        self._login_locks = {}
+        # (shift_server_ip, login_id, password digest) -> {"session_id": ..., "password": ...}
+        self._sessions = {}
+        # Every session id handed out, including the expired ones, -> its session key
+        self._owners = {}
+
+    def start(self):
+        """
+        Registers the manager with APIWrapper, so requests failing with an expired session are sent again with a
+        new session instead of failing.
+        """
+        APIWrapper.session_refresher = self
+        return self
+
+    def close(self):
+        if APIWrapper.session_refresher is self:
+            APIWrapper.session_refresher = None
+        self.end_all()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _login_lock(self, key):
+        with self._lock:
+            return self._login_locks.setdefault(key, threading.Lock())
+
+    def get_session(self, shift_server_ip, login_id, password):
+        key = _session_key(shift_server_ip, login_id, password)
+        with self._login_lock(key):
+            with self._lock:
+                entry = self._sessions.get(key)
+            if entry is not None:
+                self.logger.info(f"Reusing the session of {login_id} on {shift_server_ip}")
+                return entry["session_id"]
+            session_id = SessionAPI(self.logger, shift_server_ip).create_drom_session(login_id, password)
+            with self._lock:
+                self._sessions[key] = {"session_id": session_id, "password": password}
+                self._owners[session_id] = key
+            self.logger.info(f"Created a session for {login_id} on {shift_server_ip}")
+            return session_id
+
+    def current_session(self, session_id):
+        """
+        Returns the session which replaced session_id, or session_id itself when it is still current or unknown.
+        """
+        with self._lock:
+            key = self._owners.get(session_id)
+            entry = self._sessions.get(key) if key else None
+            return entry["session_id"] if entry else session_id
+
+    def refresh(self, session_id):
+        """
+        Logs in again for the (server, user, password) of an expired session and returns the new session id, or None when the
+        session is not managed here. Concurrent callers with the same expired session share one login.
+        """
+        with self._lock:
+            key = self._owners.get(session_id)
+        if key is None:
+            return None
+        with self._login_lock(key):
+            with self._lock:
+                entry = self._sessions.get(key)
+                if entry is None:
+                    return None
+                if entry["session_id"] != session_id:
+                    return entry["session_id"]
+                password = entry["password"]
+            shift_server_ip, login_id, _ = key
+            self.logger.warning(f"Session of {login_id} on {shift_server_ip} expired, logging in again")
+            try:
+                new_session_id = SessionAPI(self.logger, shift_server_ip).create_drom_session(login_id, password)
+            except Exception as e:
+                self.logger.error(f"Failed to log in again as {login_id} on {shift_server_ip}: {e}")
+                return None
+            ServerEndpoints.for_server(shift_server_ip).forget_session(session_id)
+            with self._lock:
+                # end_all may have dropped the entry meanwhile, the new session is then not handed out
+                if self._sessions.get(key) is entry:
+                    entry["session_id"] = new_session_id
+                    self._owners[new_session_id] = key
+            return new_session_id
+
+    def end_all(self):
+        with self._lock:
+            sessions = [(key, entry["session_id"]) for key, entry in self._sessions.items()]
+            self._sessions.clear()
+            self._owners.clear()
+        for (shift_server_ip, login_id, _), session_id in sessions:
+            if SessionAPI(self.logger, shift_server_ip).end_drom_session(session_id):
+                self.logger.info(f"Ended the session of {login_id} on {shift_server_ip}")
+            else:
+                self.logger.warning(f"Failed to end the session of {login_id} on {shift_server_ip}")
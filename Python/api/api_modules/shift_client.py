@@ -0,0 +1,43 @@
+from api_wrapper import APIWrapper
+from api.api_modules.blueprint import BluePrintAPI
+from api.api_modules.endpoints import ServerEndpoints
+from api.api_modules.job_monitoring import JobMonitoring
+from api.api_modules.protection_group import ProtectionGroupAPI
+from api.api_modules.session import SessionAPI
+from api.api_modules.site import SiteAPI
+
+
+class ShiftClient:
+    """
+    Client bound to one Shift server and, once known, one session. Holds the precomputed base URLs and headers of
+    the server and a single APIWrapper shared by its session, site, protection group, blueprint and job views,
+    so no API object or transport is created per call.
+    """
+
+    def __init__(self, logger, shift_server_ip, session_id=None):
+        self.logger = logger
+        self.uri = shift_server_ip
+        self.session_id = session_id
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = APIWrapper(logger)
+        self.session = SessionAPI(logger, shift_server_ip, api=self.api)
+        self.site = SiteAPI(logger, shift_server_ip, api=self.api)
+        self.protection_group = ProtectionGroupAPI(logger, shift_server_ip, api=self.api, site_api=self.site)
+        self.blueprint = BluePrintAPI(logger, shift_server_ip, api=self.api, site_api=self.site,
+                                      resource_group_api=self.protection_group)
+        self.job = JobMonitoring(logger, shift_server_ip, api=self.api)
+
+    @property
+    def headers(self):
+        return self.endpoints.headers(self.session_id)
+
+    def login(self, login_id, password):
+        self.session_id = self.session.create_drom_session(login_id, password)
+        return self.session_id
+
+    def logout(self):
+        if not self.session_id:
+            return False
+        ended = self.session.end_drom_session(self.session_id)
+        self.session_id = None
+        return ended
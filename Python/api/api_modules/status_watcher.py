@@ -0,0 +1,213 @@
+import asyncio
+import threading
+import time
+
+from api.api_modules.blueprint import BluePrintAPI
+from conftest import status_watcher_config
+from utils.polling import POLL_ITERATIONS, POLL_TIMEOUTS, POLLS_IN_PROGRESS
+
+# Profile label of the watcher polls and waits in the wait loop metrics
+WATCHER_PROFILE = "status_watcher"
+
+
+def _status_signature(status_entry):
+    last_execution = status_entry.get('lastExecution') or {}
+    return status_entry['drPlan'].get('recoveryStatus'), last_execution.get('status')
+
+
+def _set_future_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_future_exception(future, error):
+    if not future.done():
+        future.set_exception(error)
+
+
+class StatusWatcherError(Exception):
+    """
+    Raised to the waiters of a watcher whose polls failed max_failures times in a row.
+    """
+
+
+class BlueprintStatusWatcher:
+    """
+    Polls GET /api/recovery/drplan/status once per interval for every workflow sharing the same server and session,
+    indexes the result by drPlan _id and wakes the sync or async waiters of the blueprints whose state changed.
+    A failed poll is logged and the polling goes on, after max_failures failed polls in a row the waiters get a
+    StatusWatcherError until a poll succeeds again.
+    Obtain a watcher with acquire() and give it back with release() (or use it as a context manager), the polling
+    thread only runs while the watcher has users.
+    """
+
+    _watchers = {}
+    _watchers_lock = threading.Lock()
+
+    def __init__(self, logger, shift_server_ip, session_id, interval=None, max_failures=None):
+        self.logger = logger
+        self.uri = shift_server_ip
+        self.session_id = session_id
+        self.interval = interval or status_watcher_config.interval
+        self.max_failures = max_failures or status_watcher_config.max_failures
+        self.blueprint_api = BluePrintAPI(logger, shift_server_ip)
+        self.poll_count = 0
+        self._lock = threading.Lock()
+        self._statuses = {}
+        self._conditions = {}
+        self._async_waiters = {}
+        self._users = 0
+        self._failures = 0
+        self._error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def acquire(cls, logger, shift_server_ip, session_id, interval=None):
+        with cls._watchers_lock:
+            watcher = cls._watchers.get((shift_server_ip, session_id))
+            if watcher is None:
+                watcher = cls(logger, shift_server_ip, session_id, interval=interval)
+                cls._watchers[(shift_server_ip, session_id)] = watcher
+            watcher._users += 1
+            if watcher._users == 1:
+                watcher._start()
+        return watcher
+
+    def release(self):
+        with BlueprintStatusWatcher._watchers_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            BlueprintStatusWatcher._watchers.pop((self.uri, self.session_id), None)
+        self._stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def _start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"status-watcher-{self.uri}", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Started blueprint status watcher for {self.uri} with interval {self.interval} secs")
+
+    def _stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.logger.info(f"Stopped blueprint status watcher for {self.uri} after {self.poll_count} polls")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            POLL_ITERATIONS.inc(profile=WATCHER_PROFILE)
+            try:
+                status_list = self.blueprint_api.get_blueprint_status(self.session_id, self.logger)
+                if status_list is None:
+                    raise StatusWatcherError(f"GET /api/recovery/drplan/status failed on {self.uri}")
+                self._update(status_list)
+            except Exception as e:
+                self._poll_failed(e)
+            self._stop_event.wait(self.interval)
+
+    def _poll_failed(self, error):
+        woken_async = []
+        with self._lock:
+            self._failures += 1
+            self.logger.warning(f"Blueprint status poll failed on {self.uri} ({self._failures} in a row): {error}")
+            if self._failures < self.max_failures:
+                return
+            if self._error is None:
+                self.logger.error(f"Blueprint status watcher for {self.uri} failed {self._failures} polls in a row, "
+                                  f"failing its waiters")
+            self._error = error
+            for condition in self._conditions.values():
+                condition.notify_all()
+            for waiters in self._async_waiters.values():
+                woken_async.extend(waiters)
+            self._async_waiters.clear()
+            failures = self._failures
+        for loop, future in woken_async:
+            loop.call_soon_threadsafe(_set_future_exception, future, self._watcher_error(failures, error))
+
+    def _watcher_error(self, failures, error):
+        watcher_error = StatusWatcherError(f"Blueprint status of {self.uri} could not be retrieved in {failures} "
+                                           f"polls in a row: {error}")
+        watcher_error.__cause__ = error
+        return watcher_error
+
+    def _update(self, status_list):
+        woken_async = []
+        with self._lock:
+            self.poll_count += 1
+            self._failures = 0
+            self._error = None
+            for status_entry in status_list:
+                blueprint_id = status_entry.get('drPlan', {}).get('_id')
+                if blueprint_id is None:
+                    continue
+                previous_entry = self._statuses.get(blueprint_id)
+                self._statuses[blueprint_id] = status_entry
+                if previous_entry is not None and _status_signature(previous_entry) == _status_signature(status_entry):
+                    continue
+                if blueprint_id in self._conditions:
+                    self._conditions[blueprint_id].notify_all()
+                for loop, future in self._async_waiters.pop(blueprint_id, []):
+                    woken_async.append((loop, future, status_entry))
+        for loop, future, status_entry in woken_async:
+            loop.call_soon_threadsafe(_set_future_result, future, status_entry)
+
+    def get_status(self, blueprint_id):
+        with self._lock:
+            return self._statuses.get(blueprint_id)
+
+    def wait_for(self, blueprint_id, predicate, timeout=None):
+        """
+        Block until predicate(status_entry) is true for the blueprint. Returns the matching status entry,
+        or None when the timeout (in seconds) expires first. Raises StatusWatcherError when the polls keep failing.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        POLLS_IN_PROGRESS.inc(profile=WATCHER_PROFILE)
+        try:
+            with self._lock:
+                condition = self._conditions.setdefault(blueprint_id, threading.Condition(self._lock))
+                while True:
+                    status_entry = self._statuses.get(blueprint_id)
+                    if status_entry is not None and predicate(status_entry):
+                        return status_entry
+                    if self._error is not None:
+                        raise self._watcher_error(self._failures, self._error)
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        POLL_TIMEOUTS.inc(profile=WATCHER_PROFILE)
+                        return None
+                    condition.wait(remaining)
+        finally:
+            POLLS_IN_PROGRESS.dec(profile=WATCHER_PROFILE)
+
+    async def wait_for_async(self, blueprint_id, predicate, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        while True:
+            future = loop.create_future()
+            with self._lock:
+                status_entry = self._statuses.get(blueprint_id)
+                if status_entry is not None and predicate(status_entry):
+                    return status_entry
+                if self._error is not None:
+                    raise self._watcher_error(self._failures, self._error)
+                self._async_waiters.setdefault(blueprint_id, []).append((loop, future))
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    waiters = self._async_waiters.get(blueprint_id, [])
+                    if (loop, future) in waiters:
+                        waiters.remove((loop, future))
+                POLL_TIMEOUTS.inc(profile=WATCHER_PROFILE)
+                return None
@@ -0,0 +1,271 @@
+from async_api_wrapper import AsyncAPIWrapper
+from api.api_modules.endpoints import ServerEndpoints
+from api.api_modules.blueprint import build_blueprint_payload, validate_compliance_for_workflows, \
+    is_blueprint_recovery_finished, is_prepare_vm_finished, find_blueprint_status_entry, COMPLIANCE_TERMINAL_STATUSES
+from api.async_api_modules.protection_group import AsyncProtectionGroupAPI
+from api.async_api_modules.site import AsyncSiteAPI
+from utils.inventory import Inventory
+from utils.pagination import async_iter_list_pages
+from utils.polling import PollProfile, async_poll_until
+from utils.log_format import log_body
+
+
+class AsyncBluePrintAPI:
+    def __init__(self, logger, shift_server_ip, api=None, site_api=None, resource_group_api=None):
+        self.uri = shift_server_ip
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or AsyncAPIWrapper(logger)
+        self.site_api = site_api or AsyncSiteAPI(logger, shift_server_ip, api=self.api)
+        self.resource_group_api = resource_group_api or AsyncProtectionGroupAPI(
+            logger, shift_server_ip, api=self.api, site_api=self.site_api)
+
+    async def create_blueprint(self, session_id, migration_config, logger, workflow_type="clone_based_migration"):
+        site_api = self.site_api
+        resource_group_api = self.resource_group_api
+        logger.info("Creating DRplan using POST /api/setup/drplan API for data")
+        url = f"{self.endpoints.setup_url}/drplan"
+        headers = self.endpoints.headers(session_id)
+
+        source_site_id = (await site_api.get_site_details_by_name(session_id, migration_config["source_site_name"], logger))["_id"]
+        source_virt_env_id = await site_api.get_vmware_virtual_details_using_site_id(session_id, source_site_id, logger)
+        target_site_id = (await site_api.get_site_details_by_name(session_id, migration_config["destination_site_name"], logger))["_id"]
+        target_virt_env_id = await site_api.get_vmware_virtual_details_using_site_id(session_id, target_site_id, logger)
+
+        unique_rg_names = {
+            vm_detail.get("resource_group_name")
+            for vm_detail in migration_config.get("vm_details", [])
+            if vm_detail.get("resource_group_name")
+        }
+
+        # Fetch and index the protection groups once instead of once per resource group name
+        all_resource_groups = await resource_group_api.get_all_resource_group(session_id, logger)
+        resource_group_inventory = all_resource_groups[1] if all_resource_groups else Inventory()
+        resource_group_list = []
+        for rg_name in unique_rg_names:
+            rg_details = resource_group_inventory.find_all("name", rg_name)
+            if rg_details:
+                resource_group_list.extend(rg_details)
+            else:
+                logger.error(f"Resource group details for {rg_name} not found")
+
+        source_resource_list = (await site_api.get_resources_by_site_virtenv_id(session_id, source_site_id, source_virt_env_id, logger))[1]
+        target_resource_list = (await site_api.get_resources_by_site_virtenv_id(session_id, target_site_id, target_virt_env_id, logger))[1]
+
+        blueprint_payload = build_blueprint_payload(migration_config, source_site_id, source_virt_env_id, target_site_id,
+                                                    target_virt_env_id, resource_group_list, source_resource_list,
+                                                    target_resource_list, logger, workflow_type=workflow_type)
+        if blueprint_payload is None:
+            logger.error("Failed to create blueprint, unresolved names in the blueprint configuration")
+            return False
+
+        response_status_code, response_txt, json_dic = await self.api.api_request(
+            method='POST', url=url, json=blueprint_payload, headers=headers, json_key=['_id']
+        )
+        if response_status_code == 200 and json_dic.get('_id') is not None:
+            logger.info(f"Blueprint id created is {json_dic['_id']}, Response code is {response_status_code}")
+            return json_dic['_id']
+        else:
+            logger.error(f"Failed to create blueprint, Response code is {response_status_code}, response message is {response_txt}")
+            return False
+
+    async def run_compliance_check_on_blueprint(self, session_id, blueprint_id, logger):
+        logger.info(f"Executing compliance check for blueprint id {blueprint_id}")
+        url = f"{self.endpoints.setup_url}/compliance/drplan/{blueprint_id}/checkrequest?async=true"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='POST', url=url, headers=headers, timeout=300)
+        if response.status_code == 200:
+            json_val = response.json()
+            complaince_status = json_val['status']
+            compliance_task_id = json_val['taskId']
+            logger.info(f"Compliance check was successfully executed for blueprint {blueprint_id} with task id {json_val['taskId']}")
+            return complaince_status, compliance_task_id
+        else:
+            logger.error(f"Failed to execute compliance check for blueprint {blueprint_id}, Response code is {response.status_code}, response message is {response.text}")
+            return False
+
+    async def get_compliance_check_status_on_blueprint(self, session_id, compliance_task_id, logger):
+        logger.info(f"Executing get compliance /api/setup/compliance/drplan/{compliance_task_id}/checkrequest?taskId={compliance_task_id} API")
+        url = f"{self.endpoints.setup_url}/compliance/drplan/{compliance_task_id}/checkrequest?taskId={compliance_task_id}"
+        headers = self.endpoints.headers(session_id)
+        # Only reads the status of the compliance task, safe to retry
+        response = await self.api.api_request(method='POST', url=url, headers=headers, timeout=300,
+                                              idempotent=True)
+        if response.status_code == 200:
+            json_val = response.json()
+            complaince_status = json_val['status']
+            compliance_result = json_val['result']
+            log_body(logger, "Compliance check was successfully executed for complaince id %s, Response code is %s, result is %s", compliance_task_id, response.status_code, body=compliance_result)
+            return complaince_status, compliance_result
+        else:
+            logger.error(f"Failed to get /api/setup/compliance/drplan/{compliance_task_id}/checkrequest?taskId={compliance_task_id} API check for complaince id {compliance_task_id}, Response code is {response.status_code}, response message is {response.text}")
+            return False
+
+    async def verify_compliance_check_status(self, session_id, compliance_task_id, logger, timeout=None):
+        profile = PollProfile.from_config("compliance_check", timeout=timeout)
+
+        async def fetch_compliance_status():
+            compliance_status = await self.get_compliance_check_status_on_blueprint(session_id, compliance_task_id, logger)
+            if not compliance_status:
+                return None, None
+            if compliance_status[0] not in COMPLIANCE_TERMINAL_STATUSES:
+                logger.info(f"Compliance check status is {compliance_status[0]}, Retrying")
+            return compliance_status
+
+        finished, (complaince_status, compliance_result), poll_count = await async_poll_until(
+            fetch_compliance_status, lambda compliance_status: compliance_status[0] in COMPLIANCE_TERMINAL_STATUSES,
+            profile, logger)
+        if complaince_status == "succeeded":
+            logger.info(f"Compliance check status is {complaince_status}")
+            return complaince_status, compliance_result
+        if finished:
+            logger.error(f"Compliance check status is {complaince_status} for compliance id {compliance_task_id}")
+        else:
+            logger.error(f"Timeout occurred while verifying compliance check status after {profile.timeout} secs")
+        return False, compliance_result
+
+    def validate_compliance_for_workflows(self, compliance_data, logger, workflow_type="clone_based_migration"):
+        return validate_compliance_for_workflows(compliance_data, logger, workflow_type=workflow_type)
+
+    async def execute_blueprint(self, session_id, logger, blueprint_id, execution_type="clone_based_migration"):
+        logger.info(f"Executing blueprint id {blueprint_id} with mode {execution_type} using GET /api/recovery/drPlan/{blueprint_id}/{execution_type}/execution")
+        type = "migrate" if execution_type == "clone_based_migration" else "convert"
+        url = f"{self.endpoints.recovery_url}/drPlan/{blueprint_id}/{type}/execution"
+        headers = self.endpoints.headers(session_id)
+        payload = {
+            "serviceAccounts": {
+                "common": {
+                    "loginId": None,
+                    "password": None
+                },
+                "vms": []
+            }
+        }
+        response_status_code, response_txt, json_dic = await self.api.api_request(method='POST', url=url, json=payload, headers=headers, json_key=['_id'])
+        if response_status_code == 200:
+            logger.info(f"Blueprint {blueprint_id} was executed with mode {execution_type} successfully with id {json_dic['_id']}, Response code is {response_status_code}")
+            return json_dic['_id']
+        else:
+            logger.error(f"Failed to execute blueprint {blueprint_id} with mode {execution_type}, Response code is {response_status_code}, response message is {response_txt}")
+            return False
+    
+    async def initiate_prepare_vm(self, session_id, logger, blueprint_id):
+        logger.info(f"Executing blueprint id {blueprint_id}")
+        url = f"{self.endpoints.recovery_url}/drPlan/{blueprint_id}/preparevm/execution"
+        headers = self.endpoints.headers(session_id)
+        payload = {
+            "serviceAccounts": {
+                "common": {
+                    "loginId": None,
+                    "password": None
+                },
+                "vms": []
+            }
+        }
+        response_status_code, response_txt, json_dic = await self.api.api_request(method='POST', url=url, json=payload, headers=headers, json_key=['_id'])
+        if response_status_code == 200:
+            logger.info(f"Initiated Prepare VM for Blueprint {blueprint_id} was executed successfully with id {json_dic['_id']}, Response code is {response_status_code}")
+            return json_dic['_id']
+        else:
+            logger.error(f"Failed to initiate Prepare VM for Blueprint blueprint {blueprint_id}, Response code is {response_status_code}, response message is {response_txt}")
+            return False
+
+    async def get_blueprint_status(self, session_id, logger):
+        logger.info(f"Retrieving blueprint status using GET /api/recovery/drplan/status")
+        url = self.endpoints.recovery_url + "/drplan/status"
+        headers = self.endpoints.headers(session_id)
+        try:
+            response = await self.api.api_request(method='GET', url=url, headers=headers)
+            if response.status_code == 200:
+                json_val = response.json()
+                logger.info(f"Response code for Blueprint status is {response.status_code}")
+                return json_val
+            else:
+                return None
+        except Exception as e:
+            logger.warning(f"Error occurred while retrieving blueprint status using GET /api/recovery/drplan/status: {e}")
+            return None
+
+    async def verify_blueprint_status(self, session_id, blueprint_id, logger, timeout=None, watcher=None):
+        profile = PollProfile.from_config("blueprint_status", timeout=timeout)
+        logger.info(f"Check blueprint status for id {blueprint_id} with timeout {profile.timeout} seconds")
+        if watcher is not None:
+            status_entry = await watcher.wait_for_async(blueprint_id, is_blueprint_recovery_finished, timeout=profile.timeout)
+        else:
+            async def fetch_status_entry():
+                status_entry = find_blueprint_status_entry(await self.get_blueprint_status(session_id, logger), blueprint_id)
+                if status_entry:
+                    logger.info(f"Verifying blueprint status for blueprint id {blueprint_id}: Current status is {status_entry['drPlan']['recoveryStatus']}")
+                return status_entry
+
+            finished, status_entry, poll_count = await async_poll_until(
+                fetch_status_entry, lambda entry: bool(entry) and is_blueprint_recovery_finished(entry), profile, logger)
+        if status_entry and is_blueprint_recovery_finished(status_entry):
+            status = status_entry['drPlan']['recoveryStatus']
+            logger.info(f"Blueprint status for blueprint id {blueprint_id} is {status}")
+            return status
+        logger.error(f"Timeout occurred while verifying blueprint status for blueprint id {blueprint_id}")
+        return False
+
+    async def get_blueprint(self, session_id, logger):
+        logger.info(f"Retrieving blueprint using GET /api/setup/drplan")
+        url = self.endpoints.setup_url + "/drplan"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
+            blueprint_count = json_val['fetchedCount']
+            blueprint_list = Inventory(json_val['list'])
+            log_body(logger, "Retrieved blueprint count is %s, Response code is %s, list is %s", blueprint_count, response.status_code, body=blueprint_list)
+            return blueprint_count, blueprint_list
+        else:
+            logger.error(f"Failed to retrieve blueprint, Response code is {response.status_code}, response message is {response.text}")
+            return None
+
+    async def iter_blueprints(self, session_id, logger, page_size=None):
+        logger.info("Iterating blueprints using GET /api/setup/drplan")
+        url = self.endpoints.setup_url + "/drplan"
+        headers = self.endpoints.headers(session_id)
+        async for item in async_iter_list_pages(self.api, url, headers, logger, page_size):
+            yield item
+
+    async def get_blueprint_by_id(self, session_id, blueprint_id, logger):
+        logger.info(f"Retrieving blueprint using GET /api/setup/drplan by id {blueprint_id}")
+        blueprint_count, blueprint_list = await self.get_blueprint(session_id, logger)
+        blueprint = blueprint_list.find("_id", blueprint_id)
+        if blueprint:
+            log_body(logger, "Retrieved blueprint by id %s is %s", blueprint_id, body=blueprint)
+            return blueprint
+        logger.error(f"Retrieved blueprint by id {blueprint_id} is not found")
+        return False
+    
+    async def get_blueprint_id_by_name(self, session_id, blueprint_name, logger):
+        logger.info(f"Retrieving blueprint using GET /api/setup/drplan by name {blueprint_name}")
+        blueprint_count, blueprint_list = await self.get_blueprint(session_id, logger)
+        blueprint = blueprint_list.find("name", blueprint_name)
+        if blueprint:
+            log_body(logger, "Retrieved blueprint by name %s is %s", blueprint_name, body=blueprint)
+            return blueprint["_id"]
+        logger.error(f"Retrieval of blueprint id by name {blueprint_name} is not found")
+        return False
+
+    async def wait_for_prepare_vm_execution(self, session_id, blueprint_id, logger, timeout=None, watcher=None):
+        logger.info(f"Waiting for prepare vm to complete for blueprint id {blueprint_id}")
+        expected_status = 4
+        failed_status = 5
+        profile = PollProfile.from_config("prepare_vm", timeout=timeout)
+        if watcher is not None:
+            status_entry = await watcher.wait_for_async(blueprint_id, is_prepare_vm_finished, timeout=profile.timeout)
+        else:
+            async def fetch_status_entry():
+                return find_blueprint_status_entry(await self.get_blueprint_status(session_id, logger), blueprint_id)
+
+            finished, status_entry, poll_count = await async_poll_until(
+                fetch_status_entry, lambda entry: bool(entry) and is_prepare_vm_finished(entry), profile, logger)
+        if status_entry and status_entry['lastExecution']['status'] == expected_status:
+            logger.info(f"Status is {expected_status}. Exiting wait after prepare vm completion.")
+            return True
+        if status_entry and status_entry['lastExecution']['status'] == failed_status:
+            logger.info(f"Status is {failed_status}. Exiting wait after prepare vm failure.")
+            return False
+        logger.error(f"****Status is not {expected_status} even after {profile.timeout} secs. Prepare vm is not completed.****")
+        return False
@@ -0,0 +1,48 @@
+from async_api_wrapper import AsyncAPIWrapper
+from api.api_modules.endpoints import ServerEndpoints
+from utils.log_format import log_body
+
+
+class AsyncJobMonitoring:
+
+    def __init__(self, logger, shift_server_ip, api=None):
+        self.uri = shift_server_ip
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or AsyncAPIWrapper(logger)
+
+    async def get_job_steps(self, session_id, execution_id, logger):
+        try:
+            logger.info("Retrieve job steps for execution id {}".format(execution_id))
+            url = f"{self.endpoints.recovery_url}/execution/{execution_id}/steps"
+            headers = self.endpoints.headers(session_id)
+            response = await self.api.api_request(method='GET', url=url, headers=headers)
+            if response.status_code == 200:
+                json_val = response.json()
+                job_type = json_val['type']
+                job_steps = json_val['steps']
+                logger.info(f"Job steps successfully retrieved for execution id {execution_id}, Response code is {response.status_code}")
+                log_body(logger, "Job steps for execution id %s are %s", execution_id, body=job_steps)
+                logger.info(f"Job type for execution id {execution_id} is {job_type}")
+                return job_type, job_steps
+            else:
+                logger.error(f"Failed to retrieve job steps for execution id {execution_id}, Response code is {response.status_code}, response message is {response.text}")
+                return None
+        except Exception as e:
+            logger.error(f"Failed to get job steps for execution_id: {execution_id} with error {e}")
+
+    async def validate_job_steps_is_success(self, session_id, execution_id, logger):
+        try:
+            job_type, job_steps = await self.get_job_steps(session_id, execution_id, logger)
+            if job_steps:
+                for step in job_steps:
+                    if step['status'] != 4:
+                        logger.error(f"Job step {step['description']} is not successful")
+                        return False
+                    elif step['status'] == 4:
+                        logger.info(f"Job step {step['description']} is successful")
+                return True
+            else:
+                logger.error(f"Failed to fetch Job steps for execution_id: {execution_id}")
+                return False
+        except Exception as e:
+            logger.error(f"Failed to validate job steps for execution_id: {execution_id} with error {e}")
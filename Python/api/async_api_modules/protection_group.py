@@ -0,0 +1,204 @@
+import asyncio
+
+from async_api_wrapper import AsyncAPIWrapper
+from api.api_modules.endpoints import ServerEndpoints
+from conftest import protection_group_config
+from utils.inventory import Inventory
+from utils.pagination import async_iter_list_pages
+from api.api_modules.protection_group import build_resource_group_payload, collect_resource_group_results, \
+    group_vm_details_by_resource_group
+from api.async_api_modules.site import AsyncSiteAPI
+from utils.log_format import log_body
+
+
+class AsyncProtectionGroupAPI:
+
+    def __init__(self, logger, shift_server_ip, api=None, site_api=None):
+        self.uri = shift_server_ip
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or AsyncAPIWrapper(logger)
+        self.site_api = site_api or AsyncSiteAPI(logger, shift_server_ip, api=self.api)
+
+    async def create_resource_group(self, session_id, migration_config, source_site_name, dest_site_name, logger,
+                                    max_concurrency=None):
+        logger.info(f"Creating resource group(s) using GET /api/setup/protectiongroup API for source site {source_site_name} and destination site {dest_site_name}")
+
+        site_api = self.site_api
+
+        source_site_details = await site_api.get_site_details_by_name(session_id, source_site_name, logger)
+        dest_site_details = await site_api.get_site_details_by_name(session_id, dest_site_name, logger)
+
+        if not source_site_details or not dest_site_details:
+            logger.error("Error retrieving site details for source or destination.")
+            return False
+
+        source_site_id = source_site_details.get("_id")
+        dest_site_id = dest_site_details.get("_id")
+        
+        
+        sourcer_vir_env = await site_api.get_vmware_virtual_details_using_site_id(session_id, source_site_id, logger)
+        dest_vir_env = await site_api.get_vmware_virtual_details_using_site_id(session_id, dest_site_id,
+                                                                         logger)
+        groups = group_vm_details_by_resource_group(migration_config, logger)
+
+        # Page through the unprotected VMs and keep only the ones of the resource groups
+        vm_names = {vm_entry.get("name") for vm_details_group in groups.values() for vm_entry in vm_details_group}
+        vm_list = Inventory([vm async for vm in site_api.iter_unprotected_vms(session_id, source_site_id, sourcer_vir_env, logger)
+                             if vm.get("name") in vm_names])
+
+        payloads = [(resource_group_name,
+                     build_resource_group_payload(resource_group_name, vm_details_group, vm_list, source_site_id,
+                                                  sourcer_vir_env, dest_site_id, dest_vir_env, migration_config))
+                    for resource_group_name, vm_details_group in groups.items()]
+
+        max_concurrency = max(1, max_concurrency or protection_group_config.max_concurrent_creates)
+        logger.info(f"Creating {len(payloads)} resource group(s) with up to {max_concurrency} concurrent requests")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def post_resource_group(resource_group_name, payload):
+            async with semaphore:
+                return await self._post_resource_group(session_id, resource_group_name, payload, logger)
+
+        results = await asyncio.gather(*(post_resource_group(resource_group_name, payload)
+                                         for resource_group_name, payload in payloads))
+        return collect_resource_group_results(results, logger)
+
+    async def _post_resource_group(self, session_id, resource_group_name, payload, logger):
+        url = f"{self.endpoints.setup_url}/protectionGroup"
+        headers = self.endpoints.headers(session_id)
+        response_status_code, response_txt, json_dic = await self.api.api_request(
+            method='POST',
+            url=url,
+            json=payload,
+            headers=headers,
+            json_key=['_id']
+        )
+
+        if response_status_code == 200:
+            resource_group_id = json_dic['_id']
+            logger.info(f"Resource group : {resource_group_name} with id: {resource_group_id} is created using POST /api/setup/protectionGroup API, Response code is {response_status_code}")
+            return resource_group_name, resource_group_id
+        logger.error(f"Resource group : {resource_group_name} is not created using POST /api/setup/protectionGroup API, Response code is {response_status_code} and Response message is {response_txt}")
+        return resource_group_name, None
+
+    async def delete_resource_group(self, session_id, resource_group_id, logger):
+        logger.info(f"Deleting resource group using GET /api/setup/protectiongroup API for {resource_group_id}")
+        url = f"{self.endpoints.setup_url}/protectiongroup/{resource_group_id}"
+        headers = self.endpoints.headers(session_id)
+        response_status_code, response_txt = await self.api.api_request(method='DELETE', url=url, headers=headers)
+        if response_status_code == 200:
+            logger.info(f"Resource group {resource_group_id} is deleted using DELETE "
+                        f"/api/setup/protectiongroup/<resource_group_id> API, Response code is {response_status_code}")
+            return not await self.get_resource_group_details_from_list(session_id, resource_group_id, logger)
+        else:
+            logger.error(f"Resource group {resource_group_id} is not deleted using DELETE "
+                        f"/api/setup/protectiongroup/<resource_group_id> API, Response code is {response_status_code} and Response message is {response_txt}")
+            return False
+
+    async def get_resource_group_details_by_id(self, session_id, resource_group_id, logger):
+        logger.info(f"Getting resource group details using GET /api/setup/protectiongroup/ API for {resource_group_id}")
+        url = f"{self.endpoints.setup_url}/protectiongroup/{resource_group_id}"
+        headers = self.endpoints.headers(session_id)
+        response_status_code, response_txt, json_dic = await self.api.api_request(method='GET', url=url, headers=headers)
+
+        if not response_txt:
+            logger.error(f"Resource group details for {resource_group_id} not found: ")
+            return False
+        else:
+            logger.info(f"Resource group details for {resource_group_id} are {response_txt} and response code is {response_status_code}")
+            return response_txt
+
+    async def get_all_resource_group(self, session_id, logger):
+        logger.info(f"Getting all resource group using GET /api/setup/protectiongroup API")
+        url = self.endpoints.setup_url + "/protectiongroup"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
+            resource_group_count = json_val['fetchedCount']
+            resource_group_list = Inventory(json_val['list'])
+            log_body(logger, "Resource group details retrieved with response code %s are %s", response.status_code, body=json_val)
+            return resource_group_count, resource_group_list
+        else:
+            logger.error(f"Resource group details not found: Response code is {response.status_code}, response message is {response.text}")
+            return None
+
+    async def iter_resource_groups(self, session_id, logger, page_size=None):
+        logger.info("Iterating resource groups using GET /api/setup/protectiongroup")
+        url = self.endpoints.setup_url + "/protectiongroup"
+        headers = self.endpoints.headers(session_id)
+        async for item in async_iter_list_pages(self.api, url, headers, logger, page_size):
+            yield item
+
+    async def get_resource_group_details_from_list(self, session_id, resource_group_id, logger):
+        logger.info(f"Getting vmware site details using GET /api/setup/protectiongroup API for {resource_group_id}")
+        resource_group_count, resource_group_list = await self.get_all_resource_group(session_id, logger)
+        if not resource_group_list:
+            return False
+        resource_group = resource_group_list.find('_id', resource_group_id)
+        if resource_group:
+            log_body(logger, "Resource group details created are %s", body=resource_group)
+            return resource_group
+        logger.error(f"Resource group details for {resource_group_id} not found")
+        return False
+
+    async def get_unprotected_vm_list(self, session_id, logger):
+        url = self.endpoints.setup_url + "/vm/unprotected?siteId=9437fe7b-c3c1-4735-b73b-55d6046ec8c1&virtEnvId=c7920a32-d9ed-4c75-8c1e-81604ff9efbf"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
+            vm_count = json_val['fetchedCount']
+            vm_list = json_val['list']
+            log_body(logger, "Unprotected VM details are %s", body=json_val)
+            return vm_count, vm_list
+        else:
+            logger.error("Unprotected VM details not found")
+            return None
+
+    async def get_resource_group_by_site_virtenv_id(self, session_id, site_id, virtenv_id, logger):
+        logger.info(f"Getting resource group by site id and virtenv id using GET /api/setup/protectionGroup?siteId={site_id}&virtEnvId={virtenv_id} API for {site_id}")
+        url = f"{self.endpoints.setup_url}/protectionGroup?siteId={site_id}&virtEnvId={virtenv_id}"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
+            vm_count = json_val['fetchedCount']
+            vm_list = json_val['list']
+            log_body(logger, "Resource group details for resource group by site and virtual env id retrieved with response code %s are %s", response.status_code, body=json_val)
+            return vm_count, vm_list
+        else:
+            logger.error(f"Resource group details not found for resource group by site and virtual env id, Response code is {response.status_code}, response message is {response.text}")
+            return None
+
+    async def get_resource_group_details_by_name(self, session_id, resource_group_name, logger):
+        logger.info(f"Getting resource group details using GET /api/setup/protectionGroup API for {resource_group_name}")
+        site_count, site_list = await self.get_all_resource_group(session_id, logger)
+        if not site_list:
+            logger.error("No resource groups available.")
+            return []
+
+        matching_groups = site_list.find_all("name", resource_group_name)
+
+        if matching_groups:
+            logger.info(f"Found resource group details for {resource_group_name}: {matching_groups}")
+            return matching_groups
+        else:
+            logger.error(f"Resource group details for {resource_group_name} not found")
+            return []
+    
+    async def get_resource_group_id_by_name(self, session_id, resource_group_name, logger):
+        logger.info(f"Getting resource group details using GET /api/setup/protectionGroup API for {resource_group_name}")
+        site_count, site_list = await self.get_all_resource_group(session_id, logger)
+        if not site_list:
+            logger.error("No resource groups available.")
+            return []
+
+        matching_groups = [pg.get("_id") for pg in site_list.find_all("name", resource_group_name)]
+
+        if matching_groups:
+            logger.info(f"Found resource group details for {resource_group_name}: {matching_groups}")
+            return matching_groups
+        else:
+            logger.error(f"Resource group details for {resource_group_name} not found")
+            return []
@@ -0,0 +1,37 @@
+from async_api_wrapper import AsyncAPIWrapper
+from api.api_modules.endpoints import ServerEndpoints
+
+
+class AsyncSessionAPI:
+
+    def __init__(self, logger, shift_server_ip, api=None):
+        self.uri = shift_server_ip
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or AsyncAPIWrapper(logger)
+
+    async def create_drom_session(self, login_id, password):
+        url = self.endpoints.tenant_url + "/session"
+        payload = {
+            "loginId": login_id,
+            "password": password
+        }
+        response_status_code, response_txt, json_dic = await self.api.api_request(method='POST', url=url, json=payload,
+                                                                                  json_key=['session._id'])
+        if response_status_code == 200 and json_dic['session._id'] is not None:
+            return json_dic['session._id']
+        else:
+            raise Exception("Invalid credentials provided.")
+
+    async def end_drom_session(self, session_id):
+        url = self.endpoints.tenant_url + "/session/end"
+        payload = {
+                  "sessionId": "{}".format(session_id)
+                }
+        headers = self.endpoints.headers(session_id)
+        response_status_code, response_txt, json_dic = await self.api.api_request(method='POST', url=url, json=payload,
+                                                                                  headers=headers)
+        self.endpoints.forget_session(session_id)
+        if response_status_code == 200:
+            return True
+        else:
+            return False
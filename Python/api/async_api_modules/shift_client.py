@@ -0,0 +1,41 @@
+from async_api_wrapper import AsyncAPIWrapper
+from api.async_api_modules.blueprint import AsyncBluePrintAPI
+from api.api_modules.endpoints import ServerEndpoints
+from api.async_api_modules.job_monitoring import AsyncJobMonitoring
+from api.async_api_modules.protection_group import AsyncProtectionGroupAPI
+from api.async_api_modules.session import AsyncSessionAPI
+from api.async_api_modules.site import AsyncSiteAPI
+
+
+class AsyncShiftClient:
+    """
+    Async counterpart of ShiftClient, its views share one AsyncAPIWrapper and the precomputed endpoints of the server.
+    """
+
+    def __init__(self, logger, shift_server_ip, session_id=None):
+        self.logger = logger
+        self.uri = shift_server_ip
+        self.session_id = session_id
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = AsyncAPIWrapper(logger)
+        self.session = AsyncSessionAPI(logger, shift_server_ip, api=self.api)
+        self.site = AsyncSiteAPI(logger, shift_server_ip, api=self.api)
+        self.protection_group = AsyncProtectionGroupAPI(logger, shift_server_ip, api=self.api, site_api=self.site)
+        self.blueprint = AsyncBluePrintAPI(logger, shift_server_ip, api=self.api, site_api=self.site,
+                                           resource_group_api=self.protection_group)
+        self.job = AsyncJobMonitoring(logger, shift_server_ip, api=self.api)
+
+    @property
+    def headers(self):
+        return self.endpoints.headers(self.session_id)
+
+    async def login(self, login_id, password):
+        self.session_id = await self.session.create_drom_session(login_id, password)
+        return self.session_id
+
+    async def logout(self):
+        if not self.session_id:
+            return False
+        ended = await self.session.end_drom_session(self.session_id)
+        self.session_id = None
+        return ended
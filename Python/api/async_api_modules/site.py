@@ -0,0 +1,246 @@
+from async_api_wrapper import AsyncAPIWrapper
+from api.api_modules.endpoints import ServerEndpoints
+from api.api_modules.site import SiteAPI, build_site_payload, is_site_discovered
+from utils.polling import PollProfile, async_poll_until
+from utils.inventory import Inventory
+from utils.pagination import async_iter_list_pages
+from utils.log_format import log_body
+
+
+class AsyncSiteAPI:
+
+    # The cache of SiteAPI, so a site created or a cache invalidated by either client is seen by both
+    lookup_cache = SiteAPI.lookup_cache
+
+    def __init__(self, logger, shift_server_ip, api=None):
+        self.uri = shift_server_ip
+        self.endpoints = ServerEndpoints.for_server(shift_server_ip)
+        self.api = api or AsyncAPIWrapper(logger)
+
+    async def _cached_lookup(self, session_id, cache_key, load, logger, use_cache=True):
+        cache_key = (self.uri, session_id) + cache_key
+        if use_cache:
+            cached_value = AsyncSiteAPI.lookup_cache.get(cache_key)
+            if cached_value is not None:
+                logger.debug(f"Site lookup cache hit for {cache_key[2:]}, {self._cache_counts()}")
+                return cached_value
+        # A site created while the lookup runs invalidates the cache, the value loaded before is then not stored
+        generation = AsyncSiteAPI.lookup_cache.generation()
+        value = await load()
+        if value is not None:
+            AsyncSiteAPI.lookup_cache.set(cache_key, value, generation=generation)
+        if use_cache:
+            logger.debug(f"Site lookup cache miss for {cache_key[2:]}, {self._cache_counts()}")
+        return value
+
+    def _cache_counts(self):
+        cache_stats = AsyncSiteAPI.lookup_cache.stats()
+        return f"cache hits: {cache_stats['hits']}, misses: {cache_stats['misses']}"
+
+    def invalidate_site_cache(self):
+        # Sites are shared by every session of the server, so all of its sessions are invalidated
+        AsyncSiteAPI.lookup_cache.invalidate(lambda cache_key: cache_key[0] == self.uri)
+
+    async def add_site(self, session_id, migration_config, logger, site_type='source'):
+        logger.info(f"Creating {site_type} site using POST api/setup/site API for data")
+        url = self.endpoints.setup_url + "/site"
+        headers = self.endpoints.headers(session_id)
+        if not site_type:
+            return None
+
+        payload = build_site_payload(migration_config, site_type)
+
+        response_status_code, response_txt, json_dic = await self.api.api_request(
+            method='POST', 
+            url=url,
+            json=payload,
+            headers=headers,
+            json_key=['_id']
+        )
+        if response_status_code == 200 and json_dic.get('_id') is not None:
+            self.invalidate_site_cache()
+            logger.info(f"{site_type.capitalize()} site id created is {json_dic['_id']}, Response code is {response_status_code}")
+            return json_dic['_id']
+        else:
+            logger.error(f"{site_type.capitalize()} site id not created, Response code is {response_status_code}, response message is {response_txt}")
+            return False
+
+    async def get_site(self, session_id, logger, use_cache=True):
+        return await self._cached_lookup(session_id, ('site',), lambda: self._get_site(session_id, logger), logger,
+                                         use_cache=use_cache)
+
+    async def _get_site(self, session_id, logger):
+        url = self.endpoints.setup_url + "/site"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
+            site_count = json_val['fetchedCount']
+            site_list = Inventory(json_val['list'])
+            logger.info(f"Source site id created, Response code is {response.status_code}")
+            return site_count, site_list
+        else:
+            logger.error(f"Source site id not created, Response code is {response.status_code}, response message is {response.text}")
+            return None
+
+    async def get_vmware_site_details_by_id(self, session_id, site_id, logger, use_cache=True):
+        if site_id:
+            logger.info(f"Getting vmware site details using GET /api/setup/site API for {site_id}")
+            site_count, site_list = await self.get_site(session_id, logger, use_cache=use_cache)
+            if not site_list:
+                return False
+            site = site_list.find('_id', site_id)
+            if site and site['hypervisor'] == 'vmware':
+                log_body(logger, "VMware source site details created are %s", body=site)
+                return site
+            logger.error(f"VMware source site details not created for {site_id}")
+            return False
+        else:
+            logger.error(f"VMware source site details not created as site_id is empty, please check previous logs")
+            return False
+
+    async def get_hyperv_site_details_by_id(self, session_id, site_id, logger, use_cache=True):
+        logger.info(f"Getting hyper-v site details using GET /api/setup/site API for {site_id}")
+        site_count, site_list = await self.get_site(session_id, logger, use_cache=use_cache)
+        if not site_list:
+            return False
+        site = site_list.find('_id', site_id)
+        if site and site['hypervisor'] == 'hyperv':
+            log_body(logger, "Hyper-V destination site details created are %s", body=site)
+            return site
+        logger.error(f"Hyper-V destination site details not created for {site_id}")
+        return False
+
+    async def delete_site(self, session_id, site_id, logger):
+        url = f"{self.endpoints.setup_url}/site/{site_id}"
+        headers = self.endpoints.headers(session_id)
+        response_status_code, response_txt = await self.api.api_request(method='DELETE', url=url, headers=headers)
+        if response_status_code == 200:
+            self.invalidate_site_cache()
+            logger.info(f"Source site {site_id} is deleted using DELETE "
+                        f"/api/setup/site/<site_id> API")
+            return not await self.get_vmware_site_details_by_id(session_id, site_id, logger, use_cache=False)
+        logger.error(f"Source site {site_id} is not deleted using DELETE "
+                     f"/api/setup/site/<site_id> API")
+        return False
+
+    async def get_site_using_site_id(self, session_id, site_id, logger, use_cache=True):
+        return await self._cached_lookup(session_id, ('site', site_id),
+                                         lambda: self._get_site_using_site_id(session_id, site_id, logger), logger,
+                                         use_cache=use_cache)
+
+    async def _get_site_using_site_id(self, session_id, site_id, logger):
+        logger.info(f"Getting vmware site virtual environment details using GET /api/setup/site/<site-id> API for {site_id}")
+        url = f"{self.endpoints.setup_url}/site/{site_id}"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
+            log_body(logger, "VMware site virtual environment details created for site id %s are %s", site_id, body=json_val)
+            return json_val
+        else:
+            logger.error(f"VMware site virtual environment details not created for site id {site_id}")
+            return None
+
+    async def get_vmware_virtual_details_using_site_id(self, session_id, site_id, logger):
+        logger.info(f"Getting vmware site virtual environment details using GET /api/setup/site API for {site_id}")
+        site_list = await self.get_site_using_site_id(session_id, site_id, logger)
+        if not site_list:
+            logger.error(f"VMware site virtual environment details not created for site id {site_id}")
+            return False
+        else:
+            logger.info(f"VMware site virtual environment details created for site id {site_id}")
+            return site_list['virtualizationEnvironments'][0]['_id']
+
+    async def get_unprotected_vm_using_site_id(self, session_id, site_id, virt_id, logger):
+        logger.info(f"Getting unprotected vm details by site id using GET /api/setup/site API for {site_id}")
+        url = f"{self.endpoints.setup_url}/vm/unprotected?siteId={site_id}&virtEnvId={virt_id}"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
+            site_count = json_val['fetchedCount']
+            site_list = Inventory(json_val['list'])
+            log_body(logger, "Unprotected vm details created for site id %s and virtual environment id %s is %s", site_id, virt_id, body=json_val)
+            # find_sibling_and_child_value(site_list,vm_name)
+            return site_count, site_list
+        else:
+            logger.error(f"Unprotected vm details does not contain details related to site id {site_id} and virtual environment id {virt_id}")
+            return None
+
+    async def iter_unprotected_vms(self, session_id, site_id, virt_id, logger, page_size=None):
+        logger.info(f"Iterating unprotected vm details using GET /api/setup/vm/unprotected for site id {site_id} and virtual environment id {virt_id}")
+        url = f"{self.endpoints.setup_url}/vm/unprotected?siteId={site_id}&virtEnvId={virt_id}"
+        headers = self.endpoints.headers(session_id)
+        async for item in async_iter_list_pages(self.api, url, headers, logger, page_size):
+            yield item
+
+    async def wait_for_site_discovery(self, session_id, site_id, logger, timeout=None, site_type='source'):
+        logger.info(f"Waiting for site discovery to complete for site id {site_id}")
+        expected_status = 4
+        profile = PollProfile.from_config("site_discovery", timeout=timeout)
+
+        async def fetch_site_details():
+            if site_type == "source":
+                return await self.get_vmware_site_details_by_id(session_id, site_id, logger, use_cache=False)
+            return await self.get_hyperv_site_details_by_id(session_id, site_id, logger, use_cache=False)
+
+        discovered, site_details, poll_count = await async_poll_until(fetch_site_details, is_site_discovered, profile, logger)
+        if discovered:
+            logger.info(f"Status is {expected_status}. Exiting wait loop for target discovery.")
+            return True
+        logger.error(f"Status is not {expected_status} even after {profile.timeout} secs. Discovery is not completed.")
+        return False
+
+    async def get_resources_by_site_virtenv_id(self, session_id, site_id, virtenv_id, logger, use_cache=True):
+        return await self._cached_lookup(session_id, ('resource', site_id, virtenv_id),
+                                         lambda: self._get_resources_by_site_virtenv_id(session_id, site_id, virtenv_id, logger),
+                                         logger, use_cache=use_cache)
+
+    async def _get_resources_by_site_virtenv_id(self, session_id, site_id, virtenv_id, logger):
+        logger.info(f"Getting resource details by site and virtual env id using GET /api/setup/site API for {site_id} and {virtenv_id}")
+        url = f"{self.endpoints.setup_url}/site/{site_id}/virtEnv/{virtenv_id}/resource"
+        headers = self.endpoints.headers(session_id)
+        response = await self.api.api_request(method='GET', url=url, headers=headers)
+        if response.status_code == 200:
+            json_val = response.json()
+            resource_count = json_val['fetchedCount']
+            resource_list = Inventory(json_val['list'])
+            log_body(logger, "Resource details for site id %s and virtual environment id %s are %s", site_id, virtenv_id, body=json_val)
+            return resource_count, resource_list
+        else:
+            logger.error(f"Resource details for site id {site_id} and virtual environment id {virtenv_id} are not found")
+            return None
+
+    async def iter_resources_by_site_virtenv_id(self, session_id, site_id, virtenv_id, logger, page_size=None):
+        logger.info(f"Iterating resource details using GET /api/setup/site/{site_id}/virtEnv/{virtenv_id}/resource")
+        url = f"{self.endpoints.setup_url}/site/{site_id}/virtEnv/{virtenv_id}/resource"
+        headers = self.endpoints.headers(session_id)
+        async for item in async_iter_list_pages(self.api, url, headers, logger, page_size):
+            yield item
+
+    async def get_resource_details_by_name(self, session_id, resource_name, site_id, virtenv_id, logger):
+        logger.info(f"Getting resource details by name using GET /api/setup/site API for {site_id} and {virtenv_id}")
+        resource_count, resource_list = await self.get_resources_by_site_virtenv_id(session_id, site_id, virtenv_id, logger)
+        if not resource_list:
+            logger.error(f"Resource details for {resource_name} are not found")
+            return False
+        resource = resource_list.find('name', resource_name)
+        if resource:
+            log_body(logger, "Resource details for %s are %s", resource_name, body=resource)
+            return resource
+        logger.error(f"Resource details for {resource_name} are not found")
+        return False
+
+    async def get_site_details_by_name(self, session_id, site_name, logger):
+        logger.info(f"Getting site details by name using GET /api/setup/site API for {site_name}")
+        site_count, site_list = await self.get_site(session_id, logger)
+        if not site_list:
+            logger.error(f"Site details for {site_name} are not found")
+            return False
+        site = site_list.find('name', site_name)
+        if site:
+            log_body(logger, "Site details for %s are %s", site_name, body=site)
+            return site
+        logger.error(f"Site details for {site_name} are not found")
+        return False
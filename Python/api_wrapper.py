@@ -1,8 +1,16 @@
-import json
+import threading
+import time
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
-from utils.parse_json import parse_json
+from conftest import api_wrapper_config
+from utils import json_codec
+from utils.parse_json import extract_json_fields
+from utils.request_metrics import REQUEST_METRICS
+from utils.retry import RETRY_STATS, RetryBudget, RetryPolicy
 
 """
 Api Wrapper class to perform REST API calls using requests library
@@ -10,13 +18,205 @@ Author: Akshay Panambur
 Date: 22/02/2022
 """
 
+SESSION_HEADER = 'netapp-sie-sessionid'
+
+
+def with_session(headers, session_id):
+    return dict(headers, **{SESSION_HEADER: session_id})
+
+
+def is_connect_failure(error):
+    """
+    True when the connection could not be opened, the request never reached the server in that case.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    return isinstance(getattr(error.args[0], 'reason', None) if error.args else None, NewConnectionError)
+
+
+class APIResponse:
+    """
+    Result of an API call. The JSON body is decoded on the first json() call and cached, so every payload is decoded
+    at most once. Unpacks as the (status_code, text, json_dic) tuple, or (status_code, text) for DELETE requests.
+    """
+
+    def __init__(self, status_code, text, json_key=None, with_json_dic=True, empty_json_dic=None, error=None):
+        self.status_code = status_code
+        self.text = text
+        # Exception of a request which got no response, status_code and text are None in that case
+        self.error = error
+        self.json_key = json_key
+        self.with_json_dic = with_json_dic
+        self.empty_json_dic = empty_json_dic
+        self._json = None
+        self._json_decoded = False
+        self._json_dic = None
+
+    def json(self):
+        if not self._json_decoded:
+            self._json = json_codec.loads(self.text)
+            self._json_decoded = True
+        return self._json
+
+    @property
+    def json_dic(self):
+        if self._json_dic is None:
+            self._json_dic = {}
+            if self.json_key and self.text:
+                try:
+                    self._json_dic = extract_json_fields(self.json(), self.json_key)
+                except ValueError:
+                    pass
+        return self._json_dic if self._json_dic else self.empty_json_dic
+
+    def __iter__(self):
+        if self.with_json_dic:
+            return iter((self.status_code, self.text, self.json_dic))
+        return iter((self.status_code, self.text))
+
+    def __repr__(self):
+        if self.error is not None:
+            return "APIResponse(error={!r})".format(self.error)
+        return "APIResponse(status_code={})".format(self.status_code)
+
 
 class APIWrapper:
 
-    def __init__(self, logger):
+    # Pooled keep-alive sessions shared by every APIWrapper instance, keyed by (scheme, host, port)
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+
+    # SessionManager replacing expired Shift sessions, set by SessionManager.start()
+    session_refresher = None
+
+    # Retries of transient failures (502/503/504, connection resets), shared by every APIWrapper instance
+    retry_policy = RetryPolicy.from_config()
+
+    def __init__(self, logger, pool_connections=None, pool_maxsize=None, connect_retries=None):
         self.logger = logger
+        self.pool_connections = pool_connections or api_wrapper_config.pool_connections
+        self.pool_maxsize = pool_maxsize or api_wrapper_config.pool_maxsize
+        self.connect_retries = api_wrapper_config.connect_retries if connect_retries is None else connect_retries
+
+    def _get_session(self, url):
+        parts = urlsplit(url)
+        host_key = (parts.scheme, parts.hostname, parts.port)
+        with APIWrapper._sessions_lock:
+            session = APIWrapper._sessions.get(host_key)
+            if session is None:
+                # The adapter makes a single attempt, every retry (connection failures included) is done by _send
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session = requests.Session()
+                session.headers.update({'Connection': 'keep-alive'})
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                APIWrapper._sessions[host_key] = session
+                self.logger.info("Created pooled session for {}://{}:{} with pool size {}".format(
+                    parts.scheme, parts.hostname, parts.port, self.pool_maxsize))
+        return session
+
+    def _request(self, method, **kwargs):
+        # Every request sent, retries and resends included, is recorded in the per endpoint metrics
+        session = self._get_session(kwargs['url'])
+        start = time.perf_counter()
+        try:
+            response = session.request(method, **kwargs)
+        except Exception as e:
+            REQUEST_METRICS.record(method, kwargs['url'], None, 0, time.perf_counter() - start, error=e)
+            raise
+        latency = time.perf_counter() - start
+        if kwargs.get('stream'):
+            bytes_received = int(response.headers.get('Content-Length') or 0)
+        else:
+            bytes_received = len(response.content or b'')
+        REQUEST_METRICS.record(method, kwargs['url'], response.status_code, bytes_received, latency)
+        return response
+
+    def _send_once(self, method, **kwargs):
+        refresher = APIWrapper.session_refresher
+        session_id = (kwargs.get('headers') or {}).get(SESSION_HEADER)
+        if refresher is None or not session_id:
+            return self._request(method, **kwargs)
+        current_session_id = refresher.current_session(session_id)
+        if current_session_id != session_id:
+            kwargs['headers'] = with_session(kwargs['headers'], current_session_id)
+        response = self._request(method, **kwargs)
+        if response.status_code in api_wrapper_config.reauth_status_codes:
+            new_session_id = refresher.refresh(current_session_id)
+            if new_session_id:
+                self.logger.info("Retrying {} {} with a new session".format(method, kwargs['url']))
+                kwargs['headers'] = with_session(kwargs['headers'], new_session_id)
+                response = self._request(method, **kwargs)
+        return response
+
+    def _send(self, method, idempotent=None, **kwargs):
+        retries = RetryBudget(APIWrapper.retry_policy, method, idempotent, self.connect_retries, self.logger,
+                              kwargs['url'])
+        while True:
+            try:
+                response = self._send_once(method, **kwargs)
+            except (requests.exceptions.ConnectionError, ConnectionResetError) as e:
+                delay = retries.after_error(e, connect_failure=is_connect_failure(e))
+                if delay is None:
+                    raise
+            else:
+                delay = retries.after_status(response.status_code, response.headers.get('Retry-After'))
+                if delay is None:
+                    return response
+            time.sleep(delay)
+
+    @classmethod
+    def retry_stats(cls):
+        return RETRY_STATS.snapshot()
+
+    @classmethod
+    def latency_stats(cls):
+        """
+        Count, errors, bytes received and p50/p95/p99 latency of every "METHOD /endpoint/{id}" requested so far.
+        """
+        return REQUEST_METRICS.snapshot()
+
+    @classmethod
+    def add_request_hook(cls, hook):
+        """
+        Calls hook with the RequestRecord (method, endpoint, url, status_code, bytes_received, latency_secs, error)
+        of every request sent by the sync and async wrappers.
+        """
+        REQUEST_METRICS.add_hook(hook)
+
+    @classmethod
+    def remove_request_hook(cls, hook):
+        REQUEST_METRICS.remove_hook(hook)
+
+    @classmethod
+    def connection_stats(cls):
+        stats = {'requests': 0, 'new_connections': 0, 'reused_connections': 0}
+        with cls._sessions_lock:
+            sessions = list(cls._sessions.values())
+        for session in sessions:
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for pool_key in pools.keys():
+                    pool = pools.get(pool_key)
+                    if pool is None:
+                        continue
+                    stats['requests'] += pool.num_requests
+                    stats['new_connections'] += pool.num_connections
+        stats['reused_connections'] = max(stats['requests'] - stats['new_connections'], 0)
+        return stats
+
+    @classmethod
+    def close_sessions(cls):
+        with cls._sessions_lock:
+            for session in cls._sessions.values():
+                session.close()
+            cls._sessions.clear()
 
     def api_request(self, method='GET', **kwargs):
+        """
+        Performs the request and returns an APIResponse. A request which got no response (connection failure,
+        invalid arguments) returns an APIResponse whose status_code is None and whose error is the exception.
+        """
         try:
             if method.upper() == 'GET':
                 return self._get_request(**kwargs)
@@ -26,90 +226,75 @@ class APIWrapper:
                 return self._put_request(**kwargs)
             elif method.upper() == 'DELETE':
                 return self._delete_request(**kwargs)
+            raise ValueError("Unsupported method {}".format(method))
         except Exception as e:
             self.logger.error("Error {} occurred while performing {} request ".format(e, method))
+            return APIResponse(None, None, error=e)
+
+    @staticmethod
+    def _to_response(response, error, json_key=None, **response_kwargs):
+        if response is None:
+            return APIResponse(None, None, json_key, error=error, **response_kwargs)
+        return APIResponse(response.status_code, response.text, json_key, **response_kwargs)
 
     def _get_request(self, **kwargs):
         response = None
-        json_key = None
-        json_dic = {}
+        error = None
+        json_key = kwargs.pop('json_key', None) or None
         try:
             if self._validate_kwargs(**kwargs) and kwargs['url']:
-                if 'json_key' in kwargs:
-                    if kwargs['json_key']:
-                        json_key = kwargs.pop('json_key')
-            kwargs.setdefault("verify", False)
-            response = requests.get(**kwargs)
-            if json_key is not None:
-                if response.text:
-                    for key in json_key:
-                        json_val = parse_json(json.loads(response.text), key)
-                        json_dic[key] = json_val
+                kwargs.setdefault("verify", False)
+                response = self._send('GET', **kwargs)
         except ConnectionResetError as f:
+            error = f
             self.logger.warning("Error {} occurred while performing get request for {}".format(f, kwargs))
         except Exception as e:
+            error = e
             self.logger.error("Error {} occurred while performing get request for {}".format(e, kwargs))
-        return response.status_code, response.text, json_dic if len(json_dic) > 0 else None
+        return self._to_response(response, error, json_key)
 
     def _post_request(self, **kwargs):
         response = None
-        json_key = None
-        json_dic = {}
+        error = None
+        json_key = kwargs.pop('json_key', None) or None
         try:
-            if self._validate_kwargs(**kwargs):
-                if kwargs['url']:
-                    # if ('json' in kwargs) or ('data' in kwargs and kwargs['data']) or \
-                    #         ('files' in kwargs and kwargs['files']):
-                    if 'json_key' in kwargs:
-                        if kwargs['json_key']:
-                            json_key = kwargs.pop("json_key")
-                    kwargs.setdefault("verify", False)
-                    response = requests.post(**kwargs)
-                    if json_key is not None:
-                        if response.text:
-                            for key in json_key:
-                                json_val = parse_json(json.loads(response.text), key)
-                                json_dic[key] = json_val
+            if self._validate_kwargs(**kwargs) and kwargs['url']:
+                kwargs.setdefault("verify", False)
+                response = self._send('POST', **kwargs)
         except Exception as e:
+            error = e
             self.logger.error("Error {} occurred while performing post request for {}".format(e, kwargs))
-        return response.status_code, response.text, json_dic
+        return self._to_response(response, error, json_key, empty_json_dic={})
 
     def _put_request(self, **kwargs):
         response = None
-        json_key = None
-        json_dic = {}
+        error = None
+        json_key = kwargs.pop('json_key', None) or None
         try:
-            if self._validate_kwargs(**kwargs):
-                if kwargs['url']:
-                    if ('json' in kwargs and kwargs['json']) or ('data' in kwargs and kwargs['data']) or \
-                            ('files' in kwargs and kwargs['files']):
-                        if 'json_key' in kwargs:
-                            if kwargs['json_key']:
-                                json_key = kwargs.pop("json_key")
-                        kwargs.setdefault("verify", False)
-                        response = requests.put(**kwargs)
-                        if json_key is not None:
-                            if response.text:
-                                for key in json_key:
-                                    json_val = parse_json(json.loads(response.text), key)
-                                    json_dic[key] = json_val
+            if self._validate_kwargs(**kwargs) and kwargs['url']:
+                if kwargs.get('json') or kwargs.get('data') or kwargs.get('files'):
+                    kwargs.setdefault("verify", False)
+                    response = self._send('PUT', **kwargs)
         except Exception as e:
+            error = e
             self.logger.error("Error {} occurred while performing put request for {}".format(e, kwargs))
-        return response.status_code, response.text, json_dic
+        return self._to_response(response, error, json_key, empty_json_dic={})
 
     def _delete_request(self, **kwargs):
         response = None
+        error = None
         try:
             if self._validate_kwargs(**kwargs) and kwargs['url']:
                 kwargs.setdefault("verify", False)
-                response = requests.delete(**kwargs)
+                response = self._send('DELETE', **kwargs)
         except Exception as e:
+            error = e
             self.logger.error("Error {} occurred while performing delete request for {}".format(e, kwargs))
-        return response.status_code, response.text
+        return self._to_response(response, error, with_json_dic=False)
 
     def _validate_kwargs(self, **kwargs):
         standard_args = ["method", "url", "params", "data", "json", "headers", "cookies", "files", "auth", "timeout",
-                         "allow_redirects", "proxies", "verify", "stream", "cert", "json_key"]
+                         "allow_redirects", "proxies", "verify", "stream", "cert", "json_key", "idempotent"]
         flag = False
         try:
             non_standard_args = [key for key in kwargs.keys() if key not in standard_args]
@@ -0,0 +1,214 @@
+import asyncio
+import time
+
+import aiohttp
+
+from api_wrapper import SESSION_HEADER, APIResponse, APIWrapper, with_session
+from conftest import api_wrapper_config
+from utils.request_metrics import REQUEST_METRICS
+from utils.retry import RetryBudget
+
+"""
+Async counterpart of APIWrapper to perform REST API calls on an asyncio event loop using aiohttp.
+Every request returns the same APIResponse as APIWrapper, with the same retry budgets (utils/retry.py) and the same
+replacement of expired sessions through APIWrapper.session_refresher.
+"""
+
+
+async def _close_on_loop_exit(loop, session):
+    # Waits until it is cancelled, which asyncio.run() does to the tasks still pending when its coroutine returns, so
+    # the session of a finished loop is closed and the loop is not referenced any more
+    try:
+        await asyncio.Event().wait()
+    finally:
+        entry = AsyncAPIWrapper._sessions.get(loop)
+        if entry is not None and entry[0] is session:
+            del AsyncAPIWrapper._sessions[loop]
+        await session.close()
+
+
+class AsyncAPIWrapper:
+
+    # (session, closing task) per event loop, the connector of the aiohttp session keeps a keep-alive pool per host.
+    # The entry of a loop lives until the loop finishes or close_sessions() is called on it.
+    _sessions = {}
+
+    def __init__(self, logger, pool_maxsize=None, connect_retries=None):
+        self.logger = logger
+        self.pool_maxsize = pool_maxsize or api_wrapper_config.pool_maxsize
+        self.connect_retries = api_wrapper_config.connect_retries if connect_retries is None else connect_retries
+
+    def _get_session(self):
+        loop = asyncio.get_running_loop()
+        entry = AsyncAPIWrapper._sessions.get(loop)
+        if entry is None or entry[0].closed:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_maxsize)
+            session = aiohttp.ClientSession(connector=connector)
+            # The task is kept in the entry, the loop itself only holds a weak reference to it
+            entry = AsyncAPIWrapper._sessions[loop] = (session, loop.create_task(_close_on_loop_exit(loop, session)))
+        return entry[0]
+
+    @classmethod
+    async def close_sessions(cls):
+        """
+        Closes the session of the running loop. Not needed with asyncio.run(), which closes it when the loop finishes.
+        """
+        entry = cls._sessions.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            session, closer = entry
+            closer.cancel()
+            await session.close()
+
+    async def aclose(self):
+        await AsyncAPIWrapper.close_sessions()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def api_request(self, method='GET', **kwargs):
+        try:
+            if method.upper() == 'GET':
+                return await self._get_request(**kwargs)
+            elif method.upper() == 'POST':
+                return await self._post_request(**kwargs)
+            elif method.upper() == 'PUT':
+                return await self._put_request(**kwargs)
+            elif method.upper() == 'DELETE':
+                return await self._delete_request(**kwargs)
+            raise ValueError("Unsupported method {}".format(method))
+        except Exception as e:
+            self.logger.error("Error {} occurred while performing {} request ".format(e, method))
+            return APIResponse(None, None, error=e)
+
+    async def _request(self, method, url, request_kwargs):
+        # Every request sent, retries and resends included, is recorded in the per endpoint metrics
+        start = time.perf_counter()
+        try:
+            async with self._get_session().request(method, url, **request_kwargs) as response:
+                body = await response.read()
+                status, text = response.status, await response.text()
+                retry_after = response.headers.get('Retry-After')
+        except Exception as e:
+            REQUEST_METRICS.record(method, url, None, 0, time.perf_counter() - start, error=e)
+            raise
+        REQUEST_METRICS.record(method, url, status, len(body), time.perf_counter() - start)
+        return status, text, retry_after
+
+    async def _send_once(self, method, url, request_kwargs):
+        # Same session handling as APIWrapper._send_once, the blocking login of a refresh runs on a worker thread
+        refresher = APIWrapper.session_refresher
+        session_id = (request_kwargs.get('headers') or {}).get(SESSION_HEADER)
+        if refresher is None or not session_id:
+            return await self._request(method, url, request_kwargs)
+        current_session_id = refresher.current_session(session_id)
+        if current_session_id != session_id:
+            request_kwargs = dict(request_kwargs, headers=with_session(request_kwargs['headers'], current_session_id))
+        result = await self._request(method, url, request_kwargs)
+        if result[0] in api_wrapper_config.reauth_status_codes:
+            new_session_id = await asyncio.to_thread(refresher.refresh, current_session_id)
+            if new_session_id:
+                self.logger.info("Retrying {} {} with a new session".format(method, url))
+                request_kwargs = dict(request_kwargs, headers=with_session(request_kwargs['headers'], new_session_id))
+                result = await self._request(method, url, request_kwargs)
+        return result
+
+    async def _send(self, method, idempotent=None, **kwargs):
+        url = kwargs.pop('url')
+        request_kwargs = self._to_aiohttp_kwargs(**kwargs)
+        retries = RetryBudget(APIWrapper.retry_policy, method, idempotent, self.connect_retries, self.logger, url)
+        while True:
+            try:
+                status, text, retry_after = await self._send_once(method, url, request_kwargs)
+            except aiohttp.ClientConnectorError as e:
+                delay = retries.after_error(e, connect_failure=True)
+                if delay is None:
+                    raise
+            except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError, ConnectionResetError) as e:
+                delay = retries.after_error(e)
+                if delay is None:
+                    raise
+            else:
+                delay = retries.after_status(status, retry_after)
+                if delay is None:
+                    return status, text
+            await asyncio.sleep(delay)
+
+    def _to_aiohttp_kwargs(self, **kwargs):
+        for unsupported in ('files', 'cert', 'stream'):
+            if kwargs.pop(unsupported, None):
+                raise KeyError("Keyword {} is not supported by AsyncAPIWrapper".format(unsupported))
+        verify = kwargs.pop('verify', False)
+        kwargs['ssl'] = None if verify else False
+        if kwargs.get('timeout') is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=kwargs['timeout'])
+        if isinstance(kwargs.get('auth'), tuple):
+            kwargs['auth'] = aiohttp.BasicAuth(*kwargs['auth'])
+        proxies = kwargs.pop('proxies', None)
+        if proxies:
+            kwargs['proxy'] = proxies.get('https') or proxies.get('http')
+        return {key: value for key, value in kwargs.items() if value is not None}
+
+    async def _get_request(self, **kwargs):
+        response_status_code, response_txt, error = None, None, None
+        try:
+            json_key = kwargs.pop('json_key', None) or None
+            if self._validate_kwargs(**kwargs) and kwargs['url']:
+                response_status_code, response_txt = await self._send('GET', **kwargs)
+        except ConnectionResetError as f:
+            error = f
+            self.logger.warning("Error {} occurred while performing get request for {}".format(f, kwargs))
+        except Exception as e:
+            error = e
+            self.logger.error("Error {} occurred while performing get request for {}".format(e, kwargs))
+        return APIResponse(response_status_code, response_txt, json_key, error=error)
+
+    async def _post_request(self, **kwargs):
+        response_status_code, response_txt, error = None, None, None
+        try:
+            json_key = kwargs.pop('json_key', None) or None
+            if self._validate_kwargs(**kwargs) and kwargs['url']:
+                response_status_code, response_txt = await self._send('POST', **kwargs)
+        except Exception as e:
+            error = e
+            self.logger.error("Error {} occurred while performing post request for {}".format(e, kwargs))
+        return APIResponse(response_status_code, response_txt, json_key, empty_json_dic={}, error=error)
+
+    async def _put_request(self, **kwargs):
+        response_status_code, response_txt, error = None, None, None
+        try:
+            json_key = kwargs.pop('json_key', None) or None
+            if self._validate_kwargs(**kwargs) and kwargs['url']:
+                if kwargs.get('json') or kwargs.get('data') or kwargs.get('files'):
+                    response_status_code, response_txt = await self._send('PUT', **kwargs)
+        except Exception as e:
+            error = e
+            self.logger.error("Error {} occurred while performing put request for {}".format(e, kwargs))
+        return APIResponse(response_status_code, response_txt, json_key, empty_json_dic={}, error=error)
+
+    async def _delete_request(self, **kwargs):
+        response_status_code, response_txt, error = None, None, None
+        try:
+            if self._validate_kwargs(**kwargs) and kwargs['url']:
+                response_status_code, response_txt = await self._send('DELETE', **kwargs)
+        except Exception as e:
+            error = e
+            self.logger.error("Error {} occurred while performing delete request for {}".format(e, kwargs))
+        return APIResponse(response_status_code, response_txt, with_json_dic=False, error=error)
+
+    def _validate_kwargs(self, **kwargs):
+        standard_args = ["method", "url", "params", "data", "json", "headers", "cookies", "files", "auth", "timeout",
+                         "allow_redirects", "proxies", "verify", "stream", "cert", "json_key", "idempotent"]
+        flag = False
+        try:
+            non_standard_args = [key for key in kwargs.keys() if key not in standard_args]
+            if not len(non_standard_args):
+                flag = True
+            else:
+                self.logger.error("Keywords are invalid {}".format(non_standard_args))
+                raise KeyError("Keywords are invalid: {}".format(non_standard_args))
+        except Exception as e:
+            self.logger.error("Error occurred while validating the keyword arguments {}".format(e))
+        return flag
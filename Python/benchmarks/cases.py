@@ -0,0 +1,151 @@
+import logging
+
+from api_wrapper import APIResponse
+from api.api_modules.blueprint import BluePrintAPI, build_blueprint_payload
+from api.api_modules.endpoints import ServerEndpoints
+from api.api_modules.protection_group import (ProtectionGroupAPI, build_resource_group_payload,
+                                              group_vm_details_by_resource_group)
+from api.api_modules.site import SiteAPI
+from benchmarks import inventories
+from utils.inventory import Inventory
+from utils.parse_json import find_item_with_key_value, find_sibling_and_child_value, parse_json
+
+"""
+Benchmark cases of the client paths whose cost grows with the inventory size. Each case is a setup function taking
+the inventory size and returning the callable to measure, so building the synthetic inventory is not measured.
+"""
+
+SHIFT_SERVER_IP = "http://benchmark"
+SETUP_URL = ServerEndpoints.for_server(SHIFT_SERVER_IP).setup_url
+
+# The measured code logs at info level, its records are dropped so the log handlers are not measured
+quiet_logger = logging.getLogger("Benchmarks.Cases")
+quiet_logger.addHandler(logging.NullHandler())
+quiet_logger.setLevel(logging.WARNING)
+quiet_logger.propagate = False
+
+
+class CannedAPI:
+    """
+    Stands in for APIWrapper: answers every request with the prepared response text of its URL, so the lookups
+    decode and index the full list as they do with a real server, without the network.
+    """
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    def api_request(self, method, url, json_key=None, **kwargs):
+        text = self.responses.get(url)
+        if text is None:
+            return APIResponse(404, '{"message": "not found"}', json_key)
+        return APIResponse(200, text, json_key)
+
+
+def selected_vm_count(size):
+    # A migration wave moves a tenth of the inventory
+    return max(10, size // 10)
+
+
+def setup_parse_json(size):
+    # The key comes after the list, so the whole list is walked before it is found
+    body = {"list": inventories.make_vms(size), "fetchedCount": size}
+    return lambda: parse_json(body, "fetchedCount")
+
+
+def setup_find_item_with_key_value(size):
+    body = inventories.list_body(inventories.make_vms(size))
+    name = inventories.vm_name(size - 1)
+    return lambda: find_item_with_key_value(body, "name", name)
+
+
+def setup_find_sibling_and_child_value(size):
+    body = inventories.list_body(inventories.make_vms(size))
+    name = inventories.vm_name(size - 1)
+    return lambda: find_sibling_and_child_value(body, "name", name, "_id")
+
+
+def setup_resource_group_payload(size):
+    vms = inventories.make_vms(size)
+    migration_config = inventories.make_migration_config(vms[:selected_vm_count(size)],
+                                                         inventories.make_resources(64))
+    groups = group_vm_details_by_resource_group(migration_config, quiet_logger)
+    vm_names = {vm["name"] for vm in migration_config["vm_details"]}
+
+    def run():
+        # Same steps as ProtectionGroupAPI.create_resource_group once the unprotected VMs are fetched
+        vm_list = Inventory(vm for vm in vms if vm.get("name") in vm_names)
+        return [build_resource_group_payload(resource_group_name, vm_details_group, vm_list, "source-site",
+                                             "source-virtenv", "target-site", "target-virtenv", migration_config)
+                for resource_group_name, vm_details_group in groups.items()]
+    return run
+
+
+def setup_blueprint_payload(size):
+    selected_vms = inventories.make_vms(selected_vm_count(size))
+    source_resources = inventories.make_resources(size, prefix="source")
+    target_resources = inventories.make_resources(size, prefix="target")
+    migration_config = inventories.make_migration_config(selected_vms, source_resources)
+    group_count = len({vm["resource_group_name"] for vm in migration_config["vm_details"]})
+    resource_groups = inventories.make_resource_groups(group_count, selected_vms)
+
+    def run():
+        # build_blueprint_payload stores the resolved VM ids in vm_details, each run starts from unresolved ones
+        config = dict(migration_config, vm_details=[dict(vm_detail) for vm_detail in migration_config["vm_details"]])
+        return build_blueprint_payload(config, "source-site", "source-virtenv", "target-site", "target-virtenv",
+                                       resource_groups, source_resources, target_resources, quiet_logger)
+    return run
+
+
+def setup_get_site_details_by_name(size):
+    sites = inventories.make_sites(size)
+    api = CannedAPI({f"{SETUP_URL}/site": inventories.list_response_text(sites)})
+    site_api = SiteAPI(quiet_logger, SHIFT_SERVER_IP, api=api)
+    name = sites[-1]["name"]
+
+    def run():
+        site_api.invalidate_site_cache()
+        return site_api.get_site_details_by_name("session", name, quiet_logger)
+    return run
+
+
+def setup_get_resource_details_by_name(size):
+    resources = inventories.make_resources(size)
+    url = f"{SETUP_URL}/site/source-site/virtEnv/source-virtenv/resource"
+    site_api = SiteAPI(quiet_logger, SHIFT_SERVER_IP,
+                       api=CannedAPI({url: inventories.list_response_text(resources)}))
+    name = resources[-1]["name"]
+
+    def run():
+        site_api.invalidate_site_cache()
+        return site_api.get_resource_details_by_name("session", name, "source-site", "source-virtenv", quiet_logger)
+    return run
+
+
+def setup_get_resource_group_details_by_name(size):
+    resource_groups = inventories.make_resource_groups(size, inventories.make_vms(min(size, 1000)))
+    api = CannedAPI({f"{SETUP_URL}/protectiongroup":
+                     inventories.list_response_text(resource_groups)})
+    resource_group_api = ProtectionGroupAPI(quiet_logger, SHIFT_SERVER_IP, api=api)
+    name = resource_groups[-1]["name"]
+    return lambda: resource_group_api.get_resource_group_details_by_name("session", name, quiet_logger)
+
+
+def setup_get_blueprint_id_by_name(size):
+    blueprints = inventories.make_blueprints(size)
+    api = CannedAPI({f"{SETUP_URL}/drplan": inventories.list_response_text(blueprints)})
+    blueprint_api = BluePrintAPI(quiet_logger, SHIFT_SERVER_IP, api=api)
+    name = blueprints[-1]["name"]
+    return lambda: blueprint_api.get_blueprint_id_by_name("session", name, quiet_logger)
+
+
+CASES = {
+    "parse_json": setup_parse_json,
+    "find_item_with_key_value": setup_find_item_with_key_value,
+    "find_sibling_and_child_value": setup_find_sibling_and_child_value,
+    "resource_group_payload": setup_resource_group_payload,
+    "blueprint_payload": setup_blueprint_payload,
+    "get_site_details_by_name": setup_get_site_details_by_name,
+    "get_resource_details_by_name": setup_get_resource_details_by_name,
+    "get_resource_group_details_by_name": setup_get_resource_group_details_by_name,
+    "get_blueprint_id_by_name": setup_get_blueprint_id_by_name,
+}
@@ -0,0 +1,135 @@
+import json
+import uuid
+
+"""
+Synthetic Shift inventories for the benchmarks: VMs, site resources, sites, resource groups and blueprints shaped
+like the list responses of the API, and migration configs referencing them. Names are deterministic so the same
+size always builds the same inventory.
+"""
+
+PORT_GROUP_TYPES = ("DISTRIBUTED_PORTGROUP", "STANDARD_PORTGROUP")
+
+
+def object_id(kind, index):
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{kind}-{index}"))
+
+
+def vm_name(index):
+    return f"vm{index:06d}"
+
+
+def network_name(index):
+    return f"network{index:06d}"
+
+
+def make_vms(count, site_id="source-site", virt_env_id="source-virtenv"):
+    return [{
+        "_id": object_id("vm", index),
+        "name": vm_name(index),
+        "site": {"_id": site_id},
+        "virtEnv": {"_id": virt_env_id},
+        "guestOS": "linux" if index % 2 else "windows",
+        "numCPUs": 2,
+        "memoryMB": 4096,
+        "disks": [{"name": f"disk{disk}", "capacityBytes": 42949672960} for disk in range(2)],
+        "nics": [{"macAddress": f"00:50:56:{index % 256:02x}:00:01", "network": network_name(index % 64)}],
+    } for index in range(count)]
+
+
+def make_resources(count, prefix="source"):
+    """
+    Distributed and standard port groups with the same names plus datastores, as the resource list of a site.
+    """
+    resources = []
+    for index in range(count):
+        kind = index % 3
+        if kind < 2:
+            resources.append({
+                "_id": object_id(f"{prefix}-resource", index),
+                "name": network_name(index // 3),
+                "uuid": object_id(f"{prefix}-portgroup", index),
+                "providerParams": {"type": PORT_GROUP_TYPES[kind]},
+            })
+        else:
+            resources.append({
+                "_id": object_id(f"{prefix}-resource", index),
+                "name": f"{prefix}-datastore{index // 3:06d}",
+                "providerParams": {"type": "DATASTORE"},
+            })
+    return resources
+
+
+def make_sites(count):
+    return [{
+        "_id": object_id("site", index),
+        "name": f"site{index:06d}",
+        "siteType": "source" if index % 2 else "destination",
+        "virtualizationEnvironments": [{"_id": object_id("virtenv", index), "type": "vmware"}],
+    } for index in range(count)]
+
+
+def make_resource_groups(count, vms, group_size=10):
+    groups = []
+    for index in range(count):
+        members = vms[index * group_size % len(vms):][:group_size] if vms else []
+        groups.append({
+            "_id": object_id("protectiongroup", index),
+            "name": f"rg{index:06d}",
+            "vms": [{"_id": vm["_id"], "name": vm["name"]} for vm in members],
+        })
+    return groups
+
+
+def make_blueprints(count):
+    return [{
+        "_id": object_id("drplan", index),
+        "name": f"bp{index:06d}",
+        "protectionGroups": [{"_id": object_id("protectiongroup", index)}],
+        "rpoSeconds": 0,
+        "rtoSeconds": 0,
+    } for index in range(count)]
+
+
+def make_migration_config(vms, resources, group_size=10):
+    """
+    Migration config of the given VMs, grouped into resource groups of group_size VMs, with networks and mappings
+    taken from the resources.
+    """
+    network_names = sorted({resource["name"] for resource in resources
+                            if resource["providerParams"]["type"] == "DISTRIBUTED_PORTGROUP"})
+    vm_details = []
+    for index, vm in enumerate(vms):
+        vm_details.append({
+            "name": vm["name"],
+            "resource_group_name": f"rg{index // group_size:06d}",
+            "boot_order": index % 5,
+            "delay": 0,
+            "datastore_name": "datastore1",
+            "qtree_name": "qtree1",
+            "networkDetails": [network_names[index % len(network_names)]] if network_names else [],
+            "numCPUs": vm["numCPUs"],
+            "memoryMB": vm["memoryMB"],
+            "ip": "dhcp",
+            "powerOnFlag": True,
+        })
+    return {
+        "blueprint_name": "benchmark-blueprint",
+        "source_site_name": "site000001",
+        "destination_site_name": "site000000",
+        "vm_details": vm_details,
+        "mappings": {name: name for name in network_names[:16]},
+        "migration_mode": "clone_based_migration",
+        "ip_type": "do_not_change",
+        "windows_loginId": "administrator",
+        "windows_password": "password",
+        "linux_loginId": "root",
+        "linux_password": "password",
+    }
+
+
+def list_body(items):
+    return {"fetchedCount": len(items), "list": items}
+
+
+def list_response_text(items):
+    return json.dumps(list_body(items))
@@ -0,0 +1,161 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.cases import CASES
+from conftest import benchmarks_config
+from log_config import benchmarks_logger
+
+"""
+Runs the benchmark cases for each inventory size and reports the time per call and the peak memory allocated by a
+call. Every run is appended to the history file with the commit it was measured on, and compared with the previous
+run so a regression in a path that scales with the inventory size is reported.
+
+Run from the Python folder: python -m benchmarks.run_benchmarks [--cases parse_json ...] [--sizes 100 1000 ...]
+"""
+
+logger = benchmarks_logger()
+
+
+def measure(run, repeat):
+    """
+    Time of one call of run, best and median of repeat rounds, each round long enough (at least 0.2 secs) for the
+    timer resolution not to matter, and the peak memory allocated by one call.
+    """
+    timer = timeit.Timer(run)
+    loops, _ = timer.autorange()
+    round_times = [elapsed / loops for elapsed in timer.repeat(repeat=repeat, number=loops)]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "best_secs": min(round_times),
+        "median_secs": statistics.median(round_times),
+        "peak_kb": round(peak_bytes / 1024, 1),
+        "loops": loops,
+    }
+
+
+def run_benchmarks(case_names, sizes, repeat):
+    results = {}
+    for case_name in case_names:
+        setup = CASES[case_name]
+        for size in sizes:
+            run = setup(size)
+            result = measure(run, repeat)
+            results[f"{case_name}[{size}]"] = result
+            logger.info(f"{case_name:<36} size {size:>6}  best {format_secs(result['best_secs']):>10}  "
+                        f"median {format_secs(result['median_secs']):>10}  peak {result['peak_kb']:>10.1f} KB")
+            del run
+            gc.collect()
+    return results
+
+
+def format_secs(secs):
+    if secs < 1e-3:
+        return f"{secs * 1e6:.1f} us"
+    if secs < 1:
+        return f"{secs * 1e3:.2f} ms"
+    return f"{secs:.2f} s"
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(history_file):
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_run(history_file, results):
+    os.makedirs(os.path.dirname(history_file) or ".", exist_ok=True)
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "results": results,
+    }
+    with open(history_file, "a") as f:
+        f.write(json.dumps(run) + "\n")
+    return run
+
+
+def latest_results(history):
+    """
+    Latest recorded result of every case and size, runs of a subset of the cases do not hide the older ones.
+    """
+    latest = {}
+    for run in history:
+        for key, result in run["results"].items():
+            latest[key] = dict(result, timestamp=run["timestamp"], commit=run["commit"])
+    return latest
+
+
+def find_regressions(previous_results, results, threshold):
+    """
+    Cases whose best time or peak memory grew by more than threshold (a fraction) since they were last recorded.
+    """
+    regressions = []
+    for key, result in results.items():
+        previous = previous_results.get(key)
+        if not previous:
+            continue
+        for metric in ("best_secs", "peak_kb"):
+            if previous[metric] and result[metric] > previous[metric] * (1 + threshold):
+                regressions.append((key, metric, previous, result[metric]))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks of the client paths that scale with the inventory size")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES),
+                        help="Cases to run, all of them by default")
+    parser.add_argument("--sizes", nargs="+", type=int, default=None,
+                        help="Inventory sizes, the sizes under 'benchmarks' in Config.yml by default")
+    parser.add_argument("--repeat", type=int, default=None, help="Timed rounds per case and size")
+    parser.add_argument("--history-file", default=None, help="JSON lines file the runs are appended to")
+    parser.add_argument("--no-save", action="store_true", help="Compare with the history without recording the run")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 when a case regressed since the previous run")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sizes = args.sizes or benchmarks_config.sizes
+    history_file = args.history_file or benchmarks_config.history_file
+    results = run_benchmarks(args.cases, sizes, args.repeat or benchmarks_config.repeat)
+
+    previous_results = latest_results(load_history(history_file))
+    regressions = find_regressions(previous_results, results, benchmarks_config.regression_threshold)
+    for key, metric, previous, value in regressions:
+        logger.warning(f"Regression in {key}: {metric} went from {previous[metric]} (commit {previous['commit']}, "
+                       f"{previous['timestamp']}) to {value}")
+    if previous_results and not regressions:
+        logger.info(f"No regression above {benchmarks_config.regression_threshold:.0%} since the recorded results")
+    if not args.no_save:
+        save_run(history_file, results)
+        logger.info(f"Results appended to {history_file}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
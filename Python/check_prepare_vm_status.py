@@ -2,7 +2,8 @@ import logging
 from utils.json_parser import json_parser
 from api.api_modules.blueprint import BluePrintAPI
 from api.api_modules.job_monitoring import JobMonitoring
-from api.api_modules.session import SessionAPI
+from api.api_modules.session_manager import SessionManager
+from api.api_modules.status_watcher import BlueprintStatusWatcher
 from conftest import check_prepare_vm_status_config
 from log_config import check_prepare_vm_status_logger
 
@@ -12,7 +13,8 @@ logger.setLevel(logging.INFO)
 def check_prepare_vm_status(session_id, blueprint_name, shift_server_ip):
     blueprint_api = BluePrintAPI(logger, shift_server_ip)
     blueprint_id = blueprint_api.get_blueprint_id_by_name(session_id, blueprint_name, logger)
-    prepare_vm_status = blueprint_api.wait_for_prepare_vm_execution(session_id, blueprint_id, logger)
+    with BlueprintStatusWatcher.acquire(logger, shift_server_ip, session_id) as status_watcher:
+        prepare_vm_status = blueprint_api.wait_for_prepare_vm_execution(session_id, blueprint_id, logger, watcher=status_watcher)
     logger.info(f"Status of Prepare VM is {prepare_vm_status} for blueprint {blueprint_id}")
     if not prepare_vm_status:
         logger.error(f"Prepare VM for blueprint id {blueprint_id} did not complete successfully.")
@@ -23,6 +25,7 @@ def check_prepare_vm_status(session_id, blueprint_name, shift_server_ip):
 if __name__ == "__main__":
     config_data = json_parser(check_prepare_vm_status_config.ifile)
     executions = config_data.get("executions", [])
+    session_manager = SessionManager(logger).start()
     try:
         for idx, prepare_vm_config_data in enumerate(executions, 1):
             logger.info(f"Starting prepare VM workflow {idx}")
@@ -38,18 +41,16 @@ if __name__ == "__main__":
                 logger.error(f"Missing blueprint id for prepare VM check index {idx}. Skipping this prepare VM.")
                 continue
 
-            shift_api = SessionAPI(logger, prepare_vm_config_data.get("shift_server_ip"))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
+            session_id = session_manager.get_session(prepare_vm_config_data.get("shift_server_ip"), shift_username, shift_password)
             if not session_id:
                 logger.error(f"Failed to create session for prepare VM index {idx}. Skipping this prepare VM.")
                 continue
 
             status = check_prepare_vm_status(session_id, blueprint_name, prepare_vm_config_data.get("shift_server_ip"))
 
-            shift_api.end_drom_session(session_id)
-
     except Exception as ex:
         logger.error(f"An error occurred during prepare VMs: {ex}")
 
     finally:
+        session_manager.close()
         logger.info("Please find the logs of the execution in the latest file of the logs folder")
@@ -29,6 +29,7 @@ try:
         
     class shift_api_automation_config():
         ifile = source_dir + cfg["shift_api_automation"]["ifile"]
+        max_workers = cfg["shift_api_automation"]["max_workers"]
         
     class trigger_migration_config():
         ifile = source_dir + cfg["trigger_migration"]["ifile"] 
@@ -39,5 +40,71 @@ try:
     class get_site_config():
         ifile = source_dir + cfg["get_site"]["ifile"]
 
+    class api_wrapper_config():
+        pool_connections = cfg["api_wrapper"]["pool_connections"]
+        pool_maxsize = cfg["api_wrapper"]["pool_maxsize"]
+        connect_retries = cfg["api_wrapper"]["connect_retries"]
+        reauth_status_codes = cfg["api_wrapper"]["reauth_status_codes"]
+
+    class api_retry_config():
+        max_retries = cfg["api_retry"]["max_retries"]
+        status_codes = cfg["api_retry"]["status_codes"]
+        backoff_factor = cfg["api_retry"]["backoff_factor"]
+        max_backoff = cfg["api_retry"]["max_backoff"]
+
+    class site_cache_config():
+        ttl = cfg["site_cache"]["ttl"]
+
+    class status_watcher_config():
+        interval = cfg["status_watcher"]["interval"]
+        max_failures = cfg["status_watcher"]["max_failures"]
+
+    class polling_config():
+        profiles = cfg["polling"]
+
+    class pagination_config():
+        page_size = cfg["pagination"]["page_size"]
+        offset_param = cfg["pagination"]["offset_param"]
+        limit_param = cfg["pagination"]["limit_param"]
+
+    class protection_group_config():
+        max_concurrent_creates = cfg["protection_group"]["max_concurrent_creates"]
+
+    class checkpoint_config():
+        enabled = cfg["checkpoint"]["enabled"]
+        folder = cfg["checkpoint"]["folder"]
+
+    class mock_shift_server_config():
+        host = cfg["mock_shift_server"]["host"]
+        latency = cfg["mock_shift_server"]["latency"]
+        latency_jitter = cfg["mock_shift_server"]["latency_jitter"]
+        failure_rate = cfg["mock_shift_server"]["failure_rate"]
+        failure_status = cfg["mock_shift_server"]["failure_status"]
+        vms_per_site = cfg["mock_shift_server"]["vms_per_site"]
+        networks_per_site = cfg["mock_shift_server"]["networks_per_site"]
+        discovery_secs = cfg["mock_shift_server"]["discovery_secs"]
+        compliance_secs = cfg["mock_shift_server"]["compliance_secs"]
+        execution_secs = cfg["mock_shift_server"]["execution_secs"]
+        session_ttl = cfg["mock_shift_server"]["session_ttl"]
+
+    class benchmarks_config():
+        sizes = cfg["benchmarks"]["sizes"]
+        repeat = cfg["benchmarks"]["repeat"]
+        history_file = cfg["benchmarks"]["history_file"]
+        regression_threshold = cfg["benchmarks"]["regression_threshold"]
+
+    class metrics_config():
+        host = cfg["metrics"]["host"]
+        http_port = cfg["metrics"]["http_port"]
+        file = cfg["metrics"]["file"]
+        flush_interval = cfg["metrics"]["flush_interval"]
+
+    class logging_config():
+        file = cfg["logging"]["file"]
+        max_bytes = cfg["logging"]["max_bytes"]
+        backup_count = cfg["logging"]["backup_count"]
+        compress = cfg["logging"]["compress"]
+        console = cfg["logging"]["console"]
+
 except Exception as e:
     logger.error("Exception {} occurred while parsing config file")
@@ -1,9 +1,10 @@
 import logging
 from utils.json_parser import json_parser
 from api.api_modules.blueprint import BluePrintAPI
-from api.api_modules.session import SessionAPI
+from api.api_modules.session_manager import SessionManager
 from conftest import create_blueprint_config
 from log_config import create_blueprint_logger
+from utils.log_format import log_body
 
 logger = create_blueprint_logger()
 logger.setLevel(logging.INFO)
@@ -21,12 +22,13 @@ def create_blueprint(session_id, create_blueprint_config, migration_mode):
     if not blueprint_details:
         logger.error(f"Blueprint details for blueprint {blueprint_id} are not present using GET /api/setup/compliance/drplan API")
     else:
-        logger.info(f"Verified blueprint details: {blueprint_details}")
+        log_body(logger, "Verified blueprint details: %s", body=blueprint_details)
     return blueprint_id
 
 if __name__ == "__main__":
     config_data = json_parser(create_blueprint_config.ifile)
     executions = config_data.get("executions", [])
+    session_manager = SessionManager(logger).start()
     try:
         for idx, create_blueprint_config_data in enumerate(executions, 1):
             logger.info(f"Starting blueprint creation workflow {idx}")
@@ -39,8 +41,7 @@ if __name__ == "__main__":
 
             migration_mode = create_blueprint_config_data.get("migration_mode", "full")
 
-            shift_api = SessionAPI(logger, create_blueprint_config_data.get("shift_server_ip"))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
+            session_id = session_manager.get_session(create_blueprint_config_data.get("shift_server_ip"), shift_username, shift_password)
             if not session_id:
                 logger.error(f"Failed to create session for create blueprint index {idx}. Skipping this create blueprint.")
                 continue
@@ -50,9 +51,8 @@ if __name__ == "__main__":
                 logger.info(f"Successfully processed blueprint creation for create blueprint index {idx}")
             else:
                 logger.error(f"Blueprint creation unsuccessful for create blueprint index {idx}")
-
-            shift_api.end_drom_session(session_id)
     except Exception as ex:
         logger.error(f"An error occurred during blueprint creation workflows: {ex}")
     finally:
+        session_manager.close()
         logger.info("Please find the logs of the execution in the latest file of the logs folder")
@@ -2,16 +2,13 @@ import logging
 from conftest import get_site_config
 from utils.json_parser import json_parser
 from api.api_modules.site import SiteAPI
-from api.api_modules.session import SessionAPI
+from api.api_modules.session_manager import SessionManager
 from log_config import get_site_logger
+from utils.log_format import log_body
 
 logger = get_site_logger()
 logger.info("Get Site workflow started")
 logger.setLevel(logging.INFO)
-ch = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-ch.setFormatter(formatter)
-logger.addHandler(ch)
 
 def get_site_details(session_id, get_site_config_data):
     result = False
@@ -22,7 +19,7 @@ def get_site_details(session_id, get_site_config_data):
         result = False
     else:
         logger.info(f"Site details fetched successfully")
-        logger.info(f"Site details: {site_details}")
+        log_body(logger, "Site details: %s", body=site_details)
         result = True
     return result
 
@@ -30,6 +27,7 @@ def get_site_details(session_id, get_site_config_data):
 if __name__ == "__main__":
     config_data = json_parser(get_site_config.ifile)
     executions = config_data.get("executions", [])
+    session_manager = SessionManager(logger).start()
     try:
         for idx, get_site_config_data in enumerate(executions, 1):
             logger.info(f"Starting get site workflow {idx}")
@@ -40,13 +38,11 @@ if __name__ == "__main__":
                 logger.error(f"Missing credentials for get site index {idx}. Skipping this get site.")
                 continue
 
-            shift_api = SessionAPI(logger, get_site_config_data.get('shift_server_ip'))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
+            session_id = session_manager.get_session(get_site_config_data.get('shift_server_ip'), shift_username, shift_password)
 
             site_result_status = get_site_details(session_id, get_site_config_data)
-
-            shift_api.end_drom_session(session_id)
     except Exception as ex:
         logger.error(f"An error occurred while fetching site details: {ex}")
     finally:
+        session_manager.close()
         logger.info("Please find the logs of the execution in the latest file of the logs folder")
@@ -6,7 +6,8 @@ from utils.json_parser import json_parser
 from api.api_modules.blueprint import BluePrintAPI
 from api.api_modules.job_monitoring import JobMonitoring
 from api.api_modules.protection_group import ProtectionGroupAPI
-from api.api_modules.session import SessionAPI
+from api.api_modules.session_manager import SessionManager
+from api.api_modules.status_watcher import BlueprintStatusWatcher
 from api.api_modules.site import SiteAPI
 from conftest import initiate_prepare_vm_config
 from log_config import initiate_prepare_vm_logger
@@ -24,7 +25,8 @@ def initiate_prepare_vm(session_id, shift_server_ip, blueprint_name):
         )
     else:
         logger.info(f"Initiated Prepare VM for blueprint {blueprint_name} with execution id: {execution_id}")
-    prepare_vm_status = blueprint_api.wait_for_prepare_vm_execution(session_id, blueprint_id, logger)
+    with BlueprintStatusWatcher.acquire(logger, shift_server_ip, session_id) as status_watcher:
+        prepare_vm_status = blueprint_api.wait_for_prepare_vm_execution(session_id, blueprint_id, logger, watcher=status_watcher)
     logger.info(f"Status of Prepare VM is {prepare_vm_status} for blueprint {blueprint_id}")
     if not prepare_vm_status:
         logger.error(f"Prepare VM for blueprint id {blueprint_id} did not complete successfully.")
@@ -35,6 +37,7 @@ def initiate_prepare_vm(session_id, shift_server_ip, blueprint_name):
 if __name__ == "__main__":
     config_data = json_parser(initiate_prepare_vm_config.ifile)
     executions = config_data.get("executions", [])
+    session_manager = SessionManager(logger).start()
     try:
         for idx, initiate_prepare_vm_config in enumerate(executions, 1):
             final_status = ""
@@ -48,8 +51,7 @@ if __name__ == "__main__":
                 logger.error(f"Missing required details for Initiating Prepare VM index {idx}. Skipping this Initiating Prepare VM.")
                 continue
 
-            shift_api = SessionAPI(logger, initiate_prepare_vm_config.get("shift_server_ip"))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
+            session_id = session_manager.get_session(initiate_prepare_vm_config.get("shift_server_ip"), shift_username, shift_password)
             if not session_id:
                 logger.error(f"Failed to create session for Initiating Prepare VM index {idx}. Skipping this Initiating Prepare VM.")
                 continue
@@ -63,9 +65,8 @@ if __name__ == "__main__":
                 logger.info(f"Initiated Prepare VM and status is {final_status} for index {idx}")
             else:
                 logger.error(f"Initiation of Prepare VM failed for index {idx}")
-
-            shift_api.end_drom_session(session_id)
     except Exception as ex:
         logger.error(f"An error occurred during Initiating Prepare VM workflows: {ex}")
     finally:
+        session_manager.close()
         logger.info("Please find the logs of the execution in the latest file of the logs folder")
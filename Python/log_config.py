@@ -1,68 +1,223 @@
+import atexit
+import gzip
 import os
+import queue
+import re
+import shutil
 import logging
+import logging.handlers
+import threading
 from datetime import datetime
 
-LOGS_FOLDER = "logs"
-os.makedirs(LOGS_FOLDER, exist_ok=True)
+from conftest import logging_config
 
-def get_logger(module_name, folder, filename_prefix):
-    os.makedirs(folder, exist_ok=True)
+"""
+Logging of the scripts goes through one queue: the loggers only put their records on it, and a single listener thread
+writes them to the sink (one rotating, optionally compressed, file and the console) and to the per-execution files.
+A thread doing API calls never waits on file or console I/O.
+"""
 
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    log_filename = os.path.join(folder, f"{filename_prefix}_{timestamp}.log")
+LOGS_FOLDER = "logs"
+os.makedirs(LOGS_FOLDER, exist_ok=True)
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Name of the execution the current thread is working on, used to route records to per-execution log files
+_execution_context = threading.local()
+
+class ExecutionQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler stamping each record with the execution context of the emitting thread, the listener thread
+    routes the records to the per-execution files with it.
+    """
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.execution_key = get_execution_context()
+        return record
+
+class _Barrier:
+
+    def __init__(self):
+        self.event = threading.Event()
+
+class SinkListener(logging.handlers.QueueListener):
+    """
+    Queue listener whose handlers can be added and removed while it runs, for the per-execution files.
+    """
+
+    def __init__(self, log_queue, *handlers):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self._handlers_lock = threading.Lock()
+
+    def add_handler(self, handler):
+        with self._handlers_lock:
+            self.handlers = self.handlers + (handler,)
+
+    def remove_handler(self, handler):
+        with self._handlers_lock:
+            self.handlers = tuple(registered for registered in self.handlers if registered is not handler)
+
+    def handle(self, record):
+        if isinstance(record, _Barrier):
+            record.event.set()
+            return
+        super().handle(record)
+
+    def flush(self, timeout=10):
+        """
+        Waits until the records queued before the call are written.
+        """
+        if self._thread is None:
+            return
+        barrier = _Barrier()
+        self.queue.put_nowait(barrier)
+        barrier.event.wait(timeout)
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as source_file, gzip.open(dest, 'wb') as dest_file:
+        shutil.copyfileobj(source_file, dest_file)
+    os.remove(source)
+
+def _create_sink_handlers():
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if logging_config.file:
+        os.makedirs(os.path.dirname(logging_config.file) or ".", exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(logging_config.file, maxBytes=logging_config.max_bytes,
+                                                            backupCount=logging_config.backup_count)
+        if logging_config.compress:
+            file_handler.namer = lambda name: name + ".gz"
+            file_handler.rotator = _gzip_rotator
+        handlers.append(file_handler)
+    if logging_config.console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+_listener = None
+_listener_lock = threading.Lock()
+
+def start_logging():
+    """
+    Attaches the queue handler to the root logger and starts the listener thread, once per process. Every script
+    logger propagates to the root logger.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+        log_queue = queue.SimpleQueue()
+        _listener = SinkListener(log_queue, *_create_sink_handlers())
+        _listener.start()
+        logging.getLogger().addHandler(ExecutionQueueHandler(log_queue))
+        atexit.register(stop_logging)
+        return _listener
+
+def stop_logging():
+    """
+    Writes the queued records and stops the listener thread, registered to run at exit.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        for handler in [handler for handler in logging.getLogger().handlers if isinstance(handler, ExecutionQueueHandler)]:
+            logging.getLogger().removeHandler(handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+def get_logger(module_name):
+    start_logging()
     logger = logging.getLogger(module_name)
     logger.setLevel(logging.INFO)
-
-    if not logger.handlers:
-        file_handler = logging.FileHandler(log_filename)
-        file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-
-        console_handler = logging.StreamHandler()
-        console_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
-
     return logger
 
 def get_add_site_logger():
-    add_site_folder = os.path.join(LOGS_FOLDER, "Add Site Execution Logs")
-    return get_logger("AddSite", add_site_folder, "AddSite")
+    return get_logger("AddSite")
 
 def get_add_resource_group_logger():
-    add_resource_group_folder = os.path.join(LOGS_FOLDER, "Add Resource Group Execution Logs")
-    return get_logger("AddResourceGroup", add_resource_group_folder, "AddResourceGroup")
+    return get_logger("AddResourceGroup")
 
 def check_migration_status_logger():
-    check_migration_status_folder = os.path.join(LOGS_FOLDER, "Check Migration Status Execution Logs")
-    return get_logger("CheckMigrationStatus", check_migration_status_folder, "CheckMigrationStatus")
+    return get_logger("CheckMigrationStatus")
 
 def create_blueprint_logger():
-    create_blueprint_folder = os.path.join(LOGS_FOLDER, "Create Blueprint Execution Logs")
-    return get_logger("CreateBlueprint", create_blueprint_folder, "CreateBlueprint")
+    return get_logger("CreateBlueprint")
 
 def check_prepare_vm_status_logger():
-    prepare_vm_folder = os.path.join(LOGS_FOLDER, "Check Prepare VM Status Execution Logs")
-    return get_logger("CheckMigrationStatus", prepare_vm_folder, "CheckMigrationStatus")
+    return get_logger("CheckMigrationStatus")
 
 def run_compliance_check_logger():
-    run_compliance_check_folder = os.path.join(LOGS_FOLDER, "Run Compliance Execution Logs")
-    return get_logger("RunCompliance", run_compliance_check_folder, "RunCompliance")
+    return get_logger("RunCompliance")
 
 def shift_api_automation_logger():
-    shift_api_automation_folder = os.path.join(LOGS_FOLDER, "Shift Api Automation Execution Logs")
-    return get_logger("ShiftApiAutomation", shift_api_automation_folder, "ShiftApiAutomation")
+    return get_logger("ShiftApiAutomation")
 
 def trigger_migration_logger():
-    trigger_migration_folder = os.path.join(LOGS_FOLDER, "Trigger Migration Execution Logs")
-    return get_logger("TriggerMigration", trigger_migration_folder, "TriggerMigration")
+    return get_logger("TriggerMigration")
 
 def initiate_prepare_vm_logger():
-    initiate_prepare_vm_folder = os.path.join(LOGS_FOLDER, "Initiate PrepareVM Execution Logs")
-    return get_logger("InitiatePrepareVM", initiate_prepare_vm_folder, "InitiatePrepareVM")
+    return get_logger("InitiatePrepareVM")
 
 def get_site_logger():
-    get_site_folder = os.path.join(LOGS_FOLDER, "Get Site Execution Logs")
-    return get_logger("GetSite", get_site_folder, "GetSite")
+    return get_logger("GetSite")
+
+def mock_shift_server_logger():
+    return get_logger("MockShiftServer")
+
+def benchmarks_logger():
+    return get_logger("Benchmarks")
+
+def set_execution_context(execution_key):
+    _execution_context.key = execution_key
+
+def clear_execution_context():
+    _execution_context.key = None
+
+def get_execution_context():
+    return getattr(_execution_context, "key", None)
+
+def bind_execution_context(func):
+    """
+    Wrap func so that it runs with the execution context of the calling thread. Used for work handed to pool
+    threads, so their records still reach the log file of the execution.
+    """
+    execution_key = get_execution_context()
+
+    def run(*args, **kwargs):
+        set_execution_context(execution_key)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            clear_execution_context()
+    return run
+
+def add_execution_log_handler(execution_key):
+    """
+    Attach a file handler to the log listener which only receives the records emitted by threads
+    currently running the given execution. Every script logger propagates to the root logger, so the
+    file captures the full execution across modules.
+    """
+    execution_folder = os.path.join(LOGS_FOLDER, "Shift Api Automation Execution Logs", "Executions")
+    os.makedirs(execution_folder, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    safe_key = re.sub(r'[^A-Za-z0-9_.-]+', '_', execution_key)
+    log_filename = os.path.join(execution_folder, f"{safe_key}_{timestamp}.log")
+
+    handler = logging.FileHandler(log_filename)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    # The execution context was recorded on the record by the thread which emitted it
+    handler.addFilter(lambda record: getattr(record, "execution_key", None) == execution_key)
+    start_logging().add_handler(handler)
+    return handler
+
+def remove_execution_log_handler(handler):
+    listener = start_logging()
+    # The records of the execution still in the queue are written before the file is closed
+    listener.flush()
+    listener.remove_handler(handler)
+    handler.close()
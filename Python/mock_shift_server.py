@@ -0,0 +1,498 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from api.api_modules.endpoints import RECOVERY_PORT, SETUP_PORT, TENANT_PORT
+from conftest import mock_shift_server_config, shift_api_automation_config
+from log_config import mock_shift_server_logger
+from utils.json_parser import json_parser
+
+"""
+Local stand-in for a Shift appliance, to run the API modules and the workflows offline. Serves the session (3698),
+setup (3700) and recovery (3704) endpoints used by the clients from an in-memory state: created sites are discovered,
+compliance checks succeed and executions complete after a configurable delay. Latency and failures can be injected
+to measure throughput and exercise the polling and retry behaviour.
+
+Point shift_server_ip of the executions to http://127.0.0.1 and run: python mock_shift_server.py
+"""
+
+logger = mock_shift_server_logger()
+
+SESSION_HEADER = 'netapp-sie-sessionid'
+
+
+def new_id():
+    return str(uuid.uuid4())
+
+
+class MockShiftState:
+    """
+    In-memory objects of the mock server. Every site gets vms_per_site unprotected VMs and networks_per_site
+    distributed port groups, plus the VMs, networks and mapped resources named in the seed executions.
+    """
+
+    def __init__(self, vms_per_site=None, networks_per_site=None, discovery_secs=None, compliance_secs=None,
+                 execution_secs=None, session_ttl=None, seed_executions=()):
+        cfg = mock_shift_server_config
+        self.vms_per_site = cfg.vms_per_site if vms_per_site is None else vms_per_site
+        self.networks_per_site = cfg.networks_per_site if networks_per_site is None else networks_per_site
+        self.discovery_secs = cfg.discovery_secs if discovery_secs is None else discovery_secs
+        self.compliance_secs = cfg.compliance_secs if compliance_secs is None else compliance_secs
+        self.execution_secs = cfg.execution_secs if execution_secs is None else execution_secs
+        self.session_ttl = cfg.session_ttl if session_ttl is None else session_ttl
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.sites = {}
+        self.resources = {}
+        self.unprotected_vms = {}
+        self.protection_groups = {}
+        self.drplans = {}
+        self.compliance_tasks = {}
+        self.executions = {}
+        self.seed_vm_names, self.seed_resource_names = self._seed_names(seed_executions)
+
+    @staticmethod
+    def _seed_names(executions):
+        vm_names, resource_names = [], []
+        for execution in executions:
+            for vm_entry in execution.get("vm_details") or []:
+                vm_names.append(vm_entry.get("name"))
+                networks = vm_entry.get("networkDetails") or vm_entry.get("networkName") or []
+                resource_names.extend(networks if isinstance(networks, list) else [networks])
+            for source, target in (execution.get("mappings") or {}).items():
+                resource_names.extend([source, target])
+        return ([name for name in dict.fromkeys(vm_names) if name],
+                [name for name in dict.fromkeys(resource_names) if isinstance(name, str) and name])
+
+    # Sessions
+
+    def login(self, login_id):
+        session_id = new_id()
+        with self.lock:
+            self.sessions[session_id] = {"loginId": login_id, "created": time.monotonic()}
+        return session_id
+
+    def logout(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def is_valid_session(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return False
+            if self.session_ttl and time.monotonic() - session["created"] > self.session_ttl:
+                del self.sessions[session_id]
+                return False
+            return True
+
+    # Sites
+
+    def add_site(self, payload):
+        site_id = new_id()
+        virt_env_id = new_id()
+        site = dict(payload, _id=site_id, created=time.monotonic(),
+                    virtualizationEnvironments=[dict(env, _id=virt_env_id)
+                                                for env in payload.get("virtualizationEnvironments") or [{}]][:1])
+        vms = [{"_id": new_id(), "name": f"{payload.get('name')}-vm-{index:04d}"} for index in range(self.vms_per_site)]
+        vms += [{"_id": new_id(), "name": name} for name in self.seed_vm_names]
+        network_names = [f"{payload.get('name')}-network-{index}" for index in range(self.networks_per_site)]
+        resources = [{"_id": new_id(), "uuid": new_id(), "name": name,
+                      "providerParams": {"type": "DISTRIBUTED_PORTGROUP"}}
+                     for name in network_names + self.seed_resource_names]
+        resources += [{"_id": vm["_id"], "name": vm["name"], "providerParams": {"type": "VM"}} for vm in vms]
+        with self.lock:
+            self.sites[site_id] = site
+            self.unprotected_vms[site_id] = vms
+            self.resources[site_id] = resources
+        return site_id
+
+    def site_view(self, site):
+        discovered = time.monotonic() - site["created"] >= self.discovery_secs
+        view = {key: value for key, value in site.items() if key != "created"}
+        view["discoveryStatuses"] = [{"status": 4 if discovered else 2}]
+        return view
+
+    def list_sites(self):
+        with self.lock:
+            return [self.site_view(site) for site in self.sites.values()]
+
+    def get_site(self, site_id):
+        with self.lock:
+            site = self.sites.get(site_id)
+            return self.site_view(site) if site else None
+
+    def delete_site(self, site_id):
+        with self.lock:
+            self.unprotected_vms.pop(site_id, None)
+            self.resources.pop(site_id, None)
+            return self.sites.pop(site_id, None) is not None
+
+    # Protection groups and drPlans
+
+    def add_protection_group(self, payload):
+        group_id = new_id()
+        protected = {vm.get("_id") for vm in payload.get("vms") or []}
+        site_id = (payload.get("sourceSite") or {}).get("_id")
+        with self.lock:
+            site_vms = self.unprotected_vms.get(site_id, [])
+            # Like the appliance, the VMs of the stored group carry their names
+            vms = [vm for vm in site_vms if vm["_id"] in protected]
+            self.protection_groups[group_id] = dict(payload, _id=group_id, vms=vms)
+            self.unprotected_vms[site_id] = [vm for vm in site_vms if vm["_id"] not in protected]
+        return group_id
+
+    def add_drplan(self, payload):
+        drplan_id = new_id()
+        with self.lock:
+            self.drplans[drplan_id] = dict(payload, _id=drplan_id)
+            # The appliance starts Prepare VM on its own once a blueprint is created
+            self.executions[new_id()] = {"drplan_id": drplan_id, "type": "preparevm", "started": time.monotonic()}
+        return drplan_id
+
+    def start_compliance_check(self, drplan_id):
+        task_id = new_id()
+        with self.lock:
+            self.compliance_tasks[task_id] = {"drplan_id": drplan_id, "started": time.monotonic()}
+        return task_id
+
+    def compliance_status(self, task_id):
+        with self.lock:
+            task = self.compliance_tasks.get(task_id)
+        if task is None:
+            return None
+        if time.monotonic() - task["started"] < self.compliance_secs:
+            return {"status": "running", "result": []}
+        return {"status": "succeeded",
+                "result": [{"sourceCheckResult": [{"status": "passed"}] * 10,
+                            "targetCheckResult": [{"status": "passed"}] * 4}]}
+
+    def start_execution(self, drplan_id, execution_type):
+        execution_id = new_id()
+        with self.lock:
+            if drplan_id not in self.drplans:
+                return None
+            self.executions[execution_id] = {"drplan_id": drplan_id, "type": execution_type,
+                                             "started": time.monotonic()}
+        return execution_id
+
+    def _is_finished(self, execution):
+        return time.monotonic() - execution["started"] >= self.execution_secs
+
+    def drplan_status(self):
+        with self.lock:
+            executions = list(self.executions.values())
+            drplans = list(self.drplans)
+        latest = {}
+        for execution in executions:
+            latest[(execution["drplan_id"], execution["type"] == "preparevm")] = execution
+        status_list = []
+        for drplan_id in drplans:
+            recovery = latest.get((drplan_id, False))
+            prepare_vm = latest.get((drplan_id, True))
+            if recovery is None:
+                recovery_status = "not started"
+            else:
+                recovery_status = f"{recovery['type']} complete" if self._is_finished(recovery) else "in progress"
+            last_execution = prepare_vm or recovery
+            status_list.append({
+                "drPlan": {"_id": drplan_id, "recoveryStatus": recovery_status},
+                "lastExecution": {"status": (4 if self._is_finished(last_execution) else 2) if last_execution else 0},
+            })
+        return status_list
+
+    def execution_steps(self, execution_id):
+        with self.lock:
+            execution = self.executions.get(execution_id)
+        if execution is None:
+            return None
+        status = 4 if self._is_finished(execution) else 2
+        return {"type": execution["type"],
+                "steps": [{"description": description, "status": status}
+                          for description in ("Prepare VMs", "Clone volumes", "Convert VMs", "Power on VMs")]}
+
+
+def paginate(items, query):
+    """
+    Applies the offset and limit query parameters of the paginated list endpoints.
+    """
+    offset = int(query.get("offset", ["0"])[0])
+    limit = query.get("limit")
+    page = items[offset:offset + int(limit[0])] if limit else items[offset:]
+    return {"fetchedCount": len(page), "totalCount": len(items), "list": page}
+
+
+class MockShiftHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # (port, method, path pattern, handler method name)
+    ROUTES = [
+        (TENANT_PORT, 'POST', r'/api/tenant/session', 'create_session'),
+        (TENANT_PORT, 'POST', r'/api/tenant/session/end', 'end_session'),
+        (SETUP_PORT, 'GET', r'/api/setup/site', 'list_sites'),
+        (SETUP_PORT, 'POST', r'/api/setup/site', 'add_site'),
+        (SETUP_PORT, 'GET', r'/api/setup/site/(?P<site_id>[^/]+)', 'get_site'),
+        (SETUP_PORT, 'DELETE', r'/api/setup/site/(?P<site_id>[^/]+)', 'delete_site'),
+        (SETUP_PORT, 'GET', r'/api/setup/site/(?P<site_id>[^/]+)/virtEnv/[^/]+/resource', 'list_resources'),
+        (SETUP_PORT, 'GET', r'/api/setup/vm/unprotected', 'list_unprotected_vms'),
+        (SETUP_PORT, 'GET', r'/api/setup/protectiongroup', 'list_protection_groups'),
+        (SETUP_PORT, 'POST', r'/api/setup/protectiongroup', 'add_protection_group'),
+        (SETUP_PORT, 'GET', r'/api/setup/protectiongroup/(?P<group_id>[^/]+)', 'get_protection_group'),
+        (SETUP_PORT, 'DELETE', r'/api/setup/protectiongroup/(?P<group_id>[^/]+)', 'delete_protection_group'),
+        (SETUP_PORT, 'GET', r'/api/setup/drplan', 'list_drplans'),
+        (SETUP_PORT, 'POST', r'/api/setup/drplan', 'add_drplan'),
+        (SETUP_PORT, 'POST', r'/api/setup/compliance/drplan/(?P<drplan_id>[^/]+)/checkrequest', 'compliance_check'),
+        (RECOVERY_PORT, 'POST', r'/api/recovery/drplan/(?P<drplan_id>[^/]+)/(?P<execution_type>[^/]+)/execution',
+         'start_execution'),
+        (RECOVERY_PORT, 'GET', r'/api/recovery/drplan/status', 'drplan_status'),
+        (RECOVERY_PORT, 'GET', r'/api/recovery/execution/(?P<execution_id>[^/]+)/steps', 'execution_steps'),
+    ]
+    COMPILED_ROUTES = [(port, method, re.compile(pattern + '$', re.IGNORECASE), name)
+                       for port, method, pattern, name in ROUTES]
+    # Readable route names for the counters, e.g. /api/setup/site/{site_id}
+    ROUTE_TEMPLATES = {name: re.sub(r'\(\?P<(\w+)>\[\^/\]\+\)', r'{\1}', pattern).replace('[^/]+', '{id}')
+                       for port, method, pattern, name in ROUTES}
+
+    @property
+    def mock(self):
+        return self.server.mock
+
+    @property
+    def state(self):
+        return self.server.mock.state
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        body = self._read_json()
+        port = self.server.server_address[1]
+        if parts.path == '/_mock/stats':
+            return self._send_json(200, self.mock.stats())
+        for route_port, route_method, pattern, name in self.COMPILED_ROUTES:
+            match = pattern.match(parts.path)
+            if route_port == port and route_method == method and match:
+                route = f"{method} {self.ROUTE_TEMPLATES[name]}"
+                break
+        else:
+            self.mock.count(f"{method} {parts.path}", 404)
+            return self._send_json(404, {"message": f"No route for {method} {parts.path} on port {port}"})
+        self.mock.delay()
+        if self.mock.should_fail():
+            self.mock.count(route, self.mock.failure_status)
+            return self._send_json(self.mock.failure_status, {"message": "Injected failure"})
+        if name not in ('create_session', 'end_session') and \
+                not self.state.is_valid_session(self.headers.get(SESSION_HEADER)):
+            self.mock.count(route, 401)
+            return self._send_json(401, {"message": "Invalid or expired session"})
+        status, response_body = getattr(self, name)(body=body, query=query, **match.groupdict())
+        self.mock.count(route, status)
+        self._send_json(status, response_body)
+
+    # Route handlers, each returns (status, body)
+
+    def create_session(self, body, query):
+        return 200, {"session": {"_id": self.state.login(body.get("loginId"))}}
+
+    def end_session(self, body, query):
+        self.state.logout(body.get("sessionId"))
+        return 200, {}
+
+    def list_sites(self, body, query):
+        return 200, paginate(self.state.list_sites(), query)
+
+    def add_site(self, body, query):
+        return 200, {"_id": self.state.add_site(body)}
+
+    def get_site(self, body, query, site_id):
+        site = self.state.get_site(site_id)
+        return (200, site) if site else (404, {"message": f"Site {site_id} not found"})
+
+    def delete_site(self, body, query, site_id):
+        return (200, {}) if self.state.delete_site(site_id) else (404, {"message": f"Site {site_id} not found"})
+
+    def list_resources(self, body, query, site_id):
+        with self.state.lock:
+            resources = list(self.state.resources.get(site_id, []))
+        return 200, paginate(resources, query)
+
+    def list_unprotected_vms(self, body, query):
+        site_id = query.get("siteId", [None])[0]
+        with self.state.lock:
+            vms = list(self.state.unprotected_vms.get(site_id, []))
+        return 200, paginate(vms, query)
+
+    def list_protection_groups(self, body, query):
+        with self.state.lock:
+            groups = list(self.state.protection_groups.values())
+        return 200, paginate(groups, query)
+
+    def add_protection_group(self, body, query):
+        return 200, {"_id": self.state.add_protection_group(body)}
+
+    def get_protection_group(self, body, query, group_id):
+        with self.state.lock:
+            group = self.state.protection_groups.get(group_id)
+        return (200, group) if group else (404, {"message": f"Protection group {group_id} not found"})
+
+    def delete_protection_group(self, body, query, group_id):
+        with self.state.lock:
+            deleted = self.state.protection_groups.pop(group_id, None) is not None
+        return (200, {}) if deleted else (404, {"message": f"Protection group {group_id} not found"})
+
+    def list_drplans(self, body, query):
+        with self.state.lock:
+            drplans = list(self.state.drplans.values())
+        return 200, paginate(drplans, query)
+
+    def add_drplan(self, body, query):
+        return 200, {"_id": self.state.add_drplan(body)}
+
+    def compliance_check(self, body, query, drplan_id):
+        if "taskId" in query:
+            task_status = self.state.compliance_status(query["taskId"][0])
+            return (200, task_status) if task_status else (404, {"message": "Compliance task not found"})
+        return 200, {"status": "running", "taskId": self.state.start_compliance_check(drplan_id)}
+
+    def start_execution(self, body, query, drplan_id, execution_type):
+        execution_id = self.state.start_execution(drplan_id, execution_type.lower())
+        return (200, {"_id": execution_id}) if execution_id else (404, {"message": f"drPlan {drplan_id} not found"})
+
+    def drplan_status(self, body, query):
+        return 200, self.state.drplan_status()
+
+    def execution_steps(self, body, query, execution_id):
+        steps = self.state.execution_steps(execution_id)
+        return (200, steps) if steps else (404, {"message": f"Execution {execution_id} not found"})
+
+
+class MockShiftServer:
+    """
+    Runs the tenant, setup and recovery ports of the mock on background threads. Usable as a context manager.
+    """
+
+    def __init__(self, state=None, host=None, latency=None, latency_jitter=None, failure_rate=None,
+                 failure_status=None):
+        cfg = mock_shift_server_config
+        self.state = state or MockShiftState()
+        self.host = host or cfg.host
+        self.latency = cfg.latency if latency is None else latency
+        self.latency_jitter = cfg.latency_jitter if latency_jitter is None else latency_jitter
+        self.failure_rate = cfg.failure_rate if failure_rate is None else failure_rate
+        self.failure_status = failure_status or cfg.failure_status
+        self.requests = Counter()
+        self._counter_lock = threading.Lock()
+        self._servers = []
+        self._threads = []
+
+    @property
+    def url(self):
+        return f"http://{self.host}"
+
+    def delay(self):
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + random.uniform(0, self.latency_jitter))
+
+    def should_fail(self):
+        return self.failure_rate and random.random() < self.failure_rate
+
+    def count(self, route, status):
+        with self._counter_lock:
+            self.requests[(route, status)] += 1
+
+    def stats(self):
+        with self._counter_lock:
+            return {"requests": sum(self.requests.values()),
+                    "by_route": {f"{route} {status}": count for (route, status), count in sorted(self.requests.items())}}
+
+    def start(self):
+        for port in (TENANT_PORT, SETUP_PORT, RECOVERY_PORT):
+            server = ThreadingHTTPServer((self.host, port), MockShiftHandler)
+            server.daemon_threads = True
+            server.mock = self
+            thread = threading.Thread(target=server.serve_forever, name=f"mock-shift-{port}", daemon=True)
+            thread.start()
+            self._servers.append(server)
+            self._threads.append(thread)
+        logger.info(f"Mock Shift server listening on {self.url} ports {TENANT_PORT}, {SETUP_PORT}, {RECOVERY_PORT} "
+                    f"with latency {self.latency}s and failure rate {self.failure_rate}")
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._servers, self._threads = [], []
+        logger.info(f"Mock Shift server stopped after {self.stats()['requests']} requests")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local mock of the Shift API for offline runs")
+    parser.add_argument("--host", default=None, help="Address to listen on")
+    parser.add_argument("--latency", type=float, default=None, help="Delay added to every request, in seconds")
+    parser.add_argument("--latency-jitter", type=float, default=None, help="Random extra delay, in seconds")
+    parser.add_argument("--failure-rate", type=float, default=None,
+                        help="Fraction of the requests answered with the failure status")
+    parser.add_argument("--failure-status", type=int, default=None, help="Status code of the injected failures")
+    parser.add_argument("--vms-per-site", type=int, default=None, help="Unprotected VMs generated for each site")
+    parser.add_argument("--session-ttl", type=float, default=None,
+                        help="Seconds after which a session expires, 0 for never")
+    parser.add_argument("--seed", default=shift_api_automation_config.ifile,
+                        help="Executions file whose VM, network and mapping names are added to every site")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    seed_executions = json_parser(args.seed).get("executions", []) if args.seed else []
+    state = MockShiftState(vms_per_site=args.vms_per_site, session_ttl=args.session_ttl,
+                           seed_executions=seed_executions)
+    mock_server = MockShiftServer(state, host=args.host, latency=args.latency, latency_jitter=args.latency_jitter,
+                                  failure_rate=args.failure_rate, failure_status=args.failure_status).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock_server.stop()
@@ -1,32 +1,55 @@
 import logging
-import time
 from utils.json_parser import json_parser
-from api.api_modules.blueprint import BluePrintAPI
-from api.api_modules.session import SessionAPI
+from api.api_modules.blueprint import BluePrintAPI, find_blueprint_status_entry
+from api.api_modules.session_manager import SessionManager
 from conftest import run_compliance_check_config
 from log_config import run_compliance_check_logger
+from utils.polling import PollProfile, poll_until
+from utils.log_format import log_body
 
 logger = run_compliance_check_logger()
 logger.setLevel(logging.INFO)
 
-def run_compliance_check(session_id, shift_server_ip, blueprint_name):
+def run_compliance_check(session_id, shift_server_ip, blueprint_name, blueprint_id=None):
+    """
+    Returns the task id of the compliance check when it passed, None when it could not be run or failed.
+    """
     blueprint_api = BluePrintAPI(logger, shift_server_ip)
-    time.sleep(20)
+    known_blueprint_id = blueprint_id
 
-    blueprint_id = blueprint_api.get_blueprint_id_by_name(session_id, blueprint_name, logger)
-    compliance_status, compliance_task_id = blueprint_api.run_compliance_check_on_blueprint(session_id, blueprint_id, logger)
+    # A freshly created blueprint is ready for a compliance check request once the recovery service reports a status
+    # for it, which replaces the fixed settle delay. Only the readiness is polled, the check request is not
+    # idempotent and is sent once.
+    def find_ready_blueprint():
+        blueprint_id = known_blueprint_id or blueprint_api.get_blueprint_id_by_name(session_id, blueprint_name, logger)
+        if not blueprint_id:
+            return None
+        status_entry = find_blueprint_status_entry(blueprint_api.get_blueprint_status(session_id, logger), blueprint_id)
+        if status_entry is None:
+            logger.info(f"Blueprint {blueprint_id} has no recovery status yet, waiting before the compliance check")
+            return None
+        return blueprint_id
+
+    ready, blueprint_id, poll_count = poll_until(find_ready_blueprint, bool, PollProfile.from_config("blueprint_ready"),
+                                                 logger)
+    if not ready:
+        logger.error(f"Blueprint {blueprint_name} is not ready, compliance check is not run")
+        return None
+
+    compliance_request = blueprint_api.run_compliance_check_on_blueprint(session_id, blueprint_id, logger)
+    compliance_status, compliance_task_id = compliance_request or (None, None)
     if not compliance_task_id:
         logger.error(
             f"Compliance check request for blueprint {blueprint_id} failed using POST /api/setup/compliance/drplan/{blueprint_id}/checkrequest API"
         )
-    else:
-        logger.info(f"Compliance check initiated with task id: {compliance_task_id}")
+        return None
+    logger.info(f"Compliance check initiated with task id: {compliance_task_id}")
 
     compliance_status_flag, compliance_result = blueprint_api.verify_compliance_check_status(session_id, compliance_task_id, logger)
     if not compliance_status_flag:
         logger.error(f"Compliance status check failed for compliance id {compliance_task_id}")
-    else:
-        logger.info(f"Compliance check passed with result: {compliance_result}")
+        return None
+    log_body(logger, "Compliance check passed with result: %s", body=compliance_result)
 
     return compliance_task_id
 
@@ -34,6 +57,7 @@ if __name__ == "__main__":
     config_data = json_parser(run_compliance_check_config.ifile)
     executions = config_data.get("executions", [])
 
+    session_manager = SessionManager(logger).start()
     try:
         for idx, run_compliance_check_config_data in enumerate(executions, 1):
             logger.info(f"Starting complaince check workflow {idx}")
@@ -46,8 +70,7 @@ if __name__ == "__main__":
                 logger.error(f"Missing credentials or blueprint_name for run_compliance_check index {idx}. Skipping this run_compliance_check.")
                 continue
 
-            shift_api = SessionAPI(logger, run_compliance_check_config_data.get("shift_server_ip"))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
+            session_id = session_manager.get_session(run_compliance_check_config_data.get("shift_server_ip"), shift_username, shift_password)
             if not session_id:
                 logger.error(f"Failed to create session for run_compliance_check index {idx}. Skipping this run_compliance_check.")
                 continue
@@ -56,10 +79,10 @@ if __name__ == "__main__":
             if compliance_task_id:
                 logger.info(f"Compliance check completed for blueprint {blueprint_name} with task id {compliance_task_id}")
             else:
-                logger.error(f"Compliance check failed for blueprint {blueprint_name}")
-
-            shift_api.end_drom_session(session_id)
+                logger.error(f"Compliance check did not pass or could not be run for blueprint {blueprint_name}, "
+                             f"see the errors above")
     except Exception as ex:
         logger.error(f"An error occurred during run_compliance_check workflows: {ex}")
     finally:
+        session_manager.close()
         logger.info("Please find the logs of the execution in the latest file of the logs folder")
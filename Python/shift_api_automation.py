@@ -1,156 +1,352 @@
+import argparse
 import logging
+import time
+from api_wrapper import APIWrapper
 from utils.json_parser import json_parser
-from api.api_modules.session import SessionAPI
-from conftest import shift_api_automation_config
+from api.api_modules.shift_client import ShiftClient
+from api.api_modules.session_manager import SessionManager
+from conftest import shift_api_automation_config, checkpoint_config, logging_config
 from add_site import create_sites
 from add_resource_group import add_resource_group
 from create_blueprint import create_blueprint
 from run_compliance_check import run_compliance_check
 from trigger_migration import trigger_migration
 from check_migration_status import check_migration_status
-from log_config import shift_api_automation_logger
-from api.api_modules.blueprint import BluePrintAPI
+from log_config import shift_api_automation_logger, get_execution_context, add_execution_log_handler, \
+    remove_execution_log_handler
 from api.api_modules.site import SiteAPI
-from api.api_modules.protection_group import ProtectionGroupAPI
+from api.api_modules.reconcile import ServerState
+from api.api_modules.status_watcher import BlueprintStatusWatcher
+from utils.checkpoint import CheckpointStore
+from utils.metrics_exporter import MetricsExporter
+from utils.request_metrics import format_latency_table
+from utils.workflow import Step, Workflow, WorkflowContext, WorkflowEngine, WorkflowError
 # from utils.vcenter_utils import VcenterUtils
 
 
 logger = shift_api_automation_logger()
 
-def full_migration_workflow(session_id, migration_config):
-    migration_mode = migration_config.get("migration_mode")
-    logger.info(f"Starting execution for: {migration_config.get('execution_name')}")
+def get_vm_names(migration_config):
+    vm_names = list()
+    vm_details_json = migration_config.get("vm_details")
+    if vm_details_json is None:
+        logger.error("Missing vm_details entry.")
+        raise WorkflowError("Missing vm_details entry.")
+    for vm_entry in vm_details_json:
+        vm_name = vm_entry.get("name")
+        if not vm_name:
+            logger.error("Missing vm name in vm_details entry.")
+            raise WorkflowError("Missing vm name in vm_details entry.")
+        if vm_name not in vm_names:
+            vm_names.append(vm_name)
+    return vm_names
 
-    source_site_id = None
-    destination_site_id = None
-    resource_group_ids = None
-    blueprint_id = None
-    execution_id = None
-    source_site_name = None
-    destination_site_name = None
-    blueprint_api = BluePrintAPI(logger, migration_config.get("shift_server_ip"))
-    resource_group_api = ProtectionGroupAPI(logger, migration_config.get("shift_server_ip"))
-    # vcenter_utils = VcenterUtils(logger, migration_config)
-    # vcenter_utils.create_vm_connection()
-
-    if migration_config.get("do_create_sites", True):
-        try:
-            source_site_id, destination_site_id = create_sites(session_id, migration_config)
-        except Exception as e:
-            logger.error(f"Create sites failed: {e}")
-    else:
-        logger.info("Skipping site creation as per configuration.")
+def resolve_blueprint_id(context):
+    # Created by the create_blueprint step, or looked up once by name when the blueprint already exists
+    blueprint_id = context.output("create_blueprint") or context.blueprint_id
+    if not blueprint_id:
+        blueprint_id = context.client.blueprint.get_blueprint_id_by_name(context.session_id,
+                                                                      context.config.get("blueprint_name"), logger)
+        context.blueprint_id = blueprint_id
+    return blueprint_id
 
-    if migration_config.get("do_add_resource_group", True):
-        try:
-            source_site_name = migration_config.get("source_site_name")
-            destination_site_name = migration_config.get("destination_site_name")
-            resource_group_ids = add_resource_group(session_id, migration_config, source_site_name, destination_site_name)
-            logger.info(f"Resource Groups created with id: {resource_group_ids}")
-        except Exception as e:
-            logger.error(f"Add resource group failed: {e}")
-    else:
-        logger.info("Skipping resource group creation as per configuration.")
+def session_step(context):
+    if not context.session_id and context.session_manager is not None:
+        # Shared by the executions on the same server and user, ended once at shutdown
+        context.session_id = context.session_manager.get_session(context.config.get("shift_server_ip"),
+                                                                 context.config.get("shift_username"),
+                                                                 context.config.get("shift_password"))
+        context.client.session_id = context.session_id
+    elif not context.session_id:
+        context.session_id = context.client.login(context.config.get("shift_username"),
+                                                  context.config.get("shift_password"))
+        context.owns_session = True
+    return context.session_id
 
-    if migration_config.get("do_create_blueprint", True):
-        try:
-            blueprint_id = create_blueprint(session_id, migration_config, migration_mode)
-        except Exception as e:
-            logger.error(f"Create blueprint failed: {e}")
+def create_sites_step(context):
+    plan = context.reconcile_plan
+    if plan is not None and not plan.missing_site_types:
+        logger.info(f"Sites {context.config.get('source_site_name')} and {context.config.get('destination_site_name')} already exist")
+        return plan.source_site_id, plan.destination_site_id
+    site_types = plan.missing_site_types if plan is not None else None
+    source_site_id, destination_site_id = create_sites(context.session_id, context.config, site_types=site_types)
+    if plan is not None:
+        source_site_id = source_site_id or plan.source_site_id
+        destination_site_id = destination_site_id or plan.destination_site_id
+    if not source_site_id or not destination_site_id:
+        raise WorkflowError("Source or destination site was not created.")
+    return source_site_id, destination_site_id
+
+def add_resource_group_step(context):
+    source_site_name = context.config.get("source_site_name")
+    destination_site_name = context.config.get("destination_site_name")
+    plan = context.reconcile_plan
+    if plan is None:
+        resource_group_ids = add_resource_group(context.session_id, context.config, source_site_name,
+                                                destination_site_name)
     else:
-        logger.info("Skipping blueprint creation as per configuration.")
+        resource_group_ids = list(plan.resource_group_ids.values())
+        if plan.resource_group_ids:
+            logger.info(f"Resource groups {list(plan.resource_group_ids)} already exist")
+        if plan.missing_resource_groups:
+            # Only the VMs of the missing resource groups are submitted
+            missing_config = dict(context.config, vm_details=[
+                vm_entry for vm_entry in context.config.get("vm_details", [])
+                if vm_entry.get("resource_group_name") in plan.missing_resource_groups])
+            resource_group_ids += add_resource_group(context.session_id, missing_config, source_site_name,
+                                                     destination_site_name) or []
+    logger.info(f"Resource Groups created with id: {resource_group_ids}")
+    if not resource_group_ids:
+        raise WorkflowError("No resource group was created.")
+    return resource_group_ids
 
-    if migration_config.get("do_compliance", True):
-        try:
-            blueprint_name = migration_config.get("blueprint_name")
-            run_compliance_check(session_id, migration_config.get("shift_server_ip"), blueprint_name)
-        except Exception as e:
-            logger.error(f"Compliance check failed: {e}")
+def create_blueprint_step(context):
+    plan = context.reconcile_plan
+    if plan is not None and plan.blueprint_id:
+        logger.info(f"Blueprint {context.config.get('blueprint_name')} already exists with id {plan.blueprint_id}")
+        return plan.blueprint_id
+    blueprint_id = create_blueprint(context.session_id, context.config, context.config.get("migration_mode"))
+    if not blueprint_id:
+        raise WorkflowError("Blueprint was not created.")
+    return blueprint_id
 
-    if migration_config.get("do_prepare_vm", True):
-        try:
-            vm_on_list = list()
-            vm_details_json = migration_config.get("vm_details")
-            if vm_details_json is None:
-                logger.error("Missing vm_details entry.")
-                exit(1)
-            for vm_entry in vm_details_json:
-                vm_name = vm_entry.get("name")
-                if not vm_name:
-                    logger.error("Missing vm name in vm_details entry.")
-                    exit(1)
-                if vm_name not in vm_on_list:
-                    vm_on_list.append(vm_name)
-            # vcenter_utils.wait_for_power_on(vm_on_list)
-            if not blueprint_id:
-                blueprint_name = migration_config.get("blueprint_name")
-                blueprint_id = blueprint_api.get_blueprint_id_by_name(session_id, blueprint_name, logger)
-            if blueprint_id:
-                prepare_vm_status = blueprint_api.wait_for_prepare_vm_execution(session_id, blueprint_id, logger)
-            else:
-                logger.error("No blueprint id available, cannot check status.")
-        except Exception as e:
-            logger.error(f"Prepare VM check failed: {e}")
+def compliance_step(context):
+    compliance_task_id = run_compliance_check(context.session_id, context.config.get("shift_server_ip"),
+                                              context.config.get("blueprint_name"),
+                                              blueprint_id=context.output("create_blueprint"))
+    if not compliance_task_id:
+        raise WorkflowError("Compliance check did not pass.")
+    return compliance_task_id
+
+def prepare_vm_step(context):
+    # vcenter_utils.wait_for_power_on(context.output("vm_details"))
+    blueprint_id = resolve_blueprint_id(context)
+    if not blueprint_id:
+        raise WorkflowError("No blueprint id available, cannot check status.")
+    with BlueprintStatusWatcher.acquire(logger, context.config.get("shift_server_ip"), context.session_id) as status_watcher:
+        prepare_vm_status = context.client.blueprint.wait_for_prepare_vm_execution(context.session_id, blueprint_id, logger,
+                                                                                watcher=status_watcher)
+    if not prepare_vm_status:
+        raise WorkflowError(f"Prepare VM did not complete for blueprint {blueprint_id}.")
+    return prepare_vm_status
+
+def trigger_migration_step(context):
+    # vcenter_utils.wait_for_power_off(context.output("vm_details"))
+    if context.steps_enabled["prepare_vm"] and resolve_blueprint_id(context) and not context.output("prepare_vm"):
+        raise WorkflowError("Prepare VM failed, cannot trigger migration.")
+    execution_id = trigger_migration(context.session_id, context.config.get("shift_server_ip"),
+                                     context.config.get("blueprint_name"), context.config.get("migration_mode"),
+                                     blueprint_id=resolve_blueprint_id(context))
+    if not execution_id:
+        raise WorkflowError("Migration was not triggered.")
+    return execution_id
+
+def check_status_step(context):
+    if context.steps_enabled["prepare_vm"] and resolve_blueprint_id(context) and not context.output("prepare_vm"):
+        logger.info("Skipping migration status check.")
+        return None
+    execution_id = context.output("trigger_migration") or context.config.get("execution_id")
+    blueprint_name = context.config.get("blueprint_name")
+    final_status = check_migration_status(context.session_id, blueprint_name, execution_id,
+                                          context.config.get("shift_server_ip"),
+                                          blueprint_id=resolve_blueprint_id(context))
+    logger.info(f"Final migration status for blueprint {blueprint_name}: {final_status}")
+    return final_status
+
+def build_migration_workflow(name, migration_config, session_id=None, execution_key=None, on_start=None,
+                             on_finish=None, checkpoint=None, reconcile_plan=None, session_manager=None):
+    """
+    Declarative step DAG of the end to end workflow. The compliance check and the prepare VM wait only depend on
+    the blueprint and run concurrently, they are skipped when the blueprint could not be created (a disabled
+    create_blueprint step satisfies them). The migration is only triggered once the compliance check passed. The
+    do_* flags of the execution disable the matching steps.
+    """
+    steps_enabled = {
+        "create_sites": migration_config.get("do_create_sites", True),
+        "add_resource_group": migration_config.get("do_add_resource_group", True),
+        "create_blueprint": migration_config.get("do_create_blueprint", True),
+        "compliance": migration_config.get("do_compliance", True),
+        "prepare_vm": migration_config.get("do_prepare_vm", True),
+        "trigger_migration": migration_config.get("do_trigger_migration", True),
+        "check_status": migration_config.get("do_check_status", True),
+    }
+    steps = [
+        Step("session", session_step),
+        Step("vm_details", lambda context: get_vm_names(context.config)),
+        Step("create_sites", create_sites_step, requires=["session"], enabled=steps_enabled["create_sites"],
+             checkpoint=True),
+        Step("add_resource_group", add_resource_group_step, requires=["session"], after=["create_sites"],
+             enabled=steps_enabled["add_resource_group"], checkpoint=True),
+        Step("create_blueprint", create_blueprint_step, requires=["session"], after=["add_resource_group"],
+             enabled=steps_enabled["create_blueprint"], checkpoint=True),
+        Step("compliance", compliance_step, requires=["session", "create_blueprint"],
+             enabled=steps_enabled["compliance"], checkpoint=True),
+        Step("prepare_vm", prepare_vm_step, requires=["session", "vm_details", "create_blueprint"],
+             enabled=steps_enabled["prepare_vm"], checkpoint=True),
+        Step("trigger_migration", trigger_migration_step, requires=["session", "vm_details", "compliance"],
+             after=["prepare_vm"], enabled=steps_enabled["trigger_migration"], checkpoint=True),
+        Step("check_status", check_status_step, requires=["session", "trigger_migration"],
+             enabled=steps_enabled["check_status"], checkpoint=True),
+    ]
+    context = WorkflowContext(migration_config, session_id=session_id, owns_session=False, blueprint_id=None,
+                              steps_enabled=steps_enabled, reconcile_plan=reconcile_plan,
+                              session_manager=session_manager,
+                              client=ShiftClient(logger, migration_config.get("shift_server_ip"), session_id))
+    return Workflow(name, steps, context, execution_key=execution_key, on_start=on_start, on_finish=on_finish,
+                    checkpoint=checkpoint)
+
+def full_migration_workflow(session_id, migration_config):
+    logger.info(f"Starting execution for: {migration_config.get('execution_name')}")
+    workflow = build_migration_workflow(migration_config.get("execution_name"), migration_config,
+                                        session_id=session_id, execution_key=get_execution_context())
+    WorkflowEngine(logger, shift_api_automation_config.max_workers).run([workflow])
+    return workflow.context.output("check_status")
+
+def build_execution(idx, migration_config, reset_checkpoints=False, reconcile_plan=None, session_manager=None):
+    """
+    Returns the workflow of one entry of "executions" and the result dict it fills in when it finishes.
+    """
+    execution_name = migration_config.get("execution_name") or f"execution_{idx}"
+    execution_key = f"{idx}_{execution_name}"
+    result = {"index": idx, "execution_name": execution_name, "status": "Failed", "final_status": None,
+              "duration": 0.0}
+
+    def on_start(workflow):
+        workflow.log_handler = add_execution_log_handler(execution_key)
+        workflow.start_time = time.monotonic()
+        logger.info(f"Starting workflow {idx}")
+        if checkpoint is not None and checkpoint.stale:
+            logger.warning(f"Execution configuration changed since {checkpoint.path} was written, ignoring the checkpoint")
+        elif checkpoint is not None and checkpoint.completed_steps():
+            logger.info(f"Resuming workflow {idx} after the completed steps {checkpoint.completed_steps()}")
 
-    if migration_config.get("do_trigger_migration", True):
+    def on_finish(workflow):
+        context = workflow.context
         try:
-            vm_off_list = list()
-            vm_details_json = migration_config.get("vm_details")
-            if vm_details_json is None:
-                logger.error("Missing vm_details entry.")
-                exit(1)
-            for vm_entry in vm_details_json:
-                vm_name = vm_entry.get("name")
-                if not vm_name:
-                    logger.error("Missing vm name in vm_details entry.")
-                    exit(1)
-                if vm_name not in vm_off_list:
-                    vm_off_list.append(vm_name)
-            # vcenter_utils.wait_for_power_off(vm_off_list)
-            blueprint_name = migration_config.get("blueprint_name")
-            if blueprint_id and not prepare_vm_status:
-                logger.error("Prepare VM failed, cannot trigger migration.")
+            if context.owns_session:
+                context.client.logout()
+            result["final_status"] = context.output("check_status")
+            if workflow.failed_steps:
+                logger.error(f"Workflow {idx} ({execution_name}) failed in steps {workflow.failed_steps}")
+                if checkpoint is not None:
+                    logger.info(f"Completed steps are recorded in {checkpoint.path}, rerun to resume the workflow")
             else:
-                execution_id = trigger_migration(session_id, migration_config.get("shift_server_ip"), blueprint_name, migration_mode)
-        except Exception as e:
-            logger.error(f"Trigger migration failed: {e}")
-    else:
-        logger.info("Skipping migration trigger as per configuration.")
+                result["status"] = "Completed"
+                if checkpoint is not None:
+                    # Nothing left to resume, a rerun of this execution starts a new workflow
+                    checkpoint.clear()
+        finally:
+            result["duration"] = time.monotonic() - workflow.start_time
+            remove_execution_log_handler(workflow.log_handler)
 
-    if migration_config.get("do_check_status", True):
-        try:
-            if blueprint_id and not prepare_vm_status:
-                logger.info("Skipping migration status check.")
+    if not migration_config.get("shift_username") or not migration_config.get("shift_password"):
+        logger.error(f"Missing credentials for migration index {idx}. Skipping this migration.")
+        result["status"] = "Skipped"
+        return None, result
+    checkpoint = None
+    if checkpoint_config.enabled:
+        checkpoint = CheckpointStore.for_execution(execution_key, migration_config)
+        if reset_checkpoints:
+            checkpoint.clear()
+    workflow = build_migration_workflow(execution_name, migration_config, execution_key=execution_key,
+                                        on_start=on_start, on_finish=on_finish, checkpoint=checkpoint,
+                                        reconcile_plan=reconcile_plan, session_manager=session_manager)
+    return workflow, result
+
+def reconcile_executions(executions, session_manager=None):
+    """
+    Fetch the current state of every server once and return the ReconcilePlan of each execution by index.
+    Executions whose server state cannot be retrieved get no plan and create every object.
+    """
+    states = {}
+    plans = {}
+    for idx, migration_config in enumerate(executions, 1):
+        server_key = (migration_config.get("shift_server_ip"), migration_config.get("shift_username"))
+        if not all(server_key) or not migration_config.get("shift_password"):
+            continue
+        if server_key not in states:
+            client = ShiftClient(logger, server_key[0])
+            if session_manager is not None:
+                client.session_id = session_manager.get_session(server_key[0], server_key[1],
+                                                                migration_config.get("shift_password"))
             else:
-                if not execution_id:
-                    execution_id = migration_config.get("execution_id")
-                blueprint_name = migration_config.get("blueprint_name")
-                final_status = check_migration_status(session_id, blueprint_name, execution_id, migration_config.get("shift_server_ip"))
-                logger.info(f"Final migration status for blueprint {blueprint_name}: {final_status}")
-        except Exception as e:
-            logger.error(f"Check migration status failed: {e}")
-    else:
-        logger.info("Skipping status check as per configuration.")
+                client.login(server_key[1], migration_config.get("shift_password"))
+            if not client.session_id:
+                logger.error(f"Could not log in to {server_key[0]}, reconcile mode is disabled for its executions")
+                states[server_key] = None
+                continue
+            try:
+                states[server_key] = ServerState.fetch(client)
+            finally:
+                if session_manager is None:
+                    client.logout()
+        if states[server_key] is not None:
+            plans[idx] = states[server_key].plan(migration_config)
+            logger.info(f"Reconcile plan of execution {idx}: {plans[idx].summary()}")
+    return plans
+
+def run_executions(executions, parallel=1, reset_checkpoints=False, reconcile=False, session_manager=None):
+    """
+    Runs the executions on one workflow engine. Up to parallel executions are in progress at the same time and
+    their steps share the worker pool, so the stages of different executions overlap.
+    """
+    plans = reconcile_executions(executions, session_manager) if reconcile else {}
+    built = [build_execution(idx, migration_config, reset_checkpoints=reset_checkpoints, reconcile_plan=plans.get(idx),
+                             session_manager=session_manager)
+             for idx, migration_config in enumerate(executions, 1)]
+    workflows = [workflow for workflow, result in built if workflow is not None]
+    max_workers = max(shift_api_automation_config.max_workers, parallel)
+    logger.info(f"Running {len(workflows)} executions, {parallel} at a time on {max_workers} workers")
+    WorkflowEngine(logger, max_workers, max_workflows=max(1, parallel)).run(workflows)
+    return [result for workflow, result in built]
+
+def log_execution_summary(results):
+    logger.info("Execution summary:")
+    logger.info(f"{'#':>4}  {'Execution':<40} {'Result':<10} {'Final status':<20} {'Duration':>10}")
+    for result in results:
+        logger.info(f"{result['index']:>4}  {result['execution_name'][:40]:<40} {result['status']:<10} "
+                    f"{str(result['final_status'])[:20]:<20} {result['duration']:>9.1f}s")
+    completed = sum(1 for result in results if result["status"] == "Completed")
+    logger.info(f"{completed} of {len(results)} executions completed")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End to end Shift migration/conversion workflow")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N",
+                        help="Number of executions in progress at the same time (default: 1, sequential)")
+    parser.add_argument("--reset-checkpoints", action="store_true",
+                        help="Discard the checkpoints of previous runs and run every step again")
+    parser.add_argument("--reconcile", action="store_true",
+                        help="Fetch the existing sites, resource groups and blueprints once and only create the missing ones")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help="Serve Prometheus metrics on http://<metrics host>:PORT/metrics (default: http_port under metrics in Config.yml)")
+    parser.add_argument("--metrics-file", default=None, metavar="PATH",
+                        help="Rewrite the Prometheus metrics to PATH every flush_interval secs (default: file under metrics in Config.yml)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
     config_data = json_parser(shift_api_automation_config.ifile)
     executions = config_data.get("executions", [])
+    metrics_exporter = MetricsExporter(logger, port=args.metrics_port, file_path=args.metrics_file).start()
+    session_manager = SessionManager(logger).start()
     try:
-        for idx, migration_config in enumerate(executions, 1):
-            logger.info(f"Starting workflow {idx}")
-            shift_username = migration_config.get("shift_username")
-            shift_password = migration_config.get("shift_password")
-            if not shift_username or not shift_password:
-                logger.error(f"Missing credentials for migration index {idx}. Skipping this migration.")
-                continue
-
-            shift_api = SessionAPI(logger, migration_config.get("shift_server_ip"))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
-
-            full_migration_workflow(session_id, migration_config)
-
-            shift_api.end_drom_session(session_id)
+        results = run_executions(executions, parallel=args.parallel, reset_checkpoints=args.reset_checkpoints,
+                                 reconcile=args.reconcile, session_manager=session_manager)
+        log_execution_summary(results)
     except Exception as ex:
         logger.error(f"An error occurred during migration workflows: {ex}")
     finally:
-        logger.info("Please find the logs of the execution in the latest file of the logs folder")
+        session_manager.close()
+        connection_stats = APIWrapper.connection_stats()
+        logger.info(f"HTTP connection usage: {connection_stats['requests']} requests, "
+                    f"{connection_stats['new_connections']} new connections, "
+                    f"{connection_stats['reused_connections']} reused connections")
+        retry_stats = APIWrapper.retry_stats()
+        logger.info(f"HTTP retries: {retry_stats['retries']} retries {retry_stats['retries_by_reason']}, "
+                    f"recovered {retry_stats['recovered']}, exhausted {retry_stats['exhausted']}")
+        logger.info("HTTP latency per endpoint:")
+        for line in format_latency_table(APIWrapper.latency_stats()):
+            logger.info(line)
+        APIWrapper.close_sessions()
+        metrics_exporter.stop()
+        logger.info(f"Please find the logs of the execution in {logging_config.file} and in the per execution files of the logs folder")
@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+
+from api_wrapper import APIWrapper
+from conftest import api_retry_config
+from mock_shift_server import MockShiftServer, MockShiftState
+from utils.retry import RetryPolicy
+
+"""
+Fixtures shared by the unit tests. The tests needing a server run against one MockShiftServer started for the whole
+test session, every test gets a fresh in-memory state and no injected failures.
+"""
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger("tests")
+
+
+@pytest.fixture(scope="session")
+def mock_shift_server():
+    with MockShiftServer(MockShiftState()) as server:
+        yield server
+
+
+@pytest.fixture
+def mock_shift(mock_shift_server):
+    mock_shift_server.state = MockShiftState(vms_per_site=20, networks_per_site=2, discovery_secs=0,
+                                             compliance_secs=0, execution_secs=0, session_ttl=0)
+    mock_shift_server.failure_rate = 0.0
+    mock_shift_server.requests.clear()
+    yield mock_shift_server
+    mock_shift_server.failure_rate = 0.0
+
+
+@pytest.fixture
+def session_id(mock_shift):
+    return mock_shift.state.login("admin")
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """
+    Retries of the API wrappers without waiting between the attempts.
+    """
+    monkeypatch.setattr(APIWrapper, "retry_policy", RetryPolicy(api_retry_config.max_retries,
+                                                                api_retry_config.status_codes, 0, 0))
+
@@ -0,0 +1,93 @@
+import socket
+
+import pytest
+
+from api.api_modules.endpoints import SETUP_PORT
+from api_wrapper import APIWrapper
+from conftest import api_retry_config, api_wrapper_config
+from utils.retry import RetryBudget, RetryPolicy, RetryStats
+
+
+def attempts(mock_shift, status):
+    return sum(count for route, count in mock_shift.stats()["by_route"].items() if route.endswith(f" {status}"))
+
+
+def unused_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def failing_server(mock_shift, no_backoff):
+    mock_shift.failure_rate = 1.0
+    return mock_shift
+
+
+@pytest.mark.parametrize("method, path, idempotent, retries", [
+    ("GET", "/api/setup/site", None, api_retry_config.max_retries["GET"]),
+    ("DELETE", "/api/setup/site/site-id", None, api_retry_config.max_retries["DELETE"]),
+    ("POST", "/api/setup/site", None, api_retry_config.max_retries["POST"]),
+    ("POST", "/api/setup/site", True, api_retry_config.max_retries["GET"]),
+    ("GET", "/api/setup/site", False, 0),
+])
+def test_transient_statuses_are_retried_within_the_method_budget(failing_server, logger, method, path, idempotent,
+                                                                  retries):
+    url = f"{failing_server.url}:{SETUP_PORT}{path}"
+    response = APIWrapper(logger).api_request(method=method, url=url, json={}, idempotent=idempotent)
+    assert response.status_code == failing_server.failure_status
+    assert attempts(failing_server, failing_server.failure_status) == 1 + retries
+
+
+def test_other_statuses_are_not_retried(mock_shift, no_backoff, logger):
+    response = APIWrapper(logger).api_request(method='GET', url=f"{mock_shift.url}:{SETUP_PORT}/api/setup/site")
+    assert response.status_code == 401
+    assert attempts(mock_shift, 401) == 1
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_connections_which_could_not_be_opened_are_retried_for_every_method(mock_shift, no_backoff, logger, method):
+    url = f"http://{mock_shift.host}:{unused_port(mock_shift.host)}/api/setup/site"
+    records = []
+    hook = records.append
+    APIWrapper.add_request_hook(hook)
+    try:
+        response = APIWrapper(logger, connect_retries=2).api_request(method=method, url=url, json={})
+    finally:
+        APIWrapper.remove_request_hook(hook)
+    assert response.status_code is None
+    assert response.error is not None
+    sent = [record for record in records if record.url == url]
+    retries = max(2, api_retry_config.max_retries[method])
+    assert len(sent) == 1 + retries
+
+
+def policy():
+    return RetryPolicy({"GET": 2, "POST": 0}, [503], backoff_factor=1, max_backoff=10)
+
+
+def test_budget_records_recovered_and_exhausted_requests(logger):
+    stats = RetryStats()
+    recovered = RetryBudget(policy(), "GET", None, 0, logger, "url", stats=stats)
+    assert recovered.after_status(503) is not None
+    assert recovered.after_status(200) is None
+    exhausted = RetryBudget(policy(), "GET", None, 0, logger, "url", stats=stats)
+    assert [exhausted.after_status(503) is not None for _ in range(3)] == [True, True, False]
+    snapshot = stats.snapshot()
+    assert snapshot["retries"] == 3
+    assert snapshot["recovered"] == {"GET": 1}
+    assert snapshot["exhausted"] == {"GET": 1}
+
+
+def test_only_connect_failures_get_the_connect_retries(logger):
+    budget = RetryBudget(policy(), "POST", None, api_wrapper_config.connect_retries, logger, "url",
+                         stats=RetryStats())
+    assert budget.after_error(ConnectionResetError()) is None
+    assert budget.after_error(ConnectionRefusedError(), connect_failure=True) is not None
+
+
+def test_backoff_honors_retry_after_up_to_max_backoff():
+    assert policy().backoff(1, retry_after="3") == 3
+    assert policy().backoff(1, retry_after="120") == 10
+    assert 2 <= policy().backoff(3, retry_after="not a number") <= 4
+    assert 5 <= policy().backoff(10) <= 10
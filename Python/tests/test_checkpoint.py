@@ -0,0 +1,94 @@
+import os
+
+from conftest import checkpoint_config
+from utils.checkpoint import CheckpointStore, config_fingerprint
+from utils.workflow import STEP_COMPLETED, Step, Workflow, WorkflowContext, WorkflowEngine
+
+
+def recording(calls, name, value):
+    def func(context):
+        calls.append(name)
+        return value
+    return func
+
+
+def run(logger, checkpoint, calls, enabled=True):
+    steps = [
+        Step("session", recording(calls, "session", "session-id")),
+        Step("sites", recording(calls, "sites", ["source", "destination"]), requires=["session"], checkpoint=True),
+        Step("resource_groups", recording(calls, "resource_groups", {"rg": "rg-id"}), requires=["session"],
+             enabled=enabled, checkpoint=True),
+        Step("blueprint", recording(calls, "blueprint", "blueprint-id"),
+             requires=["session", "sites", "resource_groups"], checkpoint=True),
+    ]
+    workflow = Workflow("test", steps, WorkflowContext({}), checkpoint=checkpoint)
+    WorkflowEngine(logger, 2).run([workflow])
+    return workflow
+
+
+def test_completed_steps_are_restored_on_a_rerun(tmp_path, logger):
+    path = str(tmp_path / "0_execution.json")
+    first_calls, second_calls = [], []
+    run(logger, CheckpointStore(path, "fingerprint"), first_calls)
+    workflow = run(logger, CheckpointStore(path, "fingerprint"), second_calls)
+    assert sorted(first_calls) == ["blueprint", "resource_groups", "session", "sites"]
+    # Steps without a checkpoint always run, they do not prevent their dependents from being restored
+    assert second_calls == ["session"]
+    assert workflow.context.outputs["blueprint"] == "blueprint-id"
+    assert set(workflow.status.values()) == {STEP_COMPLETED}
+
+
+def test_a_step_is_run_again_when_a_dependency_was_run_again(tmp_path, logger):
+    path = str(tmp_path / "0_execution.json")
+    run(logger, CheckpointStore(path, "fingerprint"), [])
+    store = CheckpointStore(path, "fingerprint")
+    store.clear()
+    store.save("blueprint", "old-blueprint-id")
+    calls = []
+    workflow = run(logger, CheckpointStore(path, "fingerprint"), calls)
+    assert sorted(calls) == ["blueprint", "resource_groups", "session", "sites"]
+    assert workflow.context.outputs["blueprint"] == "blueprint-id"
+
+
+def test_a_disabled_dependency_does_not_prevent_the_restore(tmp_path, logger):
+    path = str(tmp_path / "0_execution.json")
+    run(logger, CheckpointStore(path, "fingerprint"), [], enabled=False)
+    calls = []
+    run(logger, CheckpointStore(path, "fingerprint"), calls, enabled=False)
+    assert calls == ["session"]
+
+
+def test_a_checkpoint_of_another_configuration_is_stale(tmp_path):
+    path = str(tmp_path / "0_execution.json")
+    CheckpointStore(path, "fingerprint").save("sites", ["source"])
+    store = CheckpointStore(path, "changed")
+    assert store.stale
+    assert store.completed_steps() == []
+    reloaded = CheckpointStore(path, "fingerprint")
+    assert not reloaded.stale
+    assert reloaded.get("sites") == ["source"]
+
+
+def test_the_fingerprint_ignores_the_step_flags():
+    config = {"source_site_name": "source", "do_create_blueprint": True}
+    assert config_fingerprint(config) == config_fingerprint(dict(config, do_create_blueprint=False))
+    assert config_fingerprint(config) != config_fingerprint(dict(config, source_site_name="other"))
+
+
+def test_executions_get_one_file_per_index_and_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint_config, "folder", str(tmp_path))
+    first = CheckpointStore.for_execution("0_migration", {})
+    second = CheckpointStore.for_execution("1_migration", {})
+    unsafe = CheckpointStore.for_execution("2_../other name", {})
+    assert first.path != second.path
+    assert os.path.dirname(unsafe.path) == str(tmp_path)
+    assert os.path.basename(unsafe.path) == "2_.._other_name.json"
+
+
+def test_clear_removes_the_file(tmp_path):
+    path = str(tmp_path / "0_execution.json")
+    store = CheckpointStore(path, "fingerprint")
+    store.save("sites", ["source"])
+    store.clear()
+    assert not os.path.exists(path)
+    assert not store.has("sites")
@@ -0,0 +1,37 @@
+from api.api_modules.site import SiteAPI
+from utils.inventory import Inventory
+
+
+def test_find_by_id_and_name_returns_the_first_match():
+    inventory = Inventory([{"_id": "1", "name": "vm"}, {"_id": "2", "name": "vm"}, {"_id": "3", "name": "other"}])
+    assert inventory.find("_id", "2")["name"] == "vm"
+    assert inventory.find("name", "vm")["_id"] == "1"
+    assert [item["_id"] for item in inventory.find_all("name", "vm")] == ["1", "2"]
+
+
+def test_missing_values_are_not_found():
+    inventory = Inventory([{"_id": "1"}, "not an object", {"name": None}])
+    assert inventory.find("name", "vm") is None
+    assert inventory.find("name", None) is None
+    assert inventory.find_all("_id", "2") == []
+
+
+def test_inventory_behaves_as_the_list_it_indexes():
+    items = [{"_id": "1", "name": "a"}, {"_id": "2", "name": "b"}]
+    inventory = Inventory(item for item in items)
+    assert inventory == items
+    assert len(inventory) == 2
+
+
+def test_find_all_returns_a_copy():
+    inventory = Inventory([{"_id": "1", "name": "vm"}])
+    inventory.find_all("name", "vm").clear()
+    assert inventory.find("name", "vm") is not None
+
+
+def test_site_details_are_found_by_name(mock_shift, session_id, logger):
+    source_site_id = mock_shift.state.add_site({"name": "source"})
+    mock_shift.state.add_site({"name": "destination"})
+    site_api = SiteAPI(logger, mock_shift.url)
+    assert site_api.get_site_details_by_name(session_id, "source", logger)["_id"] == source_site_id
+    assert site_api.get_site_details_by_name(session_id, "missing", logger) is False
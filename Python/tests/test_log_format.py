@@ -0,0 +1,50 @@
+import logging
+
+from utils.log_format import BodySummary, log_body
+
+
+class CountingRepr:
+    """
+    Body counting how often it is rendered.
+    """
+
+    def __init__(self):
+        self.renders = 0
+
+    def __repr__(self):
+        self.renders += 1
+        return "body"
+
+
+def test_summary_is_truncated_to_max_length():
+    summary = str(BodySummary({"name": "x" * 1000, "other": "y" * 1000}, max_length=50))
+    assert len(summary) == 50 + len("...")
+    assert summary.endswith("...")
+
+
+def test_list_bodies_are_summarized_with_their_length():
+    body = {"fetchedCount": 1000, "list": [{"_id": str(index)} for index in range(1000)]}
+    summary = str(BodySummary(body))
+    assert summary.startswith("fetchedCount=1000, list of 1000 items: ")
+    assert "'999'" not in summary
+    assert str(BodySummary(list(range(50)))).startswith("list of 50 items: [0, 1, 2, ...]")
+
+
+def test_summary_is_logged_at_info_and_the_full_body_at_debug(logger, caplog):
+    body = {"list": list(range(100))}
+    with caplog.at_level(logging.DEBUG, logger=logger.name):
+        log_body(logger, "Sites of %s are %s", "server", body=body)
+    info, debug = caplog.records
+    assert (info.levelno, debug.levelno) == (logging.INFO, logging.DEBUG)
+    assert "list of 100 items" in info.getMessage()
+    assert info.getMessage().startswith("Sites of server are ")
+    assert debug.getMessage() == f"Sites of server are {body}"
+
+
+def test_disabled_levels_do_not_render_the_body(logger, caplog):
+    body = CountingRepr()
+    with caplog.at_level(logging.WARNING, logger=logger.name):
+        log_body(logger, "Body is %s", body=body)
+    assert caplog.records == []
+    assert body.renders == 0
+
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from api.api_modules.site import SiteAPI
+from utils.pagination import async_iter_list_pages, iter_list_pages
+
+VMS_ROUTE = "GET /api/setup/vm/unprotected"
+
+
+class ListResponse:
+
+    def __init__(self, items, status_code=200):
+        self.status_code = status_code
+        self.items = items
+
+    def json(self):
+        return {"fetchedCount": len(self.items), "list": self.items}
+
+
+class ListServer:
+    """
+    Answers the list requests like a server honoring the offset and/or the limit parameters, or ignoring them.
+    """
+
+    def __init__(self, items, honors_offset=True, honors_limit=True):
+        self.items = items
+        self.honors_offset = honors_offset
+        self.honors_limit = honors_limit
+        self.requests = []
+
+    def api_request(self, method, url, headers, params=None):
+        self.requests.append(params)
+        if params is None:
+            return ListResponse(self.items)
+        offset = params["offset"] if self.honors_offset else 0
+        limit = params["limit"] if self.honors_limit else len(self.items)
+        return ListResponse(self.items[offset:offset + limit])
+
+
+class AsyncListServer(ListServer):
+
+    async def api_request(self, method, url, headers, params=None):
+        return ListServer.api_request(self, method, url, headers, params)
+
+
+def items(count, with_ids=True):
+    return [{"_id": str(index)} if with_ids else {"index": index} for index in range(count)]
+
+
+def test_unprotected_vms_are_paged_through(mock_shift, session_id, logger):
+    site_id = mock_shift.state.add_site({"name": "source"})
+    vms = list(SiteAPI(logger, mock_shift.url).iter_unprotected_vms(session_id, site_id, "env", logger, page_size=6))
+    assert vms == mock_shift.state.unprotected_vms[site_id]
+    # 20 VMs in pages of 6, the short fourth page is the last one
+    assert mock_shift.stats()["by_route"][f"{VMS_ROUTE} 200"] == 4
+
+
+def test_a_full_last_page_is_followed_by_one_empty_page(mock_shift, session_id, logger):
+    site_id = mock_shift.state.add_site({"name": "source"})
+    vms = list(SiteAPI(logger, mock_shift.url).iter_unprotected_vms(session_id, site_id, "env", logger, page_size=10))
+    assert len(vms) == 20
+    assert mock_shift.stats()["by_route"][f"{VMS_ROUTE} 200"] == 3
+
+
+def test_a_failed_page_stops_the_iteration(mock_shift, logger):
+    site_id = mock_shift.state.add_site({"name": "source"})
+    vms = list(SiteAPI(logger, mock_shift.url).iter_unprotected_vms("expired", site_id, "env", logger, page_size=6))
+    assert vms == []
+
+
+@pytest.mark.parametrize("count", [0, 3, 4, 7, 8])
+@pytest.mark.parametrize("honors_offset, honors_limit", [(True, True), (False, True), (False, False), (True, False)])
+@pytest.mark.parametrize("with_ids", [True, False])
+def test_every_item_is_yielded_once_whatever_the_server_honors(count, honors_offset, honors_limit, with_ids,
+                                                               logger):
+    server = ListServer(items(count, with_ids), honors_offset, honors_limit)
+    assert list(iter_list_pages(server, "url", {}, logger, page_size=4)) == server.items
+
+
+def test_a_server_ignoring_the_limit_is_read_with_one_request(logger):
+    server = ListServer(items(10), honors_limit=False)
+    assert len(list(iter_list_pages(server, "url", {}, logger, page_size=4))) == 10
+    assert server.requests == [{"offset": 0, "limit": 4}]
+
+
+def test_a_repeated_first_page_falls_back_to_one_unpaged_request(logger):
+    server = ListServer(items(10), honors_offset=False)
+    assert len(list(iter_list_pages(server, "url", {}, logger, page_size=4))) == 10
+    assert server.requests == [{"offset": 0, "limit": 4}, {"offset": 4, "limit": 4}, None]
+
+
+def test_items_without_id_fall_back_to_one_unpaged_request_after_a_full_page(logger):
+    server = ListServer(items(10, with_ids=False))
+    assert len(list(iter_list_pages(server, "url", {}, logger, page_size=4))) == 10
+    assert server.requests == [{"offset": 0, "limit": 4}, None]
+
+
+def test_async_pages_fall_back_like_the_sync_ones(logger):
+    server = AsyncListServer(items(10), honors_offset=False)
+
+    async def collect():
+        return [item async for item in async_iter_list_pages(server, "url", {}, logger, page_size=4)]
+
+    assert asyncio.run(collect()) == server.items
+    assert server.requests == [{"offset": 0, "limit": 4}, {"offset": 4, "limit": 4}, None]
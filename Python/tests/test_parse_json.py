@@ -0,0 +1,22 @@
+from utils.parse_json import JSON_BODY, extract_json_fields
+
+
+def test_shallower_key_wins_over_deeper_key_of_earlier_sibling():
+    body = {"site": {"details": {"_id": "nested"}}, "_id": "top"}
+    assert extract_json_fields(body, ["_id"]) == {"_id": "top"}
+
+
+def test_shallower_key_wins_inside_lists():
+    body = {"list": [{"child": {"name": "deep"}}, {"name": "shallow"}]}
+    assert extract_json_fields(body, ["name"]) == {"name": "shallow"}
+
+
+def test_same_depth_matches_are_taken_in_document_order():
+    body = {"first": {"_id": "a"}, "second": {"_id": "b"}}
+    assert extract_json_fields(body, ["_id"]) == {"_id": "a"}
+
+
+def test_dotted_paths_missing_keys_and_whole_body():
+    body = {"session": {"_id": "s1"}, "_id": "top"}
+    assert extract_json_fields(body, ["session._id", "missing", JSON_BODY]) == {
+        "session._id": "s1", "missing": None, JSON_BODY: body}
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from utils.polling import PollProfile, async_poll_until, poll_until
+
+
+def fast_profile(timeout=5):
+    return PollProfile("test", initial_delay=0.01, max_delay=0.02, multiplier=2, jitter=0, timeout=timeout)
+
+
+def fetch_from(results):
+    results = iter(results)
+    return lambda: next(results)
+
+
+def test_poll_until_stops_at_the_first_terminal_result(logger):
+    fetch = fetch_from(["running", "running", "done", "never polled"])
+    assert poll_until(fetch, lambda result: result == "done", fast_profile(), logger) == (True, "done", 3)
+
+
+def test_poll_until_returns_the_last_result_when_the_deadline_expires(logger):
+    done, result, poll_count = poll_until(lambda: "running", lambda result: False, fast_profile(timeout=0.1), logger)
+    assert (done, result) == (False, "running")
+    assert poll_count > 1
+
+
+def test_poll_until_does_not_sleep_past_the_deadline(logger):
+    profile = PollProfile("test", initial_delay=5, max_delay=5, jitter=0, timeout=0.1)
+    start = time.monotonic()
+    done, result, poll_count = poll_until(lambda: "running", lambda result: False, profile, logger)
+    assert time.monotonic() - start < 1
+    assert (done, poll_count) == (False, 2)
+
+
+def test_delays_grow_up_to_max_delay():
+    profile = PollProfile("test", initial_delay=1, max_delay=5, multiplier=2, jitter=0)
+    delays = profile.delays()
+    assert [next(delays) for _ in range(5)] == [1, 2, 4, 5, 5]
+
+
+def test_delays_stay_within_the_jitter():
+    delays = PollProfile("test", initial_delay=10, max_delay=10, jitter=0.2).delays()
+    assert all(8 <= next(delays) <= 12 for _ in range(100))
+
+
+def test_from_config_overrides_the_timeout_only():
+    profile = PollProfile.from_config("site_discovery", timeout=5)
+    assert profile.timeout == 5
+    assert profile.initial_delay == PollProfile.from_config("site_discovery").initial_delay
+
+
+def test_async_poll_until_stops_at_the_first_terminal_result(logger):
+    results = iter(["running", "done"])
+
+    async def fetch():
+        return next(results)
+
+    outcome = asyncio.run(async_poll_until(fetch, lambda result: result == "done", fast_profile(), logger))
+    assert outcome == (True, "done", 2)
+
+
+def test_async_poll_until_returns_the_last_result_when_the_deadline_expires(logger):
+    async def fetch():
+        return "running"
+
+    done, result, poll_count = asyncio.run(async_poll_until(fetch, lambda result: False, fast_profile(timeout=0.1),
+                                                            logger))
+    assert (done, result) == (False, "running")
+    assert poll_count > 1
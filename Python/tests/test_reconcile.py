@@ -0,0 +1,56 @@
+from api.api_modules.reconcile import ServerState
+from api.api_modules.shift_client import ShiftClient
+
+
+def migration_config(**overrides):
+    config = {
+        "source_site_name": "source",
+        "destination_site_name": "destination",
+        "blueprint_name": "bp",
+        "vm_details": [{"name": "vm1", "resource_group_name": "rg1"}, {"name": "vm2", "resource_group_name": "rg2"},
+                       {"name": "vm3", "resource_group_name": "rg1"}, {"name": "vm4"}],
+    }
+    config.update(overrides)
+    return config
+
+
+def test_plan_lists_the_existing_objects_and_the_missing_resource_groups():
+    state = ServerState(sites=[{"_id": "s1", "name": "source"}],
+                        resource_groups=[{"_id": "rg1-id", "name": "rg1"}],
+                        blueprints=[{"_id": "bp-id", "name": "other"}])
+    plan = state.plan(migration_config())
+    assert plan.source_site_id == "s1"
+    assert plan.destination_site_id is None
+    assert plan.missing_site_types == ["destination"]
+    assert plan.resource_group_ids == {"rg1": "rg1-id"}
+    assert plan.missing_resource_groups == ["rg2"]
+    assert plan.blueprint_id is None
+
+
+def test_plan_of_an_empty_server_creates_everything():
+    plan = ServerState().plan(migration_config())
+    assert plan.missing_site_types == ["source", "destination"]
+    assert plan.missing_resource_groups == ["rg1", "rg2"]
+    assert plan.resource_group_ids == {}
+
+
+def test_state_is_fetched_from_the_server(mock_shift, logger):
+    state = mock_shift.state
+    source_site_id = state.add_site({"name": "source"})
+    destination_site_id = state.add_site({"name": "destination"})
+    resource_group_id = state.add_protection_group({"name": "rg1", "sourceSite": {"_id": source_site_id}, "vms": []})
+    blueprint_id = state.add_drplan({"name": "bp"})
+    client = ShiftClient(logger, mock_shift.url)
+    client.login("admin", "password")
+
+    plan = ServerState.fetch(client).plan(migration_config())
+    assert (plan.source_site_id, plan.destination_site_id) == (source_site_id, destination_site_id)
+    assert plan.missing_site_types == []
+    assert plan.resource_group_ids == {"rg1": resource_group_id}
+    assert plan.missing_resource_groups == ["rg2"]
+    assert plan.blueprint_id == blueprint_id
+
+
+def test_fetch_fails_when_a_list_cannot_be_retrieved(mock_shift, logger):
+    client = ShiftClient(logger, mock_shift.url, session_id="expired")
+    assert ServerState.fetch(client) is None
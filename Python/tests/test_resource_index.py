@@ -0,0 +1,86 @@
+import logging
+
+from api.api_modules.blueprint import ResourceIndex, build_blueprint_payload
+
+
+def port_group(name, port_group_type="DISTRIBUTED_PORTGROUP"):
+    return {"_id": f"{name}-id", "uuid": f"{name}-uuid", "name": name, "providerParams": {"type": port_group_type}}
+
+
+SOURCE_RESOURCES = [port_group("vm-network"), port_group("standard", "STANDARD_PORTGROUP"), port_group("src-ds")]
+TARGET_RESOURCES = [port_group("target-network"), port_group("standard", "STANDARD_PORTGROUP"), port_group("dst-ds")]
+
+
+def migration_config(**overrides):
+    config = {
+        "blueprint_name": "bp",
+        "vm_details": [{"name": "vm1", "resource_group_name": "rg", "boot_order": 1,
+                        "networkDetails": ["target-network", "vm-network"]}],
+        "mappings": {"src-ds": "dst-ds"},
+        "ip_type": "do_not_configure",
+        "windows_loginId": "", "windows_password": "", "linux_loginId": "", "linux_password": "",
+    }
+    config.update(overrides)
+    return config
+
+
+RESOURCE_GROUPS = [{"_id": "rg-id", "name": "rg", "vms": [{"_id": "vm1-id", "name": "vm1"}]}]
+
+
+def build(config, logger):
+    return build_blueprint_payload(config, "src", "src-env", "dst", "dst-env", RESOURCE_GROUPS, SOURCE_RESOURCES,
+                                   TARGET_RESOURCES, logger)
+
+
+def test_find_id_prefers_the_source_resource_and_reports_unknown_names():
+    index = ResourceIndex(SOURCE_RESOURCES, TARGET_RESOURCES)
+    unresolved = {}
+    assert index.find_id("src-ds", unresolved) == "src-ds-id"
+    assert index.find_id("missing", unresolved) is None
+    assert unresolved == {"Resource": ["missing"]}
+
+
+def test_find_port_groups_keeps_the_resource_list_order_and_type():
+    index = ResourceIndex(SOURCE_RESOURCES, TARGET_RESOURCES)
+    unresolved = []
+    matches = index.find_port_groups(["target-network", "vm-network", "standard", "missing"], "DISTRIBUTED_PORTGROUP",
+                                     unresolved)
+    assert [resource["name"] for resource in matches] == ["vm-network", "target-network"]
+    assert unresolved == ["standard", "missing"]
+
+
+def test_standard_port_groups_of_the_source_site_are_not_indexed():
+    index = ResourceIndex(SOURCE_RESOURCES, TARGET_RESOURCES)
+    matches = index.find_port_groups(["standard"], "STANDARD_PORTGROUP", [])
+    assert [resource["_id"] for resource in matches] == ["standard-id"]
+    assert matches[0] is TARGET_RESOURCES[1]
+
+
+def test_blueprint_payload_resolves_vms_networks_and_mappings(logger):
+    payload = build(migration_config(), logger)
+    vm_setting = payload["vmSettings"][0]
+    assert vm_setting["vm"] == {"_id": "vm1-id"}
+    assert [network["name"] for network in vm_setting["networkDetails"]] == ["vm-network", "target-network"]
+    assert payload["mappings"] == [{"sourceResource": {"_id": "src-ds-id"}, "targetResource": {"_id": "dst-ds-id"}}]
+
+
+def test_blueprint_payload_reports_every_unresolved_name(logger, caplog):
+    config = migration_config(
+        vm_details=[{"name": "vm1", "resource_group_name": "rg", "networkDetails": []},
+                    {"name": "unknown-vm", "resource_group_name": "rg", "networkDetails": []}],
+        mappings={"src-ds": "unknown-target", "unknown-source": "dst-ds"})
+    with caplog.at_level(logging.ERROR, logger=logger.name):
+        assert build(config, logger) is None
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("VM id not found" in message and "unknown-vm" in message for message in messages)
+    assert any("Resource id not found" in message and "['unknown-target', 'unknown-source']" in message
+               for message in messages)
+
+
+def test_unresolved_networks_are_left_out_with_a_warning(logger, caplog):
+    config = migration_config(vm_details=[{"name": "vm1", "resource_group_name": "rg",
+                                           "networkDetails": ["vm-network", "unknown-network"]}])
+    with caplog.at_level(logging.WARNING, logger=logger.name):
+        payload = build(config, logger)
+    assert [network["name"] for network in payload["vmSettings"][0]["networkDetails"]] == ["vm-network"]
+    assert "unknown-network" in caplog.text
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from api.api_modules.session_manager import SessionManager
+from api.api_modules.site import SiteAPI
+from api_wrapper import APIWrapper
+
+LOGIN_ROUTE = "POST /api/tenant/session"
+
+
+def logins(mock_shift):
+    return mock_shift.stats()["by_route"].get(f"{LOGIN_ROUTE} 200", 0)
+
+
+def test_executions_with_the_same_credentials_share_one_login(mock_shift, logger):
+    with SessionManager(logger) as manager:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            session_ids = set(executor.map(lambda _: manager.get_session(mock_shift.url, "admin", "password"),
+                                           range(8)))
+        assert len(session_ids) == 1
+        assert logins(mock_shift) == 1
+
+
+def test_another_password_gets_its_own_session(mock_shift, logger):
+    with SessionManager(logger) as manager:
+        first = manager.get_session(mock_shift.url, "admin", "password")
+        second = manager.get_session(mock_shift.url, "admin", "other password")
+        assert first != second
+        assert manager.get_session(mock_shift.url, "admin", "other password") == second
+        assert logins(mock_shift) == 2
+
+
+def test_refresh_replaces_an_expired_session_once(mock_shift, logger):
+    with SessionManager(logger) as manager:
+        expired = manager.get_session(mock_shift.url, "admin", "password")
+        mock_shift.state.logout(expired)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            refreshed = set(executor.map(lambda _: manager.refresh(expired), range(4)))
+        assert len(refreshed) == 1
+        new_session_id = refreshed.pop()
+        assert new_session_id != expired
+        assert mock_shift.state.is_valid_session(new_session_id)
+        assert manager.current_session(expired) == new_session_id
+        assert manager.get_session(mock_shift.url, "admin", "password") == new_session_id
+        assert logins(mock_shift) == 2
+
+
+def test_unknown_sessions_are_not_refreshed(mock_shift, logger):
+    with SessionManager(logger) as manager:
+        assert manager.refresh("unknown") is None
+        assert manager.current_session("unknown") == "unknown"
+        assert logins(mock_shift) == 0
+
+
+def test_requests_with_an_expired_session_are_sent_again_with_a_new_one(mock_shift, logger):
+    with SessionManager(logger) as manager:
+        expired = manager.get_session(mock_shift.url, "admin", "password")
+        mock_shift.state.logout(expired)
+        site_count, site_list = SiteAPI(logger, mock_shift.url).get_site(expired, logger, use_cache=False)
+        assert site_count == 0
+        assert mock_shift.stats()["by_route"]["GET /api/setup/site 401"] == 1
+        # Later requests of the execution use the new session directly
+        SiteAPI(logger, mock_shift.url).get_site(expired, logger, use_cache=False)
+        assert mock_shift.stats()["by_route"]["GET /api/setup/site 401"] == 1
+        assert logins(mock_shift) == 2
+
+
+def test_close_ends_the_sessions_and_unregisters_the_manager(mock_shift, logger):
+    with SessionManager(logger) as manager:
+        assert APIWrapper.session_refresher is manager
+        session_id = manager.get_session(mock_shift.url, "admin", "password")
+    assert APIWrapper.session_refresher is None
+    assert not mock_shift.state.is_valid_session(session_id)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+
+from api.api_modules.blueprint import is_blueprint_recovery_finished
+from api.api_modules.status_watcher import BlueprintStatusWatcher, StatusWatcherError
+
+STATUS_ROUTE = "GET /api/recovery/drplan/status"
+
+
+def wait_for_failed_polls(mock_shift, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while mock_shift.stats()["by_route"].get(f"{STATUS_ROUTE} 401", 0) < count:
+        assert time.monotonic() < deadline, f"the watcher did not poll {count} times"
+        time.sleep(0.01)
+
+
+def restore_session(mock_shift, session_id):
+    with mock_shift.state.lock:
+        mock_shift.state.sessions[session_id] = {"loginId": "admin", "created": time.monotonic()}
+
+
+def test_waiters_get_the_status_once_the_recovery_finishes(mock_shift, session_id, logger):
+    drplan_id = mock_shift.state.add_drplan({"name": "bp"})
+    with BlueprintStatusWatcher.acquire(logger, mock_shift.url, session_id, interval=0.05) as watcher:
+        assert watcher.wait_for(drplan_id, is_blueprint_recovery_finished, timeout=0.2) is None
+        mock_shift.state.start_execution(drplan_id, "migrate")
+        status_entry = watcher.wait_for(drplan_id, is_blueprint_recovery_finished, timeout=5)
+    assert status_entry["drPlan"]["recoveryStatus"] == "migrate complete"
+
+
+def test_failed_polls_below_max_failures_keep_the_waiters_waiting(mock_shift, session_id, logger):
+    drplan_id = mock_shift.state.add_drplan({"name": "bp"})
+    mock_shift.state.start_execution(drplan_id, "migrate")
+    mock_shift.state.logout(session_id)
+    with BlueprintStatusWatcher.acquire(logger, mock_shift.url, session_id, interval=0.05) as watcher:
+        watcher.max_failures = 100
+        wait_for_failed_polls(mock_shift, 3)
+        restore_session(mock_shift, session_id)
+        status_entry = watcher.wait_for(drplan_id, is_blueprint_recovery_finished, timeout=5)
+    assert status_entry["drPlan"]["_id"] == drplan_id
+
+
+def test_waiters_fail_after_max_failures_and_recover_with_the_next_poll(mock_shift, session_id, logger):
+    drplan_id = mock_shift.state.add_drplan({"name": "bp"})
+    mock_shift.state.start_execution(drplan_id, "migrate")
+    mock_shift.state.logout(session_id)
+    with BlueprintStatusWatcher.acquire(logger, mock_shift.url, session_id, interval=0.05) as watcher:
+        watcher.max_failures = 2
+        with pytest.raises(StatusWatcherError, match="polls in a row"):
+            watcher.wait_for(drplan_id, is_blueprint_recovery_finished, timeout=5)
+        restore_session(mock_shift, session_id)
+        # The waiters fail until a poll succeeds again
+        deadline = time.monotonic() + 5
+        while watcher.get_status(drplan_id) is None:
+            assert time.monotonic() < deadline, "the watcher did not recover"
+            time.sleep(0.01)
+        status_entry = watcher.wait_for(drplan_id, is_blueprint_recovery_finished, timeout=5)
+    assert status_entry["drPlan"]["_id"] == drplan_id
+
+
+def test_async_waiters_fail_after_max_failures(mock_shift, session_id, logger):
+    drplan_id = mock_shift.state.add_drplan({"name": "bp"})
+    mock_shift.state.logout(session_id)
+    with BlueprintStatusWatcher.acquire(logger, mock_shift.url, session_id, interval=0.05) as watcher:
+        watcher.max_failures = 2
+        with pytest.raises(StatusWatcherError) as error:
+            asyncio.run(watcher.wait_for_async(drplan_id, is_blueprint_recovery_finished, timeout=5))
+    assert error.value.__cause__ is not None
+
+
+def test_the_watcher_is_shared_and_stops_with_its_last_user(mock_shift, session_id, logger):
+    first = BlueprintStatusWatcher.acquire(logger, mock_shift.url, session_id, interval=0.05)
+    second = BlueprintStatusWatcher.acquire(logger, mock_shift.url, session_id, interval=0.05)
+    assert first is second
+    first.release()
+    assert second._thread.is_alive()
+    second.release()
+    assert not second._thread.is_alive()
@@ -0,0 +1,71 @@
+import time
+
+from api.api_modules.site import SiteAPI
+from utils.ttl_cache import TTLCache
+
+SITE_ROUTE = "GET /api/setup/site"
+
+
+def test_entries_expire_after_the_ttl():
+    cache = TTLCache(0.05)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    time.sleep(0.1)
+    assert cache.get("key", "expired") == "expired"
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+
+def test_invalidate_drops_the_matching_entries_only():
+    cache = TTLCache(60)
+    cache.set(("a", 1), "first")
+    cache.set(("b", 1), "second")
+    cache.invalidate(lambda key: key[0] == "a")
+    assert cache.get(("a", 1)) is None
+    assert cache.get(("b", 1)) == "second"
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+
+
+def test_a_value_loaded_before_an_invalidation_is_not_stored():
+    cache = TTLCache(60)
+    generation = cache.generation()
+    cache.invalidate(lambda key: False)
+    assert cache.set("key", "stale", generation=generation) is False
+    assert cache.get("key") is None
+    assert cache.set("key", "fresh", generation=cache.generation()) is True
+    assert cache.get("key") == "fresh"
+
+
+def test_site_lookups_are_served_from_the_cache_until_invalidated(mock_shift, session_id, logger):
+    site_api = SiteAPI(logger, mock_shift.url)
+    mock_shift.state.add_site({"name": "source"})
+    first = site_api.get_site(session_id, logger)
+    assert site_api.get_site(session_id, logger) is first
+    assert mock_shift.stats()["by_route"][f"{SITE_ROUTE} 200"] == 1
+
+    mock_shift.state.add_site({"name": "destination"})
+    site_api.invalidate_site_cache()
+    site_count, site_list = site_api.get_site(session_id, logger)
+    assert site_count == 2
+    assert mock_shift.stats()["by_route"][f"{SITE_ROUTE} 200"] == 2
+
+
+def test_site_lookups_bypass_the_cache_with_use_cache_false(mock_shift, session_id, logger):
+    site_api = SiteAPI(logger, mock_shift.url)
+    site_api.get_site(session_id, logger)
+    site_api.get_site(session_id, logger, use_cache=False)
+    assert mock_shift.stats()["by_route"][f"{SITE_ROUTE} 200"] == 2
+
+
+def test_a_site_lookup_racing_an_invalidation_is_not_cached(mock_shift, session_id, logger):
+    site_api = SiteAPI(logger, mock_shift.url)
+
+    def load():
+        value = site_api._get_site(session_id, logger)
+        # A site is created by another execution while the list is retrieved
+        site_api.invalidate_site_cache()
+        return value
+
+    site_api._cached_lookup(session_id, ("site",), load, logger)
+    site_api.get_site(session_id, logger)
+    assert mock_shift.stats()["by_route"][f"{SITE_ROUTE} 200"] == 2
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from utils.workflow import (STEP_COMPLETED, STEP_DISABLED, STEP_FAILED, STEP_SKIPPED, Step, Workflow, WorkflowContext,
+                            WorkflowEngine, WorkflowError)
+
+
+def returns(value):
+    return lambda context: value
+
+
+def fails(context):
+    raise WorkflowError("step failed")
+
+
+def run(logger, steps, max_workers=4):
+    workflow = Workflow("test", steps, WorkflowContext({}))
+    WorkflowEngine(logger, max_workers).run([workflow])
+    return workflow
+
+
+def test_required_outputs_are_passed_to_the_dependent_steps(logger):
+    workflow = run(logger, [
+        Step("site", returns("site-id")),
+        Step("resource_group", lambda context: context.output("site") + "/rg", requires=["site"]),
+    ])
+    assert workflow.status == {"site": STEP_COMPLETED, "resource_group": STEP_COMPLETED}
+    assert workflow.context.outputs["resource_group"] == "site-id/rg"
+
+
+def test_a_failed_requirement_skips_its_dependents_transitively(logger):
+    workflow = run(logger, [
+        Step("create_blueprint", fails),
+        Step("compliance", returns(True), requires=["create_blueprint"]),
+        Step("trigger_migration", returns("execution"), requires=["compliance"]),
+    ])
+    assert workflow.status == {"create_blueprint": STEP_FAILED, "compliance": STEP_SKIPPED,
+                               "trigger_migration": STEP_SKIPPED}
+    assert isinstance(workflow.errors["create_blueprint"], WorkflowError)
+    assert workflow.failed_steps == ["create_blueprint"]
+
+
+def test_after_only_orders_the_steps(logger):
+    order = []
+    workflow = run(logger, [
+        Step("prepare_vm", lambda context: order.append("prepare_vm") or fails(context)),
+        Step("trigger_migration", lambda context: order.append("trigger_migration"), after=["prepare_vm"]),
+    ])
+    assert order == ["prepare_vm", "trigger_migration"]
+    assert workflow.status["trigger_migration"] == STEP_COMPLETED
+
+
+def test_a_disabled_step_satisfies_its_dependents(logger):
+    calls = []
+    workflow = run(logger, [
+        Step("create_blueprint", lambda context: calls.append("create_blueprint"), enabled=False),
+        Step("compliance", lambda context: context.output("create_blueprint", "no blueprint"),
+             requires=["create_blueprint"]),
+    ])
+    assert calls == []
+    assert workflow.status == {"create_blueprint": STEP_DISABLED, "compliance": STEP_COMPLETED}
+    assert workflow.context.outputs["compliance"] == "no blueprint"
+
+
+def test_independent_steps_run_concurrently(logger):
+    barrier = threading.Barrier(2, timeout=5)
+    workflow = run(logger, [
+        Step("source_site", lambda context: barrier.wait()),
+        Step("destination_site", lambda context: barrier.wait()),
+    ], max_workers=2)
+    assert set(workflow.status.values()) == {STEP_COMPLETED}
+
+
+def test_the_steps_of_many_workflows_share_the_pool(logger):
+    barrier = threading.Barrier(3, timeout=5)
+    workflows = [Workflow(f"execution-{index}", [Step("site", lambda context: barrier.wait())], WorkflowContext({}))
+                 for index in range(3)]
+    WorkflowEngine(logger, max_workers=3).run(workflows)
+    assert all(workflow.status == {"site": STEP_COMPLETED} for workflow in workflows)
+
+
+def test_hooks_are_called_when_a_workflow_starts_and_finishes(logger):
+    events = []
+    workflow = Workflow("test", [Step("site", fails)], WorkflowContext({}),
+                        on_start=lambda workflow: events.append(("start", dict(workflow.status))),
+                        on_finish=lambda workflow: events.append(("finish", dict(workflow.status))))
+    WorkflowEngine(logger, 1).run([workflow])
+    assert events == [("start", {}), ("finish", {"site": STEP_FAILED})]
+
+
+def test_unknown_dependencies_and_cycles_are_rejected():
+    with pytest.raises(ValueError, match="unknown steps"):
+        Workflow("test", [Step("compliance", fails, requires=["create_blueprint"])], WorkflowContext({}))
+    with pytest.raises(ValueError, match="cycle"):
+        Workflow("test", [Step("a", fails, requires=["b"]), Step("b", fails, after=["a"])], WorkflowContext({}))
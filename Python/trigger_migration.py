@@ -6,7 +6,7 @@ from utils.json_parser import json_parser
 from api.api_modules.blueprint import BluePrintAPI
 from api.api_modules.job_monitoring import JobMonitoring
 from api.api_modules.protection_group import ProtectionGroupAPI
-from api.api_modules.session import SessionAPI
+from api.api_modules.session_manager import SessionManager
 from api.api_modules.site import SiteAPI
 from conftest import trigger_migration_config
 from log_config import trigger_migration_logger
@@ -14,9 +14,10 @@ from log_config import trigger_migration_logger
 logger = trigger_migration_logger()
 logger.setLevel(logging.INFO)
 
-def trigger_migration(session_id, shift_server_ip, blueprint_name, migration_mode):
+def trigger_migration(session_id, shift_server_ip, blueprint_name, migration_mode, blueprint_id=None):
     blueprint_api = BluePrintAPI(logger, shift_server_ip)
-    blueprint_id = blueprint_api.get_blueprint_id_by_name(session_id, blueprint_name, logger)
+    if not blueprint_id:
+        blueprint_id = blueprint_api.get_blueprint_id_by_name(session_id, blueprint_name, logger)
     execution_id = blueprint_api.execute_blueprint(session_id, logger, blueprint_id, execution_type=migration_mode)
     if not execution_id:
         logger.error(
@@ -29,6 +30,7 @@ def trigger_migration(session_id, shift_server_ip, blueprint_name, migration_mod
 if __name__ == "__main__":
     config_data = json_parser(trigger_migration_config.ifile)
     executions = config_data.get("executions", [])
+    session_manager = SessionManager(logger).start()
     try:
         for idx, migration_config in enumerate(executions, 1):
             logger.info(f"Starting trigger migration workflow {idx}")
@@ -42,8 +44,7 @@ if __name__ == "__main__":
                 logger.error(f"Missing required details for migration index {idx}. Skipping this migration.")
                 continue
 
-            shift_api = SessionAPI(logger, migration_config.get("shift_server_ip"))
-            session_id = shift_api.create_drom_session(shift_username, shift_password)
+            session_id = session_manager.get_session(migration_config.get("shift_server_ip"), shift_username, shift_password)
             if not session_id:
                 logger.error(f"Failed to create session for migration index {idx}. Skipping this migration.")
                 continue
@@ -53,9 +54,8 @@ if __name__ == "__main__":
                 logger.info(f"Migration triggered successfully for migration index {idx}")
             else:
                 logger.error(f"Migration trigger failed for migration index {idx}")
-
-            shift_api.end_drom_session(session_id)
     except Exception as ex:
         logger.error(f"An error occurred during migration workflows: {ex}")
     finally:
+        session_manager.close()
         logger.info("Please find the logs of the execution in the latest file of the logs folder")
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from conftest import checkpoint_config
+
+"""
+Checkpoint file of one execution. Records the outputs of the completed workflow steps (site ids, resource group ids,
+blueprint id, execution id) so a rerun of the same execution resumes after the last completed step.
+"""
+
+
+def config_fingerprint(migration_config):
+    # The do_* flags only select steps, changing them must not invalidate the recorded outputs
+    relevant = {key: value for key, value in migration_config.items() if not key.startswith("do_")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CheckpointStore:
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.stale = False
+        self._lock = threading.Lock()
+        self._steps = {}
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                data = json.load(file)
+            if data.get("fingerprint") == fingerprint:
+                self._steps = data.get("steps", {})
+            else:
+                # The execution configuration changed since the checkpoint was written
+                self.stale = True
+
+    @classmethod
+    def for_execution(cls, execution_key, migration_config):
+        """
+        Checkpoint of the execution with the given key ("{index}_{name}", as its log file), so executions sharing
+        a name, or without one, do not share a file.
+        """
+        os.makedirs(checkpoint_config.folder, exist_ok=True)
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', execution_key)
+        return cls(os.path.join(checkpoint_config.folder, f"{safe_name}.json"), config_fingerprint(migration_config))
+
+    def has(self, step_name):
+        with self._lock:
+            return step_name in self._steps
+
+    def get(self, step_name):
+        with self._lock:
+            return self._steps[step_name]["output"]
+
+    def completed_steps(self):
+        with self._lock:
+            return list(self._steps)
+
+    def save(self, step_name, output):
+        with self._lock:
+            self._steps[step_name] = {"output": output, "completed_at": datetime.now().isoformat(timespec="seconds")}
+            data = {"fingerprint": self.fingerprint, "steps": self._steps}
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w') as file:
+                json.dump(data, file, indent=2, default=str)
+            os.replace(temp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._steps = {}
+            self.stale = False
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,22 @@
+class Inventory(list):
+    """
+    List of API objects (sites, resources, drPlans, protection groups, VMs) indexed by _id and name when it is
+    fetched, so lookups by either key are dict lookups instead of linear scans. Behaves as the plain list
+    returned by the API everywhere else.
+    """
+
+    def __init__(self, items=(), keys=('_id', 'name')):
+        super().__init__(items)
+        self._indexes = {key: {} for key in keys}
+        for item in self:
+            for key, index in self._indexes.items():
+                value = item.get(key) if isinstance(item, dict) else None
+                if value is not None:
+                    index.setdefault(value, []).append(item)
+
+    def find(self, key, value):
+        matches = self._indexes[key].get(value)
+        return matches[0] if matches else None
+
+    def find_all(self, key, value):
+        return list(self._indexes[key].get(value, []))
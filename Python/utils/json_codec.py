@@ -0,0 +1,18 @@
+import json
+
+"""
+JSON decoding used for API responses. orjson is used when it is installed, the standard library json module otherwise.
+"""
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
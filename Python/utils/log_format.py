@@ -0,0 +1,50 @@
+import logging
+import reprlib
+
+"""
+Helpers to log API payloads without formatting megabytes of JSON per call. The message is formatted lazily by the
+logging module, INFO records carry a size capped summary of the body and the full body is only logged at DEBUG.
+"""
+
+MAX_SUMMARY_LENGTH = 500
+
+_summary_repr = reprlib.Repr()
+_summary_repr.maxlevel = 2
+_summary_repr.maxdict = 8
+_summary_repr.maxlist = 3
+_summary_repr.maxstring = 80
+_summary_repr.maxother = 80
+
+
+class BodySummary:
+    """
+    Wraps a payload and renders a bounded summary of it when the log record is formatted, lists are reported with
+    their length and nested containers are abbreviated.
+    """
+
+    def __init__(self, body, max_length=MAX_SUMMARY_LENGTH):
+        self.body = body
+        self.max_length = max_length
+
+    def __str__(self):
+        body = self.body
+        if isinstance(body, dict) and isinstance(body.get('list'), list):
+            summary = f"fetchedCount={body.get('fetchedCount', len(body['list']))}, list of {len(body['list'])} items: {_summary_repr.repr(body['list'])}"
+        elif isinstance(body, list):
+            summary = f"list of {len(body)} items: {_summary_repr.repr(body)}"
+        else:
+            summary = _summary_repr.repr(body)
+        if len(summary) > self.max_length:
+            summary = summary[:self.max_length] + '...'
+        return summary
+
+
+def log_body(logger, msg, *args, body, level=logging.INFO):
+    """
+    Log msg with a summary of body at level and the full body at DEBUG. msg is a %-style format string whose last
+    placeholder receives the body.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, *args, BodySummary(body))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args, body)
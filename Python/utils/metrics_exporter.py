@@ -0,0 +1,151 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from conftest import metrics_config
+from utils.metrics import METRICS, Counter
+from utils.request_metrics import REQUEST_METRICS
+from utils.retry import RETRY_STATS
+
+"""
+Exposes the METRICS registry in the Prometheus text format, on a local HTTP port (GET /metrics) and/or in a file
+rewritten every flush_interval secs, so a long running wave can be followed without tailing the logs. While it runs,
+the exporter also records the API calls of the wrappers (through a request hook) and the retry counters.
+"""
+
+API_REQUESTS = METRICS.counter("shift_api_requests_total", "API requests sent, by endpoint and status code",
+                               ("method", "endpoint", "status"))
+API_ERRORS = METRICS.counter("shift_api_request_errors_total", "API requests which got no response",
+                             ("method", "endpoint"))
+API_BYTES = METRICS.counter("shift_api_response_bytes_total", "Bytes received in API responses",
+                            ("method", "endpoint"))
+API_DURATION = METRICS.histogram("shift_api_request_duration_seconds", "Latency of the API requests",
+                                 ("method", "endpoint"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def record_api_request(record):
+    """
+    Request hook of the API wrappers, see APIWrapper.add_request_hook.
+    """
+    status = "none" if record.status_code is None else record.status_code
+    API_REQUESTS.inc(method=record.method, endpoint=record.endpoint, status=status)
+    if record.status_code is None:
+        API_ERRORS.inc(method=record.method, endpoint=record.endpoint)
+    API_BYTES.inc(record.bytes_received, method=record.method, endpoint=record.endpoint)
+    API_DURATION.observe(record.latency_secs, method=record.method, endpoint=record.endpoint)
+
+
+def collect_retry_metrics():
+    retry_stats = RETRY_STATS.snapshot()
+    retries = Counter("shift_api_retries_total", "Retries of transient API failures", ("method", "reason"))
+    for method_reason, count in retry_stats['retries_by_reason'].items():
+        method, reason = method_reason.split(' ', 1)
+        retries.inc(count, method=method, reason=reason)
+    exhausted = Counter("shift_api_retries_exhausted_total", "Requests which still failed after all their retries",
+                        ("method",))
+    for method, count in retry_stats['exhausted'].items():
+        exhausted.inc(count, method=method)
+    return [retries, exhausted]
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    registry = METRICS
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are not worth a log line each
+        pass
+
+
+class MetricsExporter:
+    """
+    Usable as a context manager. port 0 disables the HTTP endpoint and an empty file_path the file, the defaults
+    come from the "metrics" section of Config.yml.
+    """
+
+    def __init__(self, logger, port=None, host=None, file_path=None, flush_interval=None, registry=METRICS):
+        self.logger = logger
+        self.port = metrics_config.http_port if port is None else port
+        self.host = host or metrics_config.host
+        self.file_path = metrics_config.file if file_path is None else file_path
+        self.flush_interval = flush_interval or metrics_config.flush_interval
+        self.registry = registry
+        self._server = None
+        self._threads = []
+        self._stop_event = threading.Event()
+
+    @property
+    def enabled(self):
+        return bool(self.port or self.file_path)
+
+    def start(self):
+        if not self.enabled:
+            return self
+        REQUEST_METRICS.add_hook(record_api_request)
+        self.registry.add_collector(collect_retry_metrics)
+        if self.port:
+            handler = type('BoundMetricsRequestHandler', (MetricsRequestHandler,), {'registry': self.registry})
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+            self._server.daemon_threads = True
+            self._start_thread(self._server.serve_forever, "metrics-http")
+            self.logger.info(f"Serving metrics on http://{self.host}:{self._server.server_address[1]}/metrics")
+        if self.file_path:
+            self._start_thread(self._flush_periodically, "metrics-file")
+            self.logger.info(f"Writing metrics to {self.file_path} every {self.flush_interval} secs")
+        return self
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _flush_periodically(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        # Written next to the file and renamed, a reader never sees a partial file
+        temp_path = f"{self.file_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            with open(temp_path, "w") as f:
+                f.write(self.registry.render())
+            os.replace(temp_path, self.file_path)
+        except OSError as e:
+            self.logger.error(f"Failed to write the metrics to {self.file_path}: {e}")
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.file_path:
+            # Final values of the run
+            self.flush()
+        REQUEST_METRICS.remove_hook(record_api_request)
+        self.registry.remove_collector(collect_retry_metrics)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
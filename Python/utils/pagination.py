@@ -0,0 +1,109 @@
+from conftest import pagination_config
+
+"""
+Page through the list endpoints (GET requests answering with fetchedCount and list) with offset and limit query
+parameters and yield the items one by one, so only one page of a large inventory is held in memory at a time.
+Servers that ignore the paging parameters answer with the full list, that case is detected and the list is yielded once.
+When paging support cannot be told from the pages (the first page comes back again, or the items have no _id to
+compare), the rest of the list is retrieved with a single unpaged GET.
+"""
+
+
+def _page_params(offset, page_size):
+    return {pagination_config.offset_param: offset, pagination_config.limit_param: page_size}
+
+
+def _decode_page(response, url, offset, logger):
+    """
+    Returns the items of the page, or None when the request failed.
+    """
+    if response is None or response.status_code != 200:
+        logger.error(f"Failed to retrieve page at offset {offset} of {url}, Response code is {getattr(response, 'status_code', None)}")
+        return None
+    return response.json().get('list') or []
+
+
+def _is_first_page_again(page, offset, first_id):
+    # The offset was ignored (the limit may still be honored) and the first page was returned again
+    return bool(offset and page and page[0].get('_id') == first_id)
+
+
+def _unpaged_rest(response, url, skip, logger):
+    """
+    Returns the items of the unpaged list which were not yielded from the pages already.
+    """
+    if response is None or response.status_code != 200:
+        logger.error(f"Failed to retrieve the unpaged list of {url}, Response code is {getattr(response, 'status_code', None)}")
+        return []
+    items = response.json().get('list') or []
+    logger.info(f"Retrieved {len(items)} items from {url} without paging")
+    return items[skip:]
+
+
+def iter_list_pages(api, url, headers, logger, page_size=None):
+    """
+    Yield every item of the list returned by a paginated GET endpoint.
+
+    Args:
+        api (APIWrapper): Wrapper used to perform the requests.
+        url (str): Endpoint URL, may already contain query parameters.
+        headers (dict): Request headers.
+        logger (logging.Logger): Logger of the calling workflow.
+        page_size (int): Items requested per page, defaults to the pagination page_size of Config.yml.
+
+    Yields:
+        dict: One item of the list.
+    """
+    page_size = page_size or pagination_config.page_size
+    offset = 0
+    first_id = None
+    while True:
+        response = api.api_request(method='GET', url=url, headers=headers, params=_page_params(offset, page_size))
+        page = _decode_page(response, url, offset, logger)
+        if page is None:
+            return
+        if _is_first_page_again(page, offset, first_id):
+            logger.warning(f"{url} returned the first page again at offset {offset}, retrieving the list without paging")
+            yield from _unpaged_rest(api.api_request(method='GET', url=url, headers=headers), url, offset, logger)
+            return
+        if offset == 0 and page:
+            first_id = page[0].get('_id')
+        yield from page
+        # A short page is the last one, a page larger than requested means the server returned the full list
+        if len(page) != page_size:
+            logger.info(f"Retrieved {offset + len(page)} items from {url}")
+            return
+        offset += len(page)
+        if first_id is None:
+            logger.warning(f"Items of {url} have no _id to detect a repeated page, retrieving the list without paging")
+            yield from _unpaged_rest(api.api_request(method='GET', url=url, headers=headers), url, offset, logger)
+            return
+
+
+async def async_iter_list_pages(api, url, headers, logger, page_size=None):
+    page_size = page_size or pagination_config.page_size
+    offset = 0
+    first_id = None
+    while True:
+        response = await api.api_request(method='GET', url=url, headers=headers, params=_page_params(offset, page_size))
+        page = _decode_page(response, url, offset, logger)
+        if page is None:
+            return
+        if _is_first_page_again(page, offset, first_id):
+            logger.warning(f"{url} returned the first page again at offset {offset}, retrieving the list without paging")
+            for item in _unpaged_rest(await api.api_request(method='GET', url=url, headers=headers), url, offset, logger):
+                yield item
+            return
+        if offset == 0 and page:
+            first_id = page[0].get('_id')
+        for item in page:
+            yield item
+        if len(page) != page_size:
+            logger.info(f"Retrieved {offset + len(page)} items from {url}")
+            return
+        offset += len(page)
+        if first_id is None:
+            logger.warning(f"Items of {url} have no _id to detect a repeated page, retrieving the list without paging")
+            for item in _unpaged_rest(await api.api_request(method='GET', url=url, headers=headers), url, offset, logger):
+                yield item
+            return
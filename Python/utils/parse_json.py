@@ -1,5 +1,5 @@
 import logging
-from collections import defaultdict
+from collections import defaultdict, deque
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +45,62 @@ def parse_json(json_obj, key_name):
     return value
 
 
+JSON_BODY = '$'
+
+
+def extract_json_fields(json_obj, keys):
+    """
+    Extract every requested key from a parsed JSON document in a single traversal.
+
+    Args:
+        json_obj (dict | list): Parsed JSON document.
+        keys (list): Key names or dotted paths. A plain key name is searched at any depth, level by level, so the
+            shallowest match wins and matches at the same depth are taken in document order. A dotted path such as
+            "session._id" is followed from the root and JSON_BODY returns the whole document.
+
+    Returns:
+        dict: Requested key mapped to its value, None when it is not found.
+    """
+    values = {}
+    pending = set()
+    for key in keys:
+        if key == JSON_BODY:
+            values[key] = json_obj
+        elif '.' in key:
+            values[key] = _follow_path(json_obj, key.split('.'))
+        else:
+            values[key] = None
+            pending.add(key)
+
+    # Breadth first, every node of a level is checked before the next level
+    queue = deque([json_obj])
+    while pending and queue:
+        node = queue.popleft()
+        if isinstance(node, dict):
+            for key in [key for key in pending if node.get(key) is not None]:
+                values[key] = node[key]
+                pending.discard(key)
+            children = node.values()
+        elif isinstance(node, list):
+            children = node
+        else:
+            continue
+        queue.extend(child for child in children if isinstance(child, (dict, list)))
+    return values
+
+
+def _follow_path(json_obj, path):
+    value = json_obj
+    for part in path:
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return None
+    return value
+
+
 def convert_to_defaultdict(normal_dict, default_factory=lambda: None):
     default_dict = defaultdict(default_factory)
     for key, value in normal_dict.items():
@@ -0,0 +1,100 @@
+import asyncio
+import random
+import time
+
+from conftest import polling_config
+from utils.metrics import METRICS
+
+"""
+Polling engine used by the wait loops of the API modules. Every poll waits with exponential backoff and jitter
+until the operation reaches a terminal state or the deadline of its profile expires.
+"""
+
+POLL_ITERATIONS = METRICS.counter("shift_poll_iterations_total", "Polls done by the wait loops", ("profile",))
+POLL_TIMEOUTS = METRICS.counter("shift_poll_timeouts_total", "Wait loops which did not finish before their deadline",
+                                ("profile",))
+POLLS_IN_PROGRESS = METRICS.gauge("shift_polls_in_progress", "Wait loops in progress", ("profile",))
+
+
+class PollProfile:
+
+    def __init__(self, name, initial_delay=1, max_delay=30, multiplier=2, jitter=0.1, timeout=600):
+        self.name = name
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, name, timeout=None):
+        profile = dict(polling_config.profiles.get(name, {}))
+        if timeout is not None:
+            profile['timeout'] = timeout
+        return cls(name, **profile)
+
+    def delays(self):
+        delay = self.initial_delay
+        while True:
+            yield delay * (1 + random.uniform(-self.jitter, self.jitter))
+            delay = min(delay * self.multiplier, self.max_delay)
+
+
+def _next_sleep(delays, deadline):
+    return max(min(next(delays), deadline - time.monotonic()), 0)
+
+
+def poll_until(fetch, is_done, profile, logger):
+    """
+    Call fetch() until is_done(result) returns True or the profile deadline expires.
+
+    Args:
+        fetch (callable): Performs one poll and returns its result.
+        is_done (callable): Returns True when the result is terminal (success or failure).
+        profile (PollProfile): Backoff and deadline settings.
+        logger (logging.Logger): Logger of the calling workflow.
+
+    Returns:
+        tuple: (done, last_result, poll_count).
+    """
+    deadline = time.monotonic() + profile.timeout
+    delays = profile.delays()
+    result = None
+    poll_count = 0
+    POLLS_IN_PROGRESS.inc(profile=profile.name)
+    try:
+        while True:
+            result = fetch()
+            poll_count += 1
+            POLL_ITERATIONS.inc(profile=profile.name)
+            if is_done(result):
+                return True, result, poll_count
+            if time.monotonic() >= deadline:
+                POLL_TIMEOUTS.inc(profile=profile.name)
+                logger.error(f"Polling {profile.name} did not finish within {profile.timeout} secs after {poll_count} polls")
+                return False, result, poll_count
+            time.sleep(_next_sleep(delays, deadline))
+    finally:
+        POLLS_IN_PROGRESS.dec(profile=profile.name)
+
+
+async def async_poll_until(fetch, is_done, profile, logger):
+    deadline = time.monotonic() + profile.timeout
+    delays = profile.delays()
+    result = None
+    poll_count = 0
+    POLLS_IN_PROGRESS.inc(profile=profile.name)
+    try:
+        while True:
+            result = await fetch()
+            poll_count += 1
+            POLL_ITERATIONS.inc(profile=profile.name)
+            if is_done(result):
+                return True, result, poll_count
+            if time.monotonic() >= deadline:
+                POLL_TIMEOUTS.inc(profile=profile.name)
+                logger.error(f"Polling {profile.name} did not finish within {profile.timeout} secs after {poll_count} polls")
+                return False, result, poll_count
+            await asyncio.sleep(_next_sleep(delays, deadline))
+    finally:
+        POLLS_IN_PROGRESS.dec(profile=profile.name)
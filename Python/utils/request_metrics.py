@@ -0,0 +1,183 @@
+import logging
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+"""
+Per endpoint request metrics of the API wrappers. Every request sent is recorded with its method, endpoint template
+(ids replaced by {id}), status code, bytes received and latency. The latencies are kept in a fixed bucket histogram
+per endpoint, so the p50/p95/p99 cost the same memory for ten requests or a million, and every record is also passed
+to the registered hooks, for exporters.
+"""
+
+RequestRecord = namedtuple('RequestRecord', ['method', 'endpoint', 'url', 'status_code', 'bytes_received',
+                                             'latency_secs', 'error'])
+
+# uuids, Mongo object ids and numbers in a path are ids of objects
+ID_SEGMENT = re.compile(r'^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+                        r'|[0-9a-fA-F]{24}|\d+)$')
+
+
+@lru_cache(maxsize=4096)
+def normalize_endpoint(url):
+    """
+    Endpoint template of a request URL, e.g. /api/setup/site/{id} for
+    https://10.0.0.1:3700/api/setup/site/64f0c2a1e4b0a1b2c3d4e5f6?limit=100.
+    """
+    path = urlsplit(url).path or '/'
+    return '/'.join('{id}' if ID_SEGMENT.match(segment) else segment for segment in path.split('/'))
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with geometric buckets from 1 ms to about 200 secs, each bucket 25% wider than the previous,
+    so a percentile is estimated within a few percent.
+    """
+
+    BUCKETS = tuple(0.001 * 1.25 ** index for index in range(56))
+
+    def __init__(self):
+        # The last count is the overflow bucket, above the last bound
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, latency_secs):
+        self.counts[bisect_left(self.BUCKETS, latency_secs)] += 1
+        self.count += 1
+        self.sum += latency_secs
+        self.min = latency_secs if self.min is None else min(self.min, latency_secs)
+        self.max = latency_secs if self.max is None else max(self.max, latency_secs)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.BUCKETS[index - 1] if index else 0.0
+                upper = self.BUCKETS[index] if index < len(self.BUCKETS) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.status_codes = Counter()
+        self.errors = 0
+        self.bytes_received = 0
+
+    def snapshot(self):
+        latency = self.latency
+        return {
+            'count': latency.count,
+            'errors': self.errors,
+            'status_codes': dict(self.status_codes),
+            'bytes_received': self.bytes_received,
+            'mean_secs': latency.sum / latency.count if latency.count else None,
+            'p50_secs': latency.percentile(0.50),
+            'p95_secs': latency.percentile(0.95),
+            'p99_secs': latency.percentile(0.99),
+            'max_secs': latency.max,
+        }
+
+
+class RequestMetrics:
+    """
+    Thread safe per endpoint metrics and the hooks called with the RequestRecord of every request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._hooks = []
+
+    def add_hook(self, hook):
+        """
+        Registers a callable called with the RequestRecord of every request, on the thread which sent it. An
+        exception raised by a hook is logged and does not fail the request.
+        """
+        with self._lock:
+            if hook not in self._hooks:
+                self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self._hooks = [registered for registered in self._hooks if registered != hook]
+
+    def record(self, method, url, status_code, bytes_received, latency_secs, error=None):
+        record = RequestRecord(method, normalize_endpoint(url), url, status_code, bytes_received, latency_secs, error)
+        with self._lock:
+            stats = self._endpoints.get((method, record.endpoint))
+            if stats is None:
+                stats = self._endpoints[(method, record.endpoint)] = EndpointStats()
+            stats.latency.observe(latency_secs)
+            stats.bytes_received += bytes_received
+            if status_code is None:
+                stats.errors += 1
+            else:
+                stats.status_codes[status_code] += 1
+            hooks = self._hooks
+        for hook in hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                logger.error("Request hook {} failed: {}".format(hook, e))
+        return record
+
+    def histograms(self):
+        """
+        Copy of the latency histogram and counters of every (method, endpoint), for exporters.
+        """
+        with self._lock:
+            return {key: (_copy_histogram(stats.latency), dict(stats.status_codes), stats.errors, stats.bytes_received)
+                    for key, stats in self._endpoints.items()}
+
+    def snapshot(self):
+        with self._lock:
+            return {f"{method} {endpoint}": stats.snapshot()
+                    for (method, endpoint), stats in sorted(self._endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+def _copy_histogram(histogram):
+    copy = LatencyHistogram()
+    copy.counts = list(histogram.counts)
+    copy.count, copy.sum, copy.min, copy.max = histogram.count, histogram.sum, histogram.min, histogram.max
+    return copy
+
+
+def format_latency_table(snapshot):
+    """
+    Lines of a per endpoint latency table (count, errors, p50, p95, p99, max in ms, KB received) for a snapshot.
+    """
+    def ms(secs):
+        return '-' if secs is None else '{:.1f}'.format(secs * 1000)
+
+    width = max([len('Endpoint')] + [len(key) for key in snapshot])
+    lines = ['{:<{width}} {:>7} {:>6} {:>9} {:>9} {:>9} {:>9} {:>10}'.format(
+        'Endpoint', 'Count', 'Errors', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'KB recv', width=width)]
+    for key, stats in snapshot.items():
+        non_2xx = sum(count for status, count in stats['status_codes'].items() if not 200 <= status < 300)
+        lines.append('{:<{width}} {:>7} {:>6} {:>9} {:>9} {:>9} {:>9} {:>10.1f}'.format(
+            key, stats['count'], stats['errors'] + non_2xx, ms(stats['p50_secs']), ms(stats['p95_secs']),
+            ms(stats['p99_secs']), ms(stats['max_secs']), stats['bytes_received'] / 1024, width=width))
+    return lines
+
+
+REQUEST_METRICS = RequestMetrics()
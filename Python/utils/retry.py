@@ -0,0 +1,134 @@
+import random
+import threading
+from collections import Counter
+
+from conftest import api_retry_config
+
+"""
+Retry policy of the API wrappers. Transient failures (502/503/504 responses, connection resets) are retried with
+exponential backoff within a budget per HTTP method. POST requests create objects on the server and are only retried
+when the caller marks them idempotent, a POST which reached the server must not be sent twice blindly.
+"""
+
+
+class RetryPolicy:
+
+    def __init__(self, max_retries, status_codes, backoff_factor, max_backoff):
+        self.max_retries = {method.upper(): retries for method, retries in max_retries.items()}
+        self.status_codes = frozenset(status_codes)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+
+    @classmethod
+    def from_config(cls):
+        return cls(api_retry_config.max_retries, api_retry_config.status_codes, api_retry_config.backoff_factor,
+                   api_retry_config.max_backoff)
+
+    def retries_for(self, method, idempotent=None):
+        method = method.upper()
+        if method == 'POST':
+            # Read only POSTs (status queries) marked idempotent get the budget of a GET
+            return self.max_retries.get('GET', 0) if idempotent else self.max_retries.get('POST', 0)
+        if idempotent is False:
+            return 0
+        return self.max_retries.get(method, 0)
+
+    def is_retryable_status(self, status_code):
+        return status_code in self.status_codes
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Delay before the given retry (1 based): the Retry-After of the response when it sent one, otherwise
+        exponential backoff with jitter, both capped at max_backoff.
+        """
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except (TypeError, ValueError):
+                pass
+        delay = min(self.backoff_factor * (2 ** (attempt - 1)), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+
+class RetryBudget:
+    """
+    Retry decisions of one request, shared by APIWrapper and AsyncAPIWrapper. after_error() and after_status() return
+    the delay before the next attempt, or None when the request must not be retried (the caller then raises the
+    error or returns the response). A connection which could not be opened never reached the server, it is retried
+    for every method with at least connect_retries retries.
+    """
+
+    def __init__(self, policy, method, idempotent, connect_retries, logger, url, stats=None):
+        self.policy = policy
+        self.method = method
+        self.max_retries = policy.retries_for(method, idempotent)
+        self.connect_retries = connect_retries
+        self.logger = logger
+        self.url = url
+        self.stats = stats or RETRY_STATS
+        self.attempt = 0
+
+    def after_error(self, error, connect_failure=False):
+        budget = max(self.max_retries, self.connect_retries) if connect_failure else self.max_retries
+        return self._next_delay(type(error).__name__, budget)
+
+    def after_status(self, status_code, retry_after=None):
+        if not self.policy.is_retryable_status(status_code):
+            if self.attempt:
+                self.stats.record_recovered(self.method)
+            return None
+        return self._next_delay("HTTP {}".format(status_code), self.max_retries, retry_after)
+
+    def _next_delay(self, reason, budget, retry_after=None):
+        if self.attempt >= budget:
+            if budget:
+                self.stats.record_exhausted(self.method)
+            return None
+        self.attempt += 1
+        delay = self.policy.backoff(self.attempt, retry_after)
+        self.stats.record_retry(self.method, reason)
+        self.logger.warning("{} {} failed with {}, retry {} of {} in {:.1f} secs".format(
+            self.method, self.url, reason, self.attempt, budget, delay))
+        return delay
+
+
+class RetryStats:
+    """
+    Thread safe counters of the retries done by the API wrappers, for monitoring.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = Counter()
+        self.recovered = Counter()
+        self.exhausted = Counter()
+
+    def record_retry(self, method, reason):
+        with self._lock:
+            self.retries[(method, reason)] += 1
+
+    def record_recovered(self, method):
+        with self._lock:
+            self.recovered[method] += 1
+
+    def record_exhausted(self, method):
+        with self._lock:
+            self.exhausted[method] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'retries': sum(self.retries.values()),
+                'retries_by_reason': {f"{method} {reason}": count for (method, reason), count in self.retries.items()},
+                'recovered': dict(self.recovered),
+                'exhausted': dict(self.exhausted),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.retries.clear()
+            self.recovered.clear()
+            self.exhausted.clear()
+
+
+RETRY_STATS = RetryStats()
@@ -0,0 +1,59 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread safe key/value cache whose entries expire ttl seconds after they were stored.
+    Keeps hit and miss counters so callers can report how effective the cache is.
+
+    Every invalidation starts a new generation. A caller loading a value reads generation() before the load and
+    passes it to set(), so a value loaded before an invalidation is not stored after it.
+    """
+
+    _missing = object()
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, key, default=None):
+        with self._lock:
+            expires_at, value = self._entries.get(key, (0, self._missing))
+            if value is not self._missing and expires_at > time.monotonic():
+                self.hits += 1
+                return value
+            self._entries.pop(key, None)
+            self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        """
+        Stores value, unless generation is given and the cache was invalidated since. Returns True when stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            return True
+
+    def invalidate(self, predicate=None):
+        with self._lock:
+            self._generation += 1
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
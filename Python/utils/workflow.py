@@ -0,0 +1,239 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from log_config import set_execution_context, clear_execution_context
+from utils.metrics import METRICS
+
+"""
+Step DAG engine used by the end to end workflow. A Workflow is a set of declarative steps with their dependencies,
+the WorkflowEngine runs the steps of many workflows on one worker pool: a step starts as soon as its dependencies
+are finished, so independent steps of a workflow run concurrently and the stages of different workflows overlap.
+"""
+
+STEP_COMPLETED = "Completed"
+STEP_FAILED = "Failed"
+STEP_SKIPPED = "Skipped"
+STEP_DISABLED = "Disabled"
+
+WORKFLOWS_IN_PROGRESS = METRICS.gauge("shift_workflows_in_progress", "Workflows (executions) in progress")
+WORKFLOWS_FINISHED = METRICS.counter("shift_workflows_total", "Finished workflows by result", ("status",))
+STEPS_RUNNING = METRICS.gauge("shift_workflow_steps_running", "Workflows running each step", ("step",))
+STEPS_FINISHED = METRICS.counter("shift_workflow_steps_total", "Finished workflow steps by status, restored ones "
+                                 "included", ("step", "status"))
+STEP_DURATION = METRICS.histogram("shift_workflow_step_duration_seconds", "Duration of the workflow steps run",
+                                  ("step", "status"))
+
+
+class WorkflowError(Exception):
+    """
+    Raised by a step when it cannot continue, it fails the step (and the steps requiring it) instead of the process.
+    """
+
+
+class Step:
+    """
+    Args:
+        name (str): Unique name of the step in its workflow, its output is stored under this name.
+        func (callable): Called with the WorkflowContext, its return value is the output of the step.
+        requires (tuple): Steps which must complete successfully, the step is skipped when one of them fails.
+        after (tuple): Steps which only have to be finished (in any state) before the step starts.
+        enabled (bool): A disabled step is not run, its output is None and it satisfies its dependents.
+        checkpoint (bool): The output of the completed step is recorded in the checkpoint of the workflow and
+            restored instead of running the step again on a rerun.
+    """
+
+    def __init__(self, name, func, requires=(), after=(), enabled=True, checkpoint=False):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.after = tuple(after)
+        self.enabled = enabled
+        self.checkpoint = checkpoint
+
+    @property
+    def dependencies(self):
+        return self.requires + self.after
+
+
+class WorkflowContext:
+    """
+    State shared by the steps of one workflow: its configuration and the outputs of the finished steps.
+    """
+
+    def __init__(self, config, **values):
+        self.config = config
+        self.outputs = {}
+        self.__dict__.update(values)
+
+    def output(self, step_name, default=None):
+        value = self.outputs.get(step_name)
+        return default if value is None else value
+
+
+class Workflow:
+
+    def __init__(self, name, steps, context, execution_key=None, on_start=None, on_finish=None, checkpoint=None):
+        self.name = name
+        self.steps = {step.name: step for step in steps}
+        self.context = context
+        self.execution_key = execution_key
+        self.checkpoint = checkpoint
+        self.on_start = on_start
+        self.on_finish = on_finish
+        self.status = {}
+        self.errors = {}
+        self._running = set()
+        self._restored = set()
+        self._check_dependencies()
+
+    def _check_dependencies(self):
+        for step in self.steps.values():
+            unknown = [name for name in step.dependencies if name not in self.steps]
+            if unknown:
+                raise ValueError(f"Step {step.name} of workflow {self.name} depends on unknown steps {unknown}")
+        # Kahn's algorithm, every step has to be reachable from the steps without dependencies
+        remaining = {name: set(step.dependencies) for name, step in self.steps.items()}
+        while remaining:
+            ready = [name for name, dependencies in remaining.items() if not dependencies]
+            if not ready:
+                raise ValueError(f"Workflow {self.name} has a dependency cycle between {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for dependencies in remaining.values():
+                dependencies.difference_update(ready)
+
+    @property
+    def finished(self):
+        return len(self.status) == len(self.steps)
+
+    @property
+    def failed_steps(self):
+        return [name for name, status in self.status.items() if status == STEP_FAILED]
+
+    def ready_steps(self, logger):
+        """
+        Returns the steps which can be started now. Disabled steps, steps whose requirements failed and steps
+        recorded in the checkpoint are resolved on the way, without running them.
+        """
+        ready = []
+        progressed = True
+        while progressed:
+            progressed = False
+            for name, step in self.steps.items():
+                if name in self.status or name in self._running or name in ready:
+                    continue
+                if not all(dependency in self.status for dependency in step.dependencies):
+                    continue
+                if not step.enabled:
+                    self.finish_step(name, STEP_DISABLED)
+                    progressed = True
+                elif any(self.status[requirement] in (STEP_FAILED, STEP_SKIPPED) for requirement in step.requires):
+                    self.finish_step(name, STEP_SKIPPED)
+                    progressed = True
+                elif self._can_restore(step):
+                    self.finish_step(name, STEP_COMPLETED, self.checkpoint.get(name), restored=True)
+                    logger.info(f"Workflow {self.name}: step {name} already completed, output restored from {self.checkpoint.path}")
+                    progressed = True
+                else:
+                    ready.append(name)
+        self._running.update(ready)
+        return [self.steps[name] for name in ready]
+
+    def _can_restore(self, step):
+        if not step.checkpoint or self.checkpoint is None or not self.checkpoint.has(step.name):
+            return False
+        # A recorded output is only valid while everything it was computed from was restored as well
+        return all(dependency in self._restored or not self.steps[dependency].checkpoint
+                   or self.status[dependency] == STEP_DISABLED for dependency in step.dependencies)
+
+    def finish_step(self, name, status, output=None, error=None, restored=False):
+        self._running.discard(name)
+        if restored:
+            self._restored.add(name)
+        self.status[name] = status
+        self.context.outputs[name] = output
+        STEPS_FINISHED.inc(step=name, status="Restored" if restored else status)
+        if error is not None:
+            self.errors[name] = error
+        if status == STEP_COMPLETED and not restored and self.steps[name].checkpoint and self.checkpoint is not None:
+            self.checkpoint.save(name, output)
+
+    def run_step(self, step, logger):
+        """
+        Runs one step with the execution context of the workflow, returns (status, output, error).
+        """
+        set_execution_context(self.execution_key)
+        STEPS_RUNNING.inc(step=step.name)
+        start = time.monotonic()
+        status = STEP_FAILED
+        try:
+            logger.info(f"Workflow {self.name}: starting step {step.name}")
+            output = step.func(self.context)
+            logger.info(f"Workflow {self.name}: step {step.name} completed")
+            status = STEP_COMPLETED
+            return STEP_COMPLETED, output, None
+        except (Exception, SystemExit) as e:
+            logger.error(f"Workflow {self.name}: step {step.name} failed: {e!r}")
+            return STEP_FAILED, None, e
+        finally:
+            STEPS_RUNNING.dec(step=step.name)
+            STEP_DURATION.observe(time.monotonic() - start, step=step.name, status=status)
+            clear_execution_context()
+
+
+class WorkflowEngine:
+    """
+    Runs the steps of many workflows on one pool of max_workers threads. At most max_workflows workflows are in
+    progress at the same time, the next one is started as soon as one finishes.
+    """
+
+    def __init__(self, logger, max_workers, max_workflows=None):
+        self.logger = logger
+        self.max_workers = max(1, max_workers)
+        self.max_workflows = max_workflows
+
+    def _call_hook(self, workflow, hook):
+        if hook is None:
+            return
+        set_execution_context(workflow.execution_key)
+        try:
+            hook(workflow)
+        except Exception as e:
+            self.logger.error(f"Workflow {workflow.name} hook {hook.__name__} failed: {e!r}")
+        finally:
+            clear_execution_context()
+
+    def run(self, workflows):
+        pending = list(workflows)
+        active = []
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow") as executor:
+            while pending or active:
+                while pending and (self.max_workflows is None or len(active) < self.max_workflows):
+                    workflow = pending.pop(0)
+                    self._call_hook(workflow, workflow.on_start)
+                    active.append(workflow)
+                    WORKFLOWS_IN_PROGRESS.inc()
+
+                for workflow in active:
+                    set_execution_context(workflow.execution_key)
+                    try:
+                        ready = workflow.ready_steps(self.logger)
+                    finally:
+                        clear_execution_context()
+                    for step in ready:
+                        futures[executor.submit(workflow.run_step, step, self.logger)] = (workflow, step)
+
+                if futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        workflow, step = futures.pop(future)
+                        status, output, error = future.result()
+                        workflow.finish_step(step.name, status, output, error)
+
+                for workflow in [workflow for workflow in active if workflow.finished]:
+                    active.remove(workflow)
+                    WORKFLOWS_IN_PROGRESS.dec()
+                    WORKFLOWS_FINISHED.inc(status=STEP_FAILED if workflow.failed_steps else STEP_COMPLETED)
+                    self._call_hook(workflow, workflow.on_finish)
+        return workflows